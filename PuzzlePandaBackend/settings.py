@@ -85,6 +85,29 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.0/ref/settings/#caches
+# 'versions' holds the content version stamps every worker must agree on and
+# 'http' the rendered FAQ/slider responses, so a 304 or a cached body built by
+# one worker is served by all of them. The file caches are shared by the
+# workers of one host; point them at redis or memcached when running on
+# several hosts.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'versions': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, 'version_stamps'),
+    },
+    'http': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, 'http_cache'),
+    },
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 
@@ -170,7 +193,7 @@ REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         # 'rest_framework.authentication.TokenAuthentication'
         
-         'rest_framework_simplejwt.authentication.JWTAuthentication',
+         'quiz.principalCache.CachedJWTAuthentication',
     ],
     'DEFAULT_RENDERER_CLASSES': [
         'rest_framework.renderers.JSONRenderer',
@@ -206,4 +229,57 @@ SWAGGER_SETTINGS = {
 REDOC_SETTINGS = {
    'LAZY_RENDERING': False,
 
-}
\ No newline at end of file
+}
+
+
+########### Quiz Engine #################
+QUIZ_VERSION_CACHE_ALIAS = 'versions'  # CACHES alias holding content version stamps, must be shared by all workers
+QUIZ_INDEX_MAX_AGE = 300  # Seconds before a worker re-reads the live quiz IDs
+QUIZ_RECENT_WINDOW = 100  # Quiz IDs remembered per user for `exclude_seen`
+QUIZ_DECODE_CACHE_SIZE = 0  # Process-wide LRU of decoded quiz/FAQ fields, 0 disables it
+QUIZ_WARM_ANSWER_KEY = False  # Load the answer-key index in the background at startup
+QUIZ_ROUND_CREDIT_COST = 10  # Credits deducted for every validated quiz round
+QUIZ_SIGNUP_CREDITS = 50  # Credits granted when a user registers
+QUIZ_CREDIT_COMPACT_AFTER_DAYS = 90  # Ledger entries older than this are folded into one snapshot row per user
+QUIZ_PERFORMANCE_WRITE_BEHIND = False  # Buffer Performance counters and flush them in bulk
+QUIZ_PERFORMANCE_JOURNAL_DIR = os.path.join(BASE_DIR, 'performance_journal')
+QUIZ_PERFORMANCE_FLUSH_SIZE = 500  # Buffered (user, day) rows that trigger a flush
+QUIZ_PERFORMANCE_FLUSH_INTERVAL = 5  # Seconds between timed flushes
+QUIZ_PERFORMANCE_JOURNAL_FSYNC = True  # fsync every journal line so buffered rounds survive a machine crash
+QUIZ_LEADERBOARD_RELOAD_INTERVAL = 60  # Seconds before a worker re-aggregates its leaderboards
+QUIZ_SPIN_DAILY_LIMIT = 5  # Spins each user gets per day
+QUIZ_SPIN_PRIZE_MAX_AGE = 300  # Seconds before a worker re-reads the SpinPrize table
+QUIZ_IMPORT_BATCH_SIZE = 1000  # Rows per bulk INSERT when importing quiz files
+QUIZ_HTTP_CACHE_ALIAS = 'http'  # CACHES alias holding rendered FAQ/slider responses and their version stamps, shared by all workers
+QUIZ_HTTP_CACHE_TIMEOUT = 300  # Seconds a rendered response is kept; bounds staleness when workers do not share the cache
+QUIZ_HTTP_CACHE_MAX_AGE = 60  # Cache-Control max-age sent with FAQ/slider responses
+QUIZ_SLIDER_WIDTHS = (480, 960, 1440)  # Pixel widths generated for every slider image
+QUIZ_SLIDER_FORMATS = ('webp', 'jpeg')  # Encodings per width, the first is preferred by clients
+QUIZ_SLIDER_QUALITY = 80  # WebP/JPEG encoder quality
+QUIZ_IMAGE_WORKERS = 2  # Background threads encoding slider images
+QUIZ_PRINCIPAL_CACHE_TTL = 30  # Seconds a user and profile are reused; also how late changes from other workers show up without a shared cache
+QUIZ_PRINCIPAL_CACHE_SIZE = 10000  # Users kept per worker by the principal cache
+
+
+
+########### Digimart #################
+DIGIMART_STATUS_TTL = 300  # Seconds a cached subscriber status is served without a refresh
+DIGIMART_STATUS_STALE_TTL = 3600  # Seconds a stale status is still served while it refreshes
+DIGIMART_STATUS_WORKERS = 4  # Background threads refreshing subscriber statuses
+DIGIMART_STATUS_CACHE_SIZE = 10000  # Subscriber statuses kept per worker
+DIGIMART_API_BASE_URL = 'https://api.digimart.store'
+DIGIMART_CONNECT_TIMEOUT = 3  # Seconds
+DIGIMART_READ_TIMEOUT = 10  # Seconds
+DIGIMART_MAX_RETRIES = 2  # Extra attempts on connection errors and 502/503/504
+DIGIMART_RETRY_BACKOFF = 0.2  # Base seconds for jittered exponential backoff
+DIGIMART_POOL_SIZE = 20  # Keep-alive connections per host
+DIGIMART_BREAKER_FAILURES = 5  # Consecutive failed calls that open the circuit
+DIGIMART_BREAKER_RESET = 30  # Seconds the circuit stays open before a trial call
+DIGIMART_STATUS_REFRESH_ON_READ = True  # False when `manage.py reconcile_subscriptions` runs on a schedule
+DIGIMART_WEBHOOK_FAST_ACK = False  # Queue webhook calls for `manage.py process_digimart_events` and answer at once
+DIGIMART_EVENT_BATCH_SIZE = 500  # Queued webhook events applied per transaction
+DIGIMART_EVENT_RETENTION_DAYS = 30  # Days processed webhook events are kept, None keeps them forever
+DIGIMART_CONFIG_MAX_AGE = 300  # Seconds before a worker re-reads the DigimartSubscription row
+DIGIMART_TRANSITION_ATTEMPTS = 3  # Optimistic retries before a subscriber transition gives up
+DIGIMART_ASYNC_VIEWS = False  # Serve the Digimart endpoints from async views, turn on when running under ASGI
+DIGIMART_ASYNC_MAX_CONNECTIONS = 1000  # Concurrent upstream connections per event loop for the async client
@@ -0,0 +1,229 @@
+import json
+import requests
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.views import View
+from rest_framework import exceptions, status
+from quiz.models import Profile
+from quiz.DigimartSubscriptionModel import DigimartSubscription, DigimartChargingSubscriberModel
+from quiz.DigimartSubcriptionView import authorize_url, generate_request_id, parse_subscription_status
+from quiz.principalCache import CachedJWTAuthentication
+from quiz.subscriptionCache import subscription_status_cache
+from quiz.digimartClient import digimart_async_client
+from quiz.digimartConfig import digimart_config
+from quiz.digimartEvents import fast_ack_enabled, id_length_error, ingest
+from quiz.subscriptionState import STATE_FIELDS, StaleSubscriptionError, confirmed, registered, requested, unregistered
+
+
+# Async versions of the Digimart endpoints, routed instead of the APIViews in
+# DigimartSubcriptionView when DIGIMART_ASYNC_VIEWS is on (ASGI deployments).
+# Upstream calls await the httpx client, so a worker holds many in-flight
+# Digimart calls without a thread each. Simple lookups use the async ORM; the
+# optimistic subscriber transitions and the config cache stay sync and run
+# through sync_to_async.
+
+get_config = sync_to_async(digimart_config.get)
+
+
+class AsyncAPIView(View):
+    """Minimal async counterpart of APIView: JWT authentication, JSON in and out, no CSRF."""
+    authenticated = True
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+        view.csrf_exempt = True
+        return view
+
+    async def dispatch(self, request, *args, **kwargs):
+        if self.authenticated:
+            try:
+                result = await sync_to_async(CachedJWTAuthentication().authenticate)(request)
+            except exceptions.APIException as e:
+                return JsonResponse(e.detail if isinstance(e.detail, dict) else {"detail": e.detail}, status=e.status_code)
+            if result is None:
+                return JsonResponse({"detail": "Authentication credentials were not provided."}, status=status.HTTP_401_UNAUTHORIZED)
+            request.user = result[0]
+        return await super().dispatch(request, *args, **kwargs)
+
+    @staticmethod
+    def data(request):
+        if request.content_type == 'application/json':
+            try:
+                data = json.loads(request.body or b'{}')
+            except ValueError:
+                return {}
+            return data if isinstance(data, dict) else {}
+        return request.POST
+
+
+class AsyncGenerateApiEndpointView(AsyncAPIView):
+    async def post(self, request):
+        user = request.user
+        msisdn = self.data(request).get('msisdn')
+
+        if not msisdn:
+            profile = await Profile.objects.filter(user=user).afirst()
+            if profile and profile.primary_phone:
+                msisdn = profile.primary_phone[2:]  # Remove the first two characters
+            else:
+                return JsonResponse({"error": "msisdn is required and not found in profile"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            digimart_subscription = await get_config()
+            if not digimart_subscription:
+                return JsonResponse({"error": "DigimartSubscription configuration is missing."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+            request_id = generate_request_id(user.id)
+            api_endpoint = authorize_url(digimart_subscription, request_id, msisdn)
+
+            digimart_subscriber, created = await DigimartChargingSubscriberModel.objects.only(*STATE_FIELDS).aget_or_create(
+                user=user,
+                defaults={
+                    'plain_msisdn': msisdn,
+                    'request_id': request_id,
+                    'masked_msisdn': '',
+                    'subscription_status': 'UnKnown',
+                }
+            )
+            if not created:
+                await sync_to_async(requested)(digimart_subscriber, msisdn, request_id)
+
+            return JsonResponse({"api_endpoint": api_endpoint}, status=status.HTTP_200_OK)
+        except DigimartSubscription.DoesNotExist:
+            return JsonResponse({"error": "Subscription configuration not found."}, status=status.HTTP_404_NOT_FOUND)
+        except StaleSubscriptionError as e:
+            return JsonResponse({"error": str(e)}, status=status.HTTP_409_CONFLICT)
+
+
+class AsyncNotifyMeView(AsyncAPIView):
+    authenticated = False
+
+    async def get(self, request):
+        subscriberId = request.GET.get('subscriberId')
+        requestId = request.GET.get('requestId')
+        subscriptionStatus = request.GET.get('subscriptionStatus')
+        timeStamp = request.GET.get('timeStamp')
+
+        if not subscriberId:
+            return JsonResponse({"message": "subscriberId is required"}, status=status.HTTP_400_BAD_REQUEST)
+        if not requestId:
+            return JsonResponse({"message": "requestId is required"}, status=status.HTTP_400_BAD_REQUEST)
+        if not subscriptionStatus:
+            return JsonResponse({"message": "subscriptionStatus is required"}, status=status.HTTP_400_BAD_REQUEST)
+        length_error = id_length_error(subscriberId, requestId)
+        if length_error:
+            return JsonResponse({"message": length_error}, status=status.HTTP_400_BAD_REQUEST)
+
+        request_data_dict = {
+            "subscriberId": subscriberId,
+            "subscriptionStatus": subscriptionStatus,
+            "requestId": requestId
+        }
+
+        if fast_ack_enabled():
+            await sync_to_async(ingest)('notify', request_data_dict, subscriberId, requestId, subscriptionStatus, timeStamp)
+            return JsonResponse({"message": "Subscription notification accepted."}, status=status.HTTP_200_OK)
+
+        try:
+            digimart_subscriber = await DigimartChargingSubscriberModel.objects.only(*STATE_FIELDS).filter(request_id=requestId).afirst()
+            if not digimart_subscriber:
+                return JsonResponse({"message": "Subscriber not found."}, status=status.HTTP_404_NOT_FOUND)
+            await sync_to_async(registered)(digimart_subscriber, subscriberId, subscriptionStatus, request_data_dict, timeStamp)
+            return JsonResponse({"message": "Subscription notification updated successfully."}, status=status.HTTP_200_OK)
+        except StaleSubscriptionError as e:
+            return JsonResponse({"error": str(e)}, status=status.HTTP_409_CONFLICT)
+
+
+class AsyncConfirmNotificationView(AsyncAPIView):
+    authenticated = False
+
+    async def post(self, request):
+        data = self.data(request)
+        timeStamp = data.get('timeStamp')
+        subscriberId = data.get('subscriberId')
+        confirmationStatus = data.get('status')
+
+        if not subscriberId:
+            return JsonResponse({"message": "subscriberId is required."}, status=status.HTTP_400_BAD_REQUEST)
+        length_error = id_length_error(subscriberId)
+        if length_error:
+            return JsonResponse({"message": length_error}, status=status.HTTP_400_BAD_REQUEST)
+
+        request_data_dict = {
+            "timeStamp": timeStamp,
+            "subscriberId": subscriberId,
+            "applicationId": data.get('applicationId'),
+            "version": data.get('version'),
+            "frequency": data.get('frequency'),
+            "status": confirmationStatus
+        }
+
+        if fast_ack_enabled():
+            await sync_to_async(ingest)('confirm', request_data_dict, subscriberId, status=confirmationStatus, event_time=timeStamp)
+            return JsonResponse({"message": "Subscription confirmation notification accepted."}, status=status.HTTP_200_OK)
+
+        try:
+            digimart_subscriber = await DigimartChargingSubscriberModel.objects.only(*STATE_FIELDS).aget(masked_msisdn=subscriberId)
+            await sync_to_async(confirmed)(digimart_subscriber, request_data_dict, confirmationStatus, timeStamp)
+            return JsonResponse({"message": "Subscription confirmation notification updated successfully."}, status=status.HTTP_200_OK)
+        except DigimartChargingSubscriberModel.DoesNotExist:
+            return JsonResponse({"error": "DigimartChargingSubscriberModel not found for the subscriberId."}, status=status.HTTP_404_NOT_FOUND)
+
+
+class AsyncUnsubscriptionView(AsyncAPIView):
+    async def post(self, request):
+        subscriber = await DigimartChargingSubscriberModel.objects.only(*STATE_FIELDS).filter(user=request.user).afirst()
+        if not subscriber:
+            return JsonResponse({"error": "Subscriber not found."}, status=status.HTTP_404_NOT_FOUND)
+
+        try:
+            digimartApp = await get_config()
+            if not digimartApp:
+                return JsonResponse({"error": "Subscription configuration not found."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+            response = await digimart_async_client.unregister(digimartApp.APP_ID, digimartApp.API_Password, subscriber.masked_msisdn)
+            response_data = response.json()
+            await sync_to_async(unregistered)(subscriber, response_data)
+            return JsonResponse({"message": response_data}, status=response.status_code)
+        except DigimartSubscription.DoesNotExist:
+            return JsonResponse({"error": "Subscription configuration not found."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        except (requests.RequestException, ValueError) as e:
+            # httpx raises json.JSONDecodeError, requests wraps it in a RequestException.
+            return JsonResponse({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except StaleSubscriptionError as e:
+            return JsonResponse({"error": str(e)}, status=status.HTTP_409_CONFLICT)
+
+
+class AsyncSubscriptionStatusView(AsyncAPIView):
+    async def get(self, request):
+        user = request.user
+        try:
+            response_data, response_status = await aget_subscriber_charging_info(user)
+            subscription_status_cache.store(user.pk, response_data, response_status)
+            return JsonResponse(response_data, status=response_status)
+        except Exception as e:
+            return JsonResponse({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+async def aget_subscriber_charging_info(user):
+    try:
+        subscriber = await DigimartChargingSubscriberModel.objects.filter(user=user).alast()
+        if not subscriber:
+            return {"error": "Subscriber not found."}, status.HTTP_404_NOT_FOUND
+
+        digimart_app = await get_config()
+        if not digimart_app:
+            return {"error": "Subscription configuration not found."}, status.HTTP_500_INTERNAL_SERVER_ERROR
+
+        response = await digimart_async_client.subscriber_charging_info(digimart_app.APP_ID, digimart_app.API_Password, subscriber.masked_msisdn)
+        response_data = response.json()
+        if response.status_code == 200:
+            # Profile.save() reads profile.user, load it up front instead of lazily.
+            user_profile = await Profile.objects.select_related('user').aget(user=user)
+            user_profile.is_subscribed = parse_subscription_status(response_data) == 'REGISTERED'
+            await user_profile.asave()
+
+        return {"message": response_data}, response.status_code
+    except (requests.RequestException, ValueError) as e:
+        return {"error": str(e)}, status.HTTP_400_BAD_REQUEST
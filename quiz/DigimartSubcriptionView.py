@@ -6,7 +6,11 @@ from rest_framework import status, permissions
 from django.contrib.auth.models import User
 from quiz.models import Profile
 from quiz.DigimartSubscriptionModel import DigimartSubscription, DigimartChargingSubscriberModel
-import hashlib
+from quiz.subscriptionCache import subscription_status_cache
+from quiz.digimartClient import digimart_client
+from quiz.digimartConfig import digimart_config
+from quiz.digimartEvents import fast_ack_enabled, id_length_error, ingest
+from quiz.subscriptionState import STATE_FIELDS, StaleSubscriptionError, confirmed, registered, requested, unregistered
 import datetime
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
@@ -28,6 +32,16 @@ def generate_request_id(user_id):
     return f"{user_id_str}_{random_chars}"
 
 
+def authorize_url(digimart_subscription, request_id, msisdn):
+    api_key = digimart_subscription.API_Key
+    redirect_url = digimart_subscription.redirect_URL
+    current_time_utc = datetime.datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
+
+    hashed_signature = digimart_subscription.sign(current_time_utc)
+
+    return f"https://user.digimart.store/sdk/subscription/authorize?apiKey={api_key}&requestId={request_id}&requestTime={current_time_utc}&signature={hashed_signature}&redirectUrl={redirect_url}&msisdn={msisdn}"
+
+
 class GenerateApiEndpointView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
@@ -63,42 +77,32 @@ class GenerateApiEndpointView(APIView):
                 return Response({"error": "msisdn is required and not found in profile"}, status=status.HTTP_400_BAD_REQUEST)
 
         try:
-            digimart_subscription = DigimartSubscription.objects.last()  # Assuming only one record
+            digimart_subscription = digimart_config.get()
             if not digimart_subscription:
                 return Response({"error": "DigimartSubscription configuration is missing."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-            api_key = digimart_subscription.API_Key
-            api_secret = digimart_subscription.API_Secret
-            redirect_url = digimart_subscription.redirect_URL
             request_id = generate_request_id(user.id)
-            current_time_utc = datetime.datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
-
-            signature_data = f'{api_key}|{current_time_utc}|{api_secret}'
-            hashed_signature = hashlib.sha512(signature_data.encode()).hexdigest()
-
-            api_endpoint = f"https://user.digimart.store/sdk/subscription/authorize?apiKey={api_key}&requestId={request_id}&requestTime={current_time_utc}&signature={hashed_signature}&redirectUrl={redirect_url}&msisdn={msisdn}"
+            api_endpoint = authorize_url(digimart_subscription, request_id, msisdn)
             
             if api_endpoint:
-                digimart_subscriber, created = DigimartChargingSubscriberModel.objects.get_or_create(
+                digimart_subscriber, created = DigimartChargingSubscriberModel.objects.only(*STATE_FIELDS).get_or_create(
                     user=user,
                     defaults={
                         'plain_msisdn': msisdn,
                         'request_id': request_id,
                         'masked_msisdn': '',
                         'subscription_status': 'UnKnown',
-                        'subscription_notification': '',
-                        'subscription_confirm_notification': ''
                     }
                 )
                 if not created:
-                    digimart_subscriber.plain_msisdn = msisdn
-                    digimart_subscriber.request_id = request_id
-                    digimart_subscriber.save()
+                    requested(digimart_subscriber, msisdn, request_id)
                 
             return Response({"api_endpoint": api_endpoint}, status=status.HTTP_200_OK)
 
         except DigimartSubscription.DoesNotExist:
             return Response({"error": "Subscription configuration not found."}, status=status.HTTP_404_NOT_FOUND)
+        except StaleSubscriptionError as e:
+            return Response({"error": str(e)}, status=status.HTTP_409_CONFLICT)
 
 
 class NotifyMeView(APIView):
@@ -137,29 +141,30 @@ class NotifyMeView(APIView):
             return Response({"message": "requestId is required"}, status=status.HTTP_400_BAD_REQUEST)
         if not subscriptionStatus:
             return Response({"message": "subscriptionStatus is required"}, status=status.HTTP_400_BAD_REQUEST)
+        length_error = id_length_error(subscriberId, requestId)
+        if length_error:
+            return Response({"message": length_error}, status=status.HTTP_400_BAD_REQUEST)
+
+        request_data_dict = {
+            "subscriberId": subscriberId,
+            "subscriptionStatus": subscriptionStatus,
+            "requestId": requestId
+        }
+        if fast_ack_enabled():
+            ingest('notify', request_data_dict, subscriberId, requestId, subscriptionStatus, request.query_params.get('timeStamp'))
+            return Response({"message": "Subscription notification accepted."}, status=status.HTTP_200_OK)
 
         try:
-            digimart_subscriber = DigimartChargingSubscriberModel.objects.filter(request_id=requestId).first()
+            digimart_subscriber = DigimartChargingSubscriberModel.objects.only(*STATE_FIELDS).filter(request_id=requestId).first()
             if not digimart_subscriber:
                 return Response({"message": "Subscriber not found."}, status=status.HTTP_404_NOT_FOUND)
 
-            user = digimart_subscriber.user
-            if subscriberId:
-                digimart_subscriber.masked_msisdn = subscriberId
-            if subscriptionStatus and subscriptionStatus == "S1000":
-                digimart_subscriber.subscription_status = "Registered"
-                
-            request_data_dict = {
-                "subscriberId": subscriberId,
-                "subscriptionStatus": subscriptionStatus,
-                "requestId": requestId
-            }
-
-            digimart_subscriber.subscription_notification = json.dumps(request_data_dict)
-            digimart_subscriber.save()
+            registered(digimart_subscriber, subscriberId, subscriptionStatus, request_data_dict, request.query_params.get('timeStamp'))
             return Response({"message": "Subscription notification updated successfully."}, status=status.HTTP_200_OK)
         except DigimartChargingSubscriberModel.DoesNotExist:
             return Response({"error": "DigimartChargingSubscriberModel not found for the user."}, status=status.HTTP_404_NOT_FOUND)
+        except StaleSubscriptionError as e:
+            return Response({"error": str(e)}, status=status.HTTP_409_CONFLICT)
 
 
 class ConfirmNotificationView(APIView):
@@ -195,25 +200,29 @@ class ConfirmNotificationView(APIView):
         applicationId = request.data.get('applicationId')
         version = request.data.get('version')
         frequency = request.data.get('frequency')
-        status = request.data.get('status')
+        confirmationStatus = request.data.get('status')
 
         if not subscriberId:
             return Response({"message": "subscriberId is required."}, status=status.HTTP_400_BAD_REQUEST)
+        length_error = id_length_error(subscriberId)
+        if length_error:
+            return Response({"message": length_error}, status=status.HTTP_400_BAD_REQUEST)
+
+        request_data_dict = {
+            "timeStamp": timeStamp,
+            "subscriberId": subscriberId,
+            "applicationId": applicationId,
+            "version": version,
+            "frequency": frequency,
+            "status": confirmationStatus
+        }
+        if fast_ack_enabled():
+            ingest('confirm', request_data_dict, subscriberId, status=confirmationStatus, event_time=timeStamp)
+            return Response({"message": "Subscription confirmation notification accepted."}, status=status.HTTP_200_OK)
 
         try:
-            digimart_subscriber = DigimartChargingSubscriberModel.objects.get(masked_msisdn=subscriberId)
-
-            request_data_dict = {
-                "timeStamp": timeStamp,
-                "subscriberId": subscriberId,
-                "applicationId": applicationId,
-                "version": version,
-                "frequency": frequency,
-                "status": status
-            }
-
-            digimart_subscriber.subscription_confirm_notification = json.dumps(request_data_dict)
-            digimart_subscriber.save()
+            digimart_subscriber = DigimartChargingSubscriberModel.objects.only(*STATE_FIELDS).get(masked_msisdn=subscriberId)
+            confirmed(digimart_subscriber, request_data_dict, confirmationStatus, timeStamp)
             return Response({"message": "Subscription confirmation notification updated successfully."}, status=status.HTTP_200_OK)
         except DigimartChargingSubscriberModel.DoesNotExist:
             return Response({"error": "DigimartChargingSubscriberModel not found for the subscriberId."}, status=status.HTTP_404_NOT_FOUND)
@@ -244,31 +253,19 @@ class UnsubscriptionView(APIView):
         user = request.user
 
         try:
-            subscriber = DigimartChargingSubscriberModel.objects.filter(user=user).first()
+            subscriber = DigimartChargingSubscriberModel.objects.only(*STATE_FIELDS).filter(user=user).first()
             if not subscriber:
                 return Response({"error": "Subscriber not found."}, status=status.HTTP_404_NOT_FOUND)
             subscriberId = subscriber.masked_msisdn
-            digimartApp = DigimartSubscription.objects.last()
+            digimartApp = digimart_config.get()
             if not digimartApp:
                 return Response({"error": "Subscription configuration not found."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
             applicationId = digimartApp.APP_ID
             appPassword = digimartApp.API_Password
 
-            payload = {
-                "applicationId": applicationId,
-                "password": appPassword,
-                "subscriberId": f"tel:{subscriberId}",
-                "action": '0'
-            }
-
-            response = requests.post('https://api.digimart.store/subs/unregistration', json=payload)
+            response = digimart_client.unregister(applicationId, appPassword, subscriberId)
             response_data = response.json()
-            subscriber.unSubscription_notification = response_data
-            user_profile = Profile.objects.get(user=user)
-            user_profile.is_subscribed = False
-            user_profile.save()
-            subscriber.subscription_status = "UNREGISTER"
-            subscriber.save()
+            unregistered(subscriber, response_data)
             return Response({"message": response_data}, status=response.status_code)
         except DigimartChargingSubscriberModel.DoesNotExist:
             return Response({"error": "Subscriber not found."}, status=status.HTTP_404_NOT_FOUND)
@@ -276,6 +273,8 @@ class UnsubscriptionView(APIView):
             return Response({"error": "Subscription configuration not found."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
         except requests.RequestException as e:
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except StaleSubscriptionError as e:
+            return Response({"error": str(e)}, status=status.HTTP_409_CONFLICT)
 
 
 class SubscriptionStatusView(APIView):
@@ -299,6 +298,7 @@ class SubscriptionStatusView(APIView):
         user = request.user
         try:
             response_data, response_status = get_subscriber_charging_info(user)
+            subscription_status_cache.store(user.pk, response_data, response_status)
             return Response(response_data, status=response_status)
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -306,6 +306,10 @@ class SubscriptionStatusView(APIView):
 
 #### Digimart Subscription Status Checking ####
 
+def parse_subscription_status(response_data):
+    return (response_data.get('subscriberInfo') or [{}])[0].get('subscriptionStatus', 'UNKNOWN')
+
+
 def get_subscriber_charging_info(user):
     try:
         subscriber = DigimartChargingSubscriberModel.objects.filter(user=user).last()
@@ -313,27 +317,17 @@ def get_subscriber_charging_info(user):
             return {"error": "Subscriber not found."}, status.HTTP_404_NOT_FOUND
 
         subscriber_id = subscriber.masked_msisdn
-        digimart_app = DigimartSubscription.objects.last()
+        digimart_app = digimart_config.get()
         if not digimart_app:
             return {"error": "Subscription configuration not found."}, status.HTTP_500_INTERNAL_SERVER_ERROR
 
         application_id = digimart_app.APP_ID
         app_password = digimart_app.API_Password
 
-        payload = {
-            "applicationId": application_id,
-            "password": app_password,
-            "subscriberId": f"tel:{subscriber_id}"
-        }
-        
-        headers = {
-            'Content-Type': 'application/json',
-            'X-Forwarded-For': '103.121.105.14',
-        }
-        response = requests.post('https://api.digimart.store/subscription/subscriberChargingInfo', headers=headers, json=payload)
+        response = digimart_client.subscriber_charging_info(application_id, app_password, subscriber_id)
         response_data = response.json()
         if response.status_code == 200:
-            subscription_status = response_data.get('subscriberInfo', [{}])[0].get('subscriptionStatus', 'UNKNOWN')
+            subscription_status = parse_subscription_status(response_data)
             user_profile = Profile.objects.get(user=user)
             if subscription_status == 'REGISTERED':
                 user_profile.is_subscribed = True
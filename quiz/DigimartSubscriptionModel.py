@@ -26,15 +26,51 @@ class DigimartChargingSubscriberModel(models.Model):
     ]
 
     plain_msisdn = models.TextField()
-    request_id = models.TextField()
-    masked_msisdn = models.TextField()
+    request_id = models.CharField(max_length=32, db_index=True)
+    masked_msisdn = models.CharField(max_length=128, db_index=True)
     subscription_status = models.CharField(max_length=15, choices=STATUS_CHOICES, default='UnKnown')
-    subscription_notification = models.TextField()
-    subscription_confirm_notification = models.TextField()
-    subscription_status_notification = models.TextField()
-    unSubscription_notification = models.TextField()
+    # Legacy payload columns, no longer written: callbacks are kept in DigimartNotificationEvent.
+    subscription_notification = models.TextField(blank=True, default='')
+    subscription_confirm_notification = models.TextField(blank=True, default='')
+    subscription_status_notification = models.TextField(blank=True, default='')
+    unSubscription_notification = models.TextField(blank=True, default='')
+    version = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            # Operator callbacks look subscribers up by these, rows awaiting a callback hold ''.
+            models.UniqueConstraint(fields=['request_id'], condition=~models.Q(request_id=''), name='unique_digimart_request_id'),
+            models.UniqueConstraint(fields=['masked_msisdn'], condition=~models.Q(masked_msisdn=''), name='unique_digimart_masked_msisdn'),
+        ]
 
     def __str__(self):
         return self.plain_msisdn
 
 
+
+
+class DigimartNotificationEvent(models.Model):
+    KIND_CHOICES = [
+        ('notify', 'Subscription notification'),
+        ('confirm', 'Confirmation notification'),
+        ('unregister', 'Unregistration response'),
+    ]
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    subscriber_id = models.CharField(max_length=128)
+    request_id = models.CharField(max_length=32, blank=True)
+    status = models.CharField(max_length=32, blank=True)
+    event_time = models.CharField(max_length=64, blank=True)
+    payload = models.TextField()
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    outcome = models.CharField(max_length=20, blank=True)
+
+    class Meta:
+        # Operator retries of the same callback (same timeStamp) are dropped at
+        # ingestion; a status repeated at a later time is a new event.
+        unique_together = ('kind', 'subscriber_id', 'request_id', 'status', 'event_time')
+        indexes = [models.Index(fields=['processed_at', 'id'])]
+
+    def __str__(self):
+        return f"{self.kind} {self.subscriber_id} {self.status}"
@@ -1,5 +1,7 @@
 from rest_framework import serializers
+from django.conf import settings
 from django.contrib.auth.models import User
+from .creditsLedger import apply_credit
 from .models import Profile  # Ensure you import Profile correctly based on your project structure
 
 class RegisterSerializer(serializers.ModelSerializer):
@@ -25,15 +27,12 @@ class RegisterSerializer(serializers.ModelSerializer):
             password=validated_data['password']
         )
         
-        # Add default credits during profile creation
-        profile_data['credits'] = 0
-        
         profile, created = Profile.objects.get_or_create(user=user, defaults=profile_data)
         if not created:
             # Update existing profile if it was automatically created by the signal
             for attr, value in profile_data.items():
                 setattr(profile, attr, value)
-            profile.credits += 50  # Add credits if the profile already exists
-            profile.save()
+            profile.save(update_fields=list(profile_data))
 
+        apply_credit(user, getattr(settings, 'QUIZ_SIGNUP_CREDITS', 50), 'signup')
         return user
@@ -33,9 +33,9 @@ class QuizAdminForm(forms.ModelForm):
         super(QuizAdminForm, self).__init__(*args, **kwargs)
         if self.instance.pk:
             # Decode fields for display
-            self.fields['question'].initial = base64.b64decode(self.instance._question.encode('ascii')).decode('utf-8')
-            self.fields['options'].initial = base64.b64decode(self.instance._options.encode('ascii')).decode('utf-8')
-            self.fields['correct_answer'].initial = base64.b64decode(self.instance._correct_answer.encode('ascii')).decode('utf-8')
+            self.fields['question'].initial = self.instance.question
+            self.fields['options'].initial = self.instance.options
+            self.fields['correct_answer'].initial = self.instance.correct_answer
 
     def clean_question(self):
         question = self.cleaned_data['question']
@@ -76,15 +76,21 @@ from django.urls import path
 from django.http import HttpResponseRedirect
 from django.contrib import admin, messages
 from .models import Quiz
-import pandas as pd
-import base64
+from .contentCodec import encode_text
+from .quizImporter import ImportFormatError, import_quizzes
+from .contentSearch import search
 
 class QuizAdmin(admin.ModelAdmin):
     form = QuizAdminForm
     list_display = ('decoded_question', 'decoded_options', 'decoded_correct_answer')
-    search_fields = ('decoded_question', 'decoded_correct_answer')
+    search_fields = ('search_text',)
     change_list_template = "admin/quiz_change_list.html"
 
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return queryset, False
+        return search(queryset, search_term), False
+
     def get_urls(self):
         urls = super().get_urls()
         custom_urls = [
@@ -97,17 +103,16 @@ class QuizAdmin(admin.ModelAdmin):
             form = UploadFileForm(request.POST, request.FILES)
             if form.is_valid():
                 file = request.FILES["file"]
-                df = pd.read_excel(file)
-                for _, row in df.iterrows():
-                    question = row['question']
-                    options = row['options']
-                    correct_answer = row['correct_answer']
-                    Quiz.objects.create(
-                        _question=base64.b64encode(question.encode('utf-8')).decode('ascii'),
-                        _options=base64.b64encode(options.encode('utf-8')).decode('ascii'),
-                        _correct_answer=base64.b64encode(correct_answer.encode('utf-8')).decode('ascii')
-                    )
-                self.message_user(request, "Quizzes created successfully", messages.SUCCESS)
+                try:
+                    result = import_quizzes(file, file.name)
+                except ImportFormatError as e:
+                    self.message_user(request, str(e), messages.ERROR)
+                    return HttpResponseRedirect(".")
+                self.message_user(request, f"{result.created} quizzes created successfully", messages.SUCCESS)
+                if result.errors:
+                    shown = "; ".join(f"row {number}: {message}" for number, message in result.errors[:20])
+                    more = f" (and {len(result.errors) - 20} more)" if len(result.errors) > 20 else ""
+                    self.message_user(request, f"{len(result.errors)} rows skipped: {shown}{more}", messages.WARNING)
                 return HttpResponseRedirect("../")
         else:
             form = UploadFileForm()
@@ -118,15 +123,15 @@ class QuizAdmin(admin.ModelAdmin):
         return render(request, "admin/upload_file.html", context)
 
     def decoded_question(self, obj):
-        return base64.b64decode(obj._question.encode('ascii')).decode('utf-8')
+        return obj.question
     decoded_question.short_description = 'Question'
 
     def decoded_options(self, obj):
-        return base64.b64decode(obj._options.encode('ascii')).decode('utf-8')
+        return obj.options
     decoded_options.short_description = 'Options'
 
     def decoded_correct_answer(self, obj):
-        return base64.b64decode(obj._correct_answer.encode('ascii')).decode('utf-8')
+        return obj.correct_answer
     decoded_correct_answer.short_description = 'Correct Answer'
 
 admin.site.register(Quiz, QuizAdmin)
@@ -136,11 +141,16 @@ admin.site.register(Quiz, QuizAdmin)
 @admin.register(FAQs)
 class FAQsAdmin(admin.ModelAdmin):
     list_display = ('question',)
-    search_fields = ('question', 'answer')
+    search_fields = ('search_text',)
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return queryset, False
+        return search(queryset, search_term), False
 
     def save_model(self, request, obj, form, change):
-        obj._question = base64.b64encode(obj.question.encode('utf-8')).decode('utf-8')
-        obj._answer = base64.b64encode(obj.answer.encode('utf-8')).decode('utf-8')
+        obj._question = encode_text(obj.question)
+        obj._answer = encode_text(obj.answer)
         super().save_model(request, obj, form, change)
 
 @admin.register(Slider)
@@ -178,7 +188,7 @@ admin.site.register(Spin, SpinAdmin)
 # admin.py
 
 from django.contrib import admin
-from quiz.DigimartSubscriptionModel import DigimartSubscription, DigimartChargingSubscriberModel
+from quiz.DigimartSubscriptionModel import DigimartSubscription, DigimartChargingSubscriberModel, DigimartNotificationEvent
 
 @admin.register(DigimartSubscription)
 class DigimartSubscriptionAdmin(admin.ModelAdmin):
@@ -187,5 +197,54 @@ class DigimartSubscriptionAdmin(admin.ModelAdmin):
 
 @admin.register(DigimartChargingSubscriberModel)
 class DigimartChargingSubscriberModelAdmin(admin.ModelAdmin):
-    list_display = ('plain_msisdn', 'masked_msisdn', 'subscription_status', 'subscription_notification', 'subscription_confirm_notification')
+    list_display = ('plain_msisdn', 'masked_msisdn', 'subscription_status', 'version')
     search_fields = ('plain_msisdn', 'masked_msisdn')
+
+@admin.register(DigimartNotificationEvent)
+class DigimartNotificationEventAdmin(admin.ModelAdmin):
+    list_display = ('kind', 'subscriber_id', 'request_id', 'status', 'received_at', 'processed_at', 'outcome')
+    list_filter = ('kind', 'outcome')
+    search_fields = ('subscriber_id', 'request_id')
+
+
+from .models import LeaderboardSnapshot
+
+class LeaderboardSnapshotAdmin(admin.ModelAdmin):
+    list_display = ('board', 'period', 'rank', 'user', 'score', 'taken_at')
+    list_filter = ('board', 'period')
+    search_fields = ('user__username',)
+    ordering = ('board', '-period', 'rank')
+
+admin.site.register(LeaderboardSnapshot, LeaderboardSnapshotAdmin)
+
+
+from .models import SpinPrize, SpinOutcome
+
+class SpinPrizeAdmin(admin.ModelAdmin):
+    list_display = ('gift', 'coins', 'weight', 'daily_budget', 'is_active')
+    list_editable = ('weight', 'daily_budget', 'is_active')
+    list_filter = ('is_active',)
+
+class SpinOutcomeAdmin(admin.ModelAdmin):
+    list_display = ('user', 'date', 'gift', 'coins', 'created_at')
+    list_filter = ('date',)
+    search_fields = ('user__username',)
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+admin.site.register(SpinPrize, SpinPrizeAdmin)
+admin.site.register(SpinOutcome, SpinOutcomeAdmin)
+
+
+from .models import CreditTransaction
+
+class CreditTransactionAdmin(admin.ModelAdmin):
+    list_display = ('user', 'amount', 'reason', 'reference', 'created_at')
+    list_filter = ('reason',)
+    search_fields = ('user__username', 'reference')
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+admin.site.register(CreditTransaction, CreditTransactionAdmin)
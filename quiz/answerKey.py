@@ -0,0 +1,102 @@
+import threading
+import time
+import unicodedata
+from django.conf import settings
+from .contentCodec import decode_text
+from .contentVersion import get_version
+from .quizSampler import QUIZ_VERSION_NAMESPACE
+
+
+def normalize_answer(value):
+    if not isinstance(value, str):
+        value = '' if value is None else str(value)
+    return unicodedata.normalize('NFC', value).strip()
+
+
+class AnswerKeyIndex:
+    """
+    quiz id -> normalized decoded correct answer, for result validation.
+
+    Follows the shared ``quiz`` version stamp like the quiz snapshot: saves and
+    deletes in this process are applied in place, any other bump rebuilds the
+    whole index with one two-column query.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._answers = {}
+        self._version = None
+        self._built_at = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.rebuilds = 0
+
+    @property
+    def max_age(self):
+        return getattr(settings, 'QUIZ_INDEX_MAX_AGE', 300)
+
+    def _current(self):
+        version = get_version(QUIZ_VERSION_NAMESPACE)
+        if version != self._version or time.monotonic() - self._built_at > self.max_age:
+            with self._lock:
+                if version != self._version or time.monotonic() - self._built_at > self.max_age:
+                    self._rebuild(version)
+        return self._answers
+
+    def _rebuild(self, version):
+        from .models import Quiz
+        rows = Quiz.objects.order_by().values_list('id', '_correct_answer').iterator(chunk_size=5000)
+        self._answers = {quiz_id: normalize_answer(decode_text(raw)) for quiz_id, raw in rows}
+        self._version = version
+        self._built_at = time.monotonic()
+        self.rebuilds += 1
+
+    def warm(self):
+        self._current()
+
+    def lookup(self, quiz_ids):
+        """
+        Answers for ``quiz_ids``. IDs unknown to the index are re-checked with
+        one query, in case another worker created them since the last rebuild.
+        """
+        answers = self._current()
+        found = {}
+        unknown = []
+        for quiz_id in quiz_ids:
+            answer = answers.get(quiz_id)
+            if answer is None:
+                unknown.append(quiz_id)
+            else:
+                found[quiz_id] = answer
+        self.hits += len(found)
+        self.misses += len(unknown)
+
+        if unknown:
+            from .grading import load_answer_key
+            found.update((quiz_id, normalize_answer(answer)) for quiz_id, answer in load_answer_key(unknown).items())
+        return found
+
+    def store(self, quiz, previous_version, version):
+        with self._lock:
+            if self._version != previous_version:
+                return
+            self._answers[quiz.pk] = normalize_answer(quiz.correct_answer)
+            self._version = version
+
+    def discard(self, quiz_id, previous_version, version):
+        with self._lock:
+            if self._version != previous_version:
+                return
+            self._answers.pop(quiz_id, None)
+            self._version = version
+
+    def stats(self):
+        return {
+            'size': len(self._answers),
+            'hits': self.hits,
+            'misses': self.misses,
+            'rebuilds': self.rebuilds,
+        }
+
+
+answer_key_index = AnswerKeyIndex()
@@ -9,3 +9,19 @@ class QuizConfig(AppConfig):
     def ready(self):
         import quiz.signals
 
+        from django.conf import settings
+        if getattr(settings, 'QUIZ_WARM_ANSWER_KEY', False):
+            import threading
+            threading.Thread(target=self.warm_answer_key, daemon=True).start()
+
+    def warm_answer_key(self):
+        from django.db import DatabaseError, connection
+        from quiz.answerKey import answer_key_index
+        try:
+            answer_key_index.warm()
+        except DatabaseError:
+            # Tables may not exist yet, e.g. while running migrate.
+            pass
+        finally:
+            connection.close()
+
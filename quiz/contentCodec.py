@@ -0,0 +1,86 @@
+import base64
+import threading
+from collections import OrderedDict
+from django.conf import settings
+
+
+def encode_text(value):
+    try:
+        return base64.b64encode(value.encode('utf-8')).decode('ascii')
+    except UnicodeEncodeError:
+        return value
+
+
+def decode_text(raw):
+    try:
+        return base64.b64decode(raw.encode('ascii')).decode('utf-8')
+    except (ValueError, UnicodeEncodeError, base64.binascii.Error):
+        return raw
+
+
+class DecodedLRU:
+    """Process-wide LRU of decoded values keyed by (pk, field, hash(raw))."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def maxsize(self):
+        return getattr(settings, 'QUIZ_DECODE_CACHE_SIZE', 0)
+
+    def decode(self, pk, field, raw):
+        maxsize = self.maxsize
+        if maxsize <= 0 or pk is None:
+            return decode_text(raw)
+
+        key = (pk, field, hash(raw))
+        with self._lock:
+            decoded = self._entries.get(key)
+            if decoded is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return decoded
+            self.misses += 1
+
+        decoded = decode_text(raw)
+        with self._lock:
+            self._entries[key] = decoded
+            while len(self._entries) > maxsize:
+                self._entries.popitem(last=False)
+        return decoded
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+
+decoded_lru = DecodedLRU()
+
+
+def encoded_property(raw_attr):
+    """
+    Expose a base64 column as plaintext. The decoded value is memoized on the
+    instance (and in ``decoded_lru``) until the raw column changes.
+    """
+    field = raw_attr.lstrip('_')
+
+    def getter(instance):
+        raw = getattr(instance, raw_attr)
+        memo = instance.__dict__.setdefault('_decoded', {})
+        cached = memo.get(raw_attr)
+        if cached is not None and cached[0] is raw:
+            return cached[1]
+        decoded = decoded_lru.decode(instance.pk, field, raw)
+        memo[raw_attr] = (raw, decoded)
+        return decoded
+
+    def setter(instance, value):
+        raw = encode_text(value)
+        setattr(instance, raw_attr, raw)
+        instance.__dict__.setdefault('_decoded', {})[raw_attr] = (raw, value)
+
+    return property(getter, setter)
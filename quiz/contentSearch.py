@@ -0,0 +1,101 @@
+import re
+import unicodedata
+from django.db import connection
+from django.db.models.expressions import RawSQL
+from .contentVersion import bump_version, get_version
+
+
+_WHITESPACE = re.compile(r'\s+')
+
+# Trigram indexes cannot answer queries shorter than three characters.
+MIN_INDEXED_TOKEN = 3
+
+
+def normalize_search_text(*parts):
+    """Plaintext for the ``search_text`` shadow columns: NFKC, casefolded, single spaces."""
+    text = ' '.join(part for part in parts if part)
+    return _WHITESPACE.sub(' ', unicodedata.normalize('NFKC', text).casefold()).strip()
+
+
+def search_tokens(query):
+    return normalize_search_text(query or '').split()
+
+
+def _fts_table(model):
+    return f"{model._meta.db_table}_fts"
+
+
+# Whether each FTS table exists, per process, valid while the stamp is unchanged.
+# install_search_index bumps the stamp so every worker re-checks on its next search.
+SEARCH_INDEX_VERSION_NAMESPACE = 'search_index'
+_fts_tables = {}
+
+
+def _has_fts(model):
+    table = _fts_table(model)
+    version = get_version(SEARCH_INDEX_VERSION_NAMESPACE)
+    cached = _fts_tables.get(table)
+    if cached is None or cached[0] != version:
+        cached = _fts_tables[table] = (version, table in connection.introspection.table_names())
+    return cached[1]
+
+
+def search(queryset, query):
+    """
+    Filter ``queryset`` to rows whose ``search_text`` contains every token of
+    ``query``. On SQLite the FTS5 trigram table from ``install_search_index``
+    answers the lookup when present; on PostgreSQL the LIKE filters below use
+    the pg_trgm GIN index.
+    """
+    tokens = search_tokens(query)
+    if not tokens:
+        return queryset.none()
+
+    model = queryset.model
+    if connection.vendor == 'sqlite' and _has_fts(model) and all(len(token) >= MIN_INDEXED_TOKEN for token in tokens):
+        table = _fts_table(model)
+        match = ' '.join('"{}"'.format(token.replace('"', '""')) for token in tokens)
+        return queryset.filter(id__in=RawSQL(f"SELECT rowid FROM {table} WHERE {table} MATCH %s", [match]))
+
+    for token in tokens:
+        queryset = queryset.filter(search_text__contains=token)
+    return queryset
+
+
+def install_search_index(model):
+    """
+    Create the database-side index over ``model.search_text``: an FTS5 trigram
+    table kept in sync by triggers on SQLite, a pg_trgm GIN index on
+    PostgreSQL. Other backends fall back to plain LIKE scans.
+    """
+    quote = connection.ops.quote_name
+    table = model._meta.db_table
+    column = model._meta.get_field('search_text').column
+    pk = model._meta.pk.column
+
+    if connection.vendor == 'sqlite':
+        fts = _fts_table(model)
+        statements = [
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {quote(fts)} USING fts5({column}, content={quote(table)}, content_rowid={quote(pk)}, tokenize='trigram')",
+            f"CREATE TRIGGER IF NOT EXISTS {quote(fts + '_ai')} AFTER INSERT ON {quote(table)} BEGIN "
+            f"INSERT INTO {quote(fts)}(rowid, {column}) VALUES (new.{pk}, new.{column}); END",
+            f"CREATE TRIGGER IF NOT EXISTS {quote(fts + '_ad')} AFTER DELETE ON {quote(table)} BEGIN "
+            f"INSERT INTO {quote(fts)}({quote(fts)}, rowid, {column}) VALUES ('delete', old.{pk}, old.{column}); END",
+            f"CREATE TRIGGER IF NOT EXISTS {quote(fts + '_au')} AFTER UPDATE OF {column} ON {quote(table)} BEGIN "
+            f"INSERT INTO {quote(fts)}({quote(fts)}, rowid, {column}) VALUES ('delete', old.{pk}, old.{column}); "
+            f"INSERT INTO {quote(fts)}(rowid, {column}) VALUES (new.{pk}, new.{column}); END",
+            f"INSERT INTO {quote(fts)}({quote(fts)}) VALUES ('rebuild')",
+        ]
+    elif connection.vendor == 'postgresql':
+        statements = [
+            "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+            f"CREATE INDEX IF NOT EXISTS {quote(table + '_search_trgm')} ON {quote(table)} USING gin ({quote(column)} gin_trgm_ops)",
+        ]
+    else:
+        return False
+
+    with connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+    bump_version(SEARCH_INDEX_VERSION_NAMESPACE)
+    return True
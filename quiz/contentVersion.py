@@ -0,0 +1,33 @@
+import uuid
+from django.conf import settings
+from django.core.cache import caches
+
+
+# Version stamps live in the QUIZ_VERSION_CACHE_ALIAS cache, which must be
+# shared by every worker (a file cache on one host, redis/memcached across
+# hosts) so a change made by one worker reaches the others on their next read.
+# A local-memory alias makes stamps per process. Pass ``cache`` to keep a
+# stamp next to the entries it guards.
+
+def stamp_cache():
+    return caches[getattr(settings, 'QUIZ_VERSION_CACHE_ALIAS', 'default')]
+
+def _key(namespace):
+    return f"quiz:version:{namespace}"
+
+
+def get_version(namespace, cache=None):
+    cache = cache or stamp_cache()
+    version = cache.get(_key(namespace))
+    if version is None:
+        version = uuid.uuid4().hex
+        if not cache.add(_key(namespace), version, timeout=None):
+            version = cache.get(_key(namespace), version)
+    return version
+
+
+def bump_version(namespace, cache=None):
+    cache = cache or stamp_cache()
+    version = uuid.uuid4().hex
+    cache.set(_key(namespace), version, timeout=None)
+    return version
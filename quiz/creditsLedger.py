@@ -0,0 +1,54 @@
+from collections import defaultdict, namedtuple
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from .models import CreditTransaction, Profile
+from .principalCache import principal_cache
+
+
+Credit = namedtuple('Credit', ['user_id', 'amount', 'reason', 'reference'])
+
+OPENING = 'opening'
+
+
+def opening_entry(user_id, amount=0):
+    """
+    The first entry of a profile's ledger: the balance it had before the ledger
+    existed. New profiles open at 0, existing ones through ``verify_credits
+    --open-balances``. Balances are only checked against ledgers that have one.
+    """
+    return CreditTransaction(user_id=user_id, amount=amount, reason='snapshot', reference=OPENING)
+
+
+def apply_credits(credits):
+    """
+    Append ``Credit`` entries to the ledger with one bulk insert and move the
+    cached Profile.credits balances by the same amounts with one UPDATE, in a
+    single transaction. The UPDATE sends no signals, so the affected principals
+    are invalidated explicitly.
+    """
+    credits = [credit for credit in credits if credit.amount]
+    if not credits:
+        return
+
+    totals = defaultdict(int)
+    for credit in credits:
+        totals[credit.user_id] += credit.amount
+
+    with transaction.atomic():
+        CreditTransaction.objects.bulk_create([
+            CreditTransaction(user_id=credit.user_id, amount=credit.amount, reason=credit.reason, reference=credit.reference or '')
+            for credit in credits
+        ])
+        if len(totals) == 1:
+            (user_id, total), = totals.items()
+            delta = Value(total)
+        else:
+            delta = Case(*[When(user_id=user_id, then=Value(total)) for user_id, total in totals.items()], output_field=IntegerField())
+        Profile.objects.filter(user_id__in=totals).update(credits=F('credits') + delta)
+        principal_cache.invalidate_on_commit(totals)
+
+
+def apply_credit(user, amount, reason, reference=''):
+    """Ledger one credit change for ``user`` (a User or user id)."""
+    user_id = getattr(user, 'pk', user)
+    apply_credits([Credit(user_id, amount, reason, str(reference))])
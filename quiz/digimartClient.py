@@ -0,0 +1,349 @@
+import asyncio
+import bisect
+import random
+import threading
+import time
+import weakref
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+from django.conf import settings
+
+
+class CircuitOpenError(requests.RequestException):
+    """Raised without touching the network while Digimart is considered down."""
+
+
+class CircuitBreaker:
+    """
+    Opens after DIGIMART_BREAKER_FAILURES consecutive failed calls and fails
+    fast for DIGIMART_BREAKER_RESET seconds, then lets one trial call through.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at < getattr(settings, 'DIGIMART_BREAKER_RESET', 30):
+            return 'open'
+        return 'half-open'
+
+    def before_call(self):
+        with self._lock:
+            state = self.state
+            if state == 'open' or (state == 'half-open' and self._trial_running):
+                raise CircuitOpenError("Digimart circuit is open, failing fast.")
+            if state == 'half-open':
+                self._trial_running = True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_running = False
+
+    def release(self):
+        """End a call that recorded no outcome (cancelled, unexpected error) so a trial can run again."""
+        with self._lock:
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_running = False
+            if self.opened_at is not None or self.failures >= getattr(settings, 'DIGIMART_BREAKER_FAILURES', 5):
+                self.opened_at = time.monotonic()
+
+
+class LatencyHistogram:
+    """Cumulative per-endpoint latency counts in fixed buckets (seconds)."""
+
+    BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float('inf'))
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {}
+        self._sums = {}
+
+    def observe(self, endpoint, seconds):
+        index = bisect.bisect_left(self.BUCKETS, seconds)
+        with self._lock:
+            counts = self._counts.setdefault(endpoint, [0] * len(self.BUCKETS))
+            counts[index] += 1
+            self._sums[endpoint] = self._sums.get(endpoint, 0.0) + seconds
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                endpoint: {
+                    'count': sum(counts),
+                    'sum': self._sums[endpoint],
+                    'buckets': dict(zip(self.BUCKETS, counts)),
+                }
+                for endpoint, counts in self._counts.items()
+            }
+
+
+def _never_sent(error):
+    # Connection refused or connect timeout: the request never reached Digimart.
+    reason = getattr(error.args[0], 'reason', None) if error.args else None
+    return isinstance(error, requests.ConnectTimeout) or isinstance(reason, NewConnectionError)
+
+
+class DigimartCall:
+    """
+    Retry and breaker bookkeeping for one logical call, shared by the sync and
+    async clients; they only differ in how they send and sleep. Clients call
+    ``release`` on every exit so a cancelled half-open trial frees the breaker.
+
+    Connection errors, timeouts and 502/503/504 responses are retried up to
+    DIGIMART_MAX_RETRIES times with full-jitter backoff. Non-idempotent calls
+    (unregistration) are only retried when the request was never sent.
+    """
+
+    RETRY_STATUSES = (502, 503, 504)
+
+    def __init__(self, client, path, idempotent=True):
+        client.breaker.before_call()
+        self.client = client
+        self.path = path
+        self.idempotent = idempotent
+        self.retries = getattr(settings, 'DIGIMART_MAX_RETRIES', 2)
+        self.attempt = 0
+        self.started = time.monotonic()
+        self.settled = False
+
+    def _retry_delay(self, retry):
+        if not retry or self.attempt >= self.retries:
+            return None
+        base = getattr(settings, 'DIGIMART_RETRY_BACKOFF', 0.2)
+        delay = random.uniform(0, base * (2 ** self.attempt))
+        self.attempt += 1
+        return delay
+
+    def failed(self, never_sent):
+        """Seconds to wait before retrying a network failure, or None to give up."""
+        self.client.latency.observe(self.path, time.monotonic() - self.started)
+        delay = self._retry_delay(never_sent or self.idempotent)
+        if delay is None:
+            self.error()
+        return delay
+
+    def error(self):
+        """A failure that is not retried."""
+        self.settled = True
+        self.client.breaker.record_failure()
+
+    def responded(self, status_code):
+        """Seconds to wait before retrying this response, or None to return it."""
+        self.client.latency.observe(self.path, time.monotonic() - self.started)
+        delay = self._retry_delay(self.idempotent and status_code in self.RETRY_STATUSES)
+        if delay is None:
+            self.settled = True
+            if status_code >= 500:
+                self.client.breaker.record_failure()
+            else:
+                self.client.breaker.record_success()
+        return delay
+
+    def release(self):
+        if not self.settled:
+            self.client.breaker.release()
+
+
+class DigimartClient:
+    """
+    Shared client for the Digimart API: a pooled keep-alive session with
+    connect/read timeouts, the retries of DigimartCall, a circuit breaker and
+    latency histograms.
+
+    The base URL comes from DIGIMART_API_BASE_URL so tests can point it at a
+    local stub server.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._session = None
+        self.breaker = CircuitBreaker()
+        self.latency = LatencyHistogram()
+
+    @property
+    def session(self):
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    session = requests.Session()
+                    pool_size = getattr(settings, 'DIGIMART_POOL_SIZE', 20)
+                    adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_size, max_retries=0)
+                    session.mount('https://', adapter)
+                    session.mount('http://', adapter)
+                    self._session = session
+        return self._session
+
+    @property
+    def base_url(self):
+        return getattr(settings, 'DIGIMART_API_BASE_URL', 'https://api.digimart.store').rstrip('/')
+
+    @property
+    def timeout(self):
+        return (getattr(settings, 'DIGIMART_CONNECT_TIMEOUT', 3), getattr(settings, 'DIGIMART_READ_TIMEOUT', 10))
+
+    def post(self, path, payload, headers=None, idempotent=True):
+        call = DigimartCall(self, path, idempotent)
+        url = f"{self.base_url}{path}"
+
+        try:
+            while True:
+                call.started = time.monotonic()
+                try:
+                    response = self.session.post(url, json=payload, headers=headers, timeout=self.timeout)
+                except (requests.ConnectionError, requests.Timeout) as e:
+                    delay = call.failed(_never_sent(e))
+                    if delay is None:
+                        raise
+                    time.sleep(delay)
+                    continue
+                except requests.RequestException:
+                    call.error()
+                    raise
+
+                delay = call.responded(response.status_code)
+                if delay is None:
+                    return response
+                time.sleep(delay)
+        finally:
+            call.release()
+
+    def subscriber_charging_info(self, application_id, password, subscriber_id):
+        return self.post(*charging_info_request(application_id, password, subscriber_id))
+
+    def unregister(self, application_id, password, subscriber_id):
+        return self.post(*unregister_request(application_id, password, subscriber_id), idempotent=False)
+
+
+def charging_info_request(application_id, password, subscriber_id):
+    payload = {
+        "applicationId": application_id,
+        "password": password,
+        "subscriberId": f"tel:{subscriber_id}"
+    }
+    headers = {
+        'Content-Type': 'application/json',
+        'X-Forwarded-For': '103.121.105.14',
+    }
+    return '/subscription/subscriberChargingInfo', payload, headers
+
+
+def unregister_request(application_id, password, subscriber_id):
+    payload = {
+        "applicationId": application_id,
+        "password": password,
+        "subscriberId": f"tel:{subscriber_id}",
+        "action": '0'
+    }
+    return '/subs/unregistration', payload, None
+
+
+class _Shard:
+    def __init__(self, session, size):
+        self.session = session
+        self.slots = asyncio.Semaphore(size)
+        self.in_flight = 0
+
+
+class AsyncDigimartClient:
+    """
+    asyncio counterpart of DigimartClient for the async views, built on httpx.
+    Timeouts, the circuit breaker and the latency histograms are shared with
+    the wrapped sync client, retries follow the same DigimartCall, and network
+    failures are raised as ``requests`` exceptions so callers handle both alike.
+
+    httpcore rescans every queued request against every pooled connection on
+    each state change, which turns quadratic at thousands of in-flight calls.
+    Connections are therefore split over small pools of DIGIMART_POOL_SIZE,
+    each gated by a semaphore so httpcore itself never queues.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self.breaker = client.breaker
+        self.latency = client.latency
+        # httpx connections belong to the event loop that opened them.
+        self._shards = weakref.WeakKeyDictionary()
+
+    def shards(self):
+        import httpx
+        loop = asyncio.get_running_loop()
+        shards = self._shards.get(loop)
+        if shards is None:
+            connect_timeout, read_timeout = self.client.timeout
+            size = getattr(settings, 'DIGIMART_POOL_SIZE', 20)
+            count = -(-getattr(settings, 'DIGIMART_ASYNC_MAX_CONNECTIONS', 1000) // size)
+            ssl_context = httpx.create_ssl_context()
+            shards = self._shards[loop] = [
+                _Shard(httpx.AsyncClient(
+                    verify=ssl_context,
+                    timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+                    limits=httpx.Limits(max_connections=size, max_keepalive_connections=size),
+                ), size)
+                for _ in range(count)
+            ]
+        return shards
+
+    async def _send(self, url, payload, headers):
+        shard = min(self.shards(), key=lambda shard: shard.in_flight)
+        shard.in_flight += 1
+        try:
+            async with shard.slots:
+                return await shard.session.post(url, json=payload, headers=headers)
+        finally:
+            shard.in_flight -= 1
+
+    async def aclose(self):
+        for shard in self._shards.pop(asyncio.get_running_loop(), []):
+            await shard.session.aclose()
+
+    async def post(self, path, payload, headers=None, idempotent=True):
+        import httpx
+        call = DigimartCall(self.client, path, idempotent)
+        url = f"{self.client.base_url}{path}"
+
+        try:
+            while True:
+                call.started = time.monotonic()
+                try:
+                    response = await self._send(url, payload, headers)
+                except (httpx.TimeoutException, httpx.NetworkError) as e:
+                    delay = call.failed(isinstance(e, (httpx.ConnectError, httpx.ConnectTimeout)))
+                    if delay is None:
+                        error = requests.Timeout if isinstance(e, httpx.TimeoutException) else requests.ConnectionError
+                        raise error(str(e) or type(e).__name__) from e
+                    await asyncio.sleep(delay)
+                    continue
+                except httpx.HTTPError as e:
+                    call.error()
+                    raise requests.RequestException(str(e) or type(e).__name__) from e
+
+                delay = call.responded(response.status_code)
+                if delay is None:
+                    return response
+                await asyncio.sleep(delay)
+        finally:
+            # Cancellation (a client disconnect under ASGI) lands here without an outcome.
+            call.release()
+
+    async def subscriber_charging_info(self, application_id, password, subscriber_id):
+        return await self.post(*charging_info_request(application_id, password, subscriber_id))
+
+    async def unregister(self, application_id, password, subscriber_id):
+        return await self.post(*unregister_request(application_id, password, subscriber_id), idempotent=False)
+
+
+digimart_client = DigimartClient()
+digimart_async_client = AsyncDigimartClient(digimart_client)
@@ -0,0 +1,76 @@
+import hashlib
+import threading
+import time
+from django.conf import settings
+from .contentVersion import get_version, bump_version
+
+
+DIGIMART_CONFIG_VERSION_NAMESPACE = 'digimart_config'
+
+
+class DigimartConfig:
+    """
+    Read-only copy of the DigimartSubscription row with the signing material
+    prepared once: the ``API_Key|`` prefix is already fed into a sha512 state
+    that ``sign`` copies instead of hashing the key again.
+    """
+
+    __slots__ = ('APP_ID', 'API_Key', 'API_Secret', 'API_Password', 'redirect_URL', '_prefix', '_suffix')
+
+    def __init__(self, subscription):
+        self.APP_ID = subscription.APP_ID
+        self.API_Key = subscription.API_Key
+        self.API_Secret = subscription.API_Secret
+        self.API_Password = subscription.API_Password
+        self.redirect_URL = subscription.redirect_URL
+        self._prefix = hashlib.sha512(f'{self.API_Key}|'.encode())
+        self._suffix = f'|{self.API_Secret}'.encode()
+
+    def sign(self, request_time):
+        """sha512 hex digest of ``API_Key|request_time|API_Secret``."""
+        digest = self._prefix.copy()
+        digest.update(request_time.encode())
+        digest.update(self._suffix)
+        return digest.hexdigest()
+
+
+class DigimartConfigCache:
+    """
+    Process-local DigimartSubscription configuration. Reloaded when the shared
+    ``digimart_config`` version stamp changes (bumped by the DigimartSubscription
+    signals) or after DIGIMART_CONFIG_MAX_AGE seconds. A missing configuration
+    is cached as well.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._config = None
+        self._version = None
+        self._loaded_at = 0.0
+
+    @property
+    def max_age(self):
+        return getattr(settings, 'DIGIMART_CONFIG_MAX_AGE', 300)
+
+    def get(self):
+        version = get_version(DIGIMART_CONFIG_VERSION_NAMESPACE)
+        if version != self._version or time.monotonic() - self._loaded_at > self.max_age:
+            with self._lock:
+                if version != self._version or time.monotonic() - self._loaded_at > self.max_age:
+                    self._load(version)
+        return self._config
+
+    def _load(self, version):
+        from .DigimartSubscriptionModel import DigimartSubscription
+        subscription = DigimartSubscription.objects.last()  # Assuming only one record
+        self._config = DigimartConfig(subscription) if subscription else None
+        self._version = version
+        self._loaded_at = time.monotonic()
+
+    def invalidate(self):
+        with self._lock:
+            self._version = None
+        bump_version(DIGIMART_CONFIG_VERSION_NAMESPACE)
+
+
+digimart_config = DigimartConfigCache()
@@ -0,0 +1,144 @@
+import json
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from .DigimartSubscriptionModel import DigimartChargingSubscriberModel, DigimartNotificationEvent
+
+
+def fast_ack_enabled():
+    return getattr(settings, 'DIGIMART_WEBHOOK_FAST_ACK', False)
+
+
+def _max_length(field):
+    return DigimartNotificationEvent._meta.get_field(field).max_length
+
+
+def id_length_error(subscriber_id, request_id=''):
+    """Message for a callback whose ids do not fit the event columns, or None."""
+    for field, param, value in (('subscriber_id', 'subscriberId', subscriber_id), ('request_id', 'requestId', request_id)):
+        if value and len(value) > _max_length(field):
+            return f"{param} must be at most {_max_length(field)} characters"
+    return None
+
+
+def ingest(kind, payload, subscriber_id, request_id='', status='', event_time='', processed=False):
+    """
+    Append a webhook call to the event table. Exact retries of the same
+    callback, which carry the same timeStamp, hit the unique key and are
+    dropped without an error; the same status sent again at a later time is
+    kept as a new event. Calls the views already applied inline are stored
+    with ``processed=True``.
+
+    Views reject ids longer than their columns with ``id_length_error``;
+    status and event time are cut to fit, the payload keeps them whole.
+    """
+    DigimartNotificationEvent.objects.bulk_create([
+        DigimartNotificationEvent(
+            kind=kind,
+            subscriber_id=subscriber_id,
+            request_id=request_id or '',
+            status=(status or '')[:_max_length('status')],
+            event_time=(event_time or '')[:_max_length('event_time')],
+            payload=json.dumps(payload),
+            processed_at=timezone.now() if processed else None,
+            outcome='applied' if processed else '',
+        )
+    ], ignore_conflicts=True)
+
+
+def prune_processed(batch_size=500):
+    """
+    Delete up to ``batch_size`` events processed more than
+    DIGIMART_EVENT_RETENTION_DAYS ago; None keeps them forever.
+    """
+    days = getattr(settings, 'DIGIMART_EVENT_RETENTION_DAYS', 30)
+    if days is None:
+        return 0
+    expired = (
+        DigimartNotificationEvent.objects
+        .filter(processed_at__lt=timezone.now() - timedelta(days=days))
+        .order_by('processed_at', 'id')
+        .values_list('id', flat=True)[:batch_size]
+    )
+    return DigimartNotificationEvent.objects.filter(id__in=list(expired)).delete()[0]
+
+
+def process_pending(batch_size=500):
+    """
+    Apply up to ``batch_size`` unprocessed events in arrival order and mark
+    them processed, then prune as many expired ones. Subscribers are loaded
+    and written back in bulk; returns the number of events handled.
+    """
+    handled = _apply_pending(batch_size)
+    prune_processed(batch_size)
+    return handled
+
+
+def _apply_pending(batch_size):
+    with transaction.atomic():
+        events = list(
+            DigimartNotificationEvent.objects
+            .select_for_update(skip_locked=True)
+            .filter(processed_at__isnull=True)
+            .order_by('id')[:batch_size]
+        )
+        if not events:
+            return 0
+
+        request_ids = {event.request_id for event in events if event.kind == 'notify'}
+        masked_ids = {event.subscriber_id for event in events}
+        subscribers = (
+            DigimartChargingSubscriberModel.objects
+            .select_for_update()
+            .filter(Q(request_id__in=request_ids) | Q(masked_msisdn__in=masked_ids))
+        )
+        by_request = {}
+        by_masked = {}
+        for subscriber in subscribers.only('id', 'request_id', 'masked_msisdn', 'subscription_status', 'version'):
+            if subscriber.request_id:
+                by_request[subscriber.request_id] = subscriber
+            if subscriber.masked_msisdn:
+                by_masked[subscriber.masked_msisdn] = subscriber
+
+        dirty = {}
+        moved = set()
+        now = timezone.now()
+        for event in events:
+            if event.kind == 'notify':
+                subscriber = by_request.get(event.request_id)
+                if subscriber is not None:
+                    holder = by_masked.get(event.subscriber_id)
+                    if holder is not None and holder.pk != subscriber.pk:
+                        # The number moved over from another account.
+                        holder.masked_msisdn = ''
+                        dirty[holder.pk] = holder
+                    if subscriber.masked_msisdn != event.subscriber_id:
+                        by_masked.pop(subscriber.masked_msisdn, None)
+                        moved.add(subscriber.pk)
+                        subscriber.masked_msisdn = event.subscriber_id
+                        dirty[subscriber.pk] = subscriber
+                    if event.status == "S1000" and subscriber.subscription_status != "Registered":
+                        subscriber.subscription_status = "Registered"
+                        dirty[subscriber.pk] = subscriber
+                    by_masked[subscriber.masked_msisdn] = subscriber
+            else:
+                # Confirmations only add to the history kept in this table.
+                subscriber = by_masked.get(event.subscriber_id)
+
+            event.processed_at = now
+            event.outcome = 'applied' if subscriber is not None else 'not_found'
+
+        # Free the numbers first so the unique masked_msisdn constraint holds
+        # while the batch is written back.
+        released = moved | {pk for pk, subscriber in dirty.items() if not subscriber.masked_msisdn}
+        if released:
+            DigimartChargingSubscriberModel.objects.filter(pk__in=released).update(masked_msisdn='')
+        for subscriber in dirty.values():
+            subscriber.version += 1
+        DigimartChargingSubscriberModel.objects.bulk_update(
+            list(dirty.values()), ['masked_msisdn', 'subscription_status', 'version'], batch_size=batch_size
+        )
+        DigimartNotificationEvent.objects.bulk_update(events, ['processed_at', 'outcome'], batch_size=batch_size)
+    return len(events)
@@ -0,0 +1,43 @@
+from collections import namedtuple
+from .contentCodec import decode_text
+from .models import Quiz
+from .answerKey import answer_key_index, normalize_answer
+
+
+GradeResult = namedtuple('GradeResult', ['correct_answers', 'wrong_answers', 'missing_ids'])
+
+
+def _as_quiz_id(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def load_answer_key(quiz_ids):
+    """Decoded correct answers for ``quiz_ids``, fetched with a single query."""
+    rows = Quiz.objects.filter(id__in=quiz_ids).values_list('id', '_correct_answer')
+    return {quiz_id: decode_text(raw) for quiz_id, raw in rows}
+
+
+def grade_answers(quiz_ids, user_answers):
+    """
+    Grade a round in one pass against the in-memory answer key. Every unknown
+    quiz ID is collected in ``missing_ids`` instead of stopping at the first one.
+    """
+    parsed_ids = [_as_quiz_id(quiz_id) for quiz_id in quiz_ids]
+    answer_key = answer_key_index.lookup({quiz_id for quiz_id in parsed_ids if quiz_id is not None})
+
+    correct_answers = 0
+    wrong_answers = 0
+    missing_ids = []
+    for raw_id, quiz_id, user_answer in zip(quiz_ids, parsed_ids, user_answers):
+        correct_answer = answer_key.get(quiz_id)
+        if correct_answer is None:
+            missing_ids.append(raw_id)
+        elif correct_answer == normalize_answer(user_answer):
+            correct_answers += 1
+        else:
+            wrong_answers += 1
+
+    return GradeResult(correct_answers, wrong_answers, missing_ids)
@@ -0,0 +1,69 @@
+import hashlib
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse, HttpResponseNotModified
+from rest_framework.renderers import JSONRenderer
+from .contentVersion import bump_version, get_version
+
+
+FAQS_VERSION_NAMESPACE = 'faqs'
+SLIDERS_VERSION_NAMESPACE = 'sliders'
+
+
+def response_cache():
+    return caches[getattr(settings, 'QUIZ_HTTP_CACHE_ALIAS', 'default')]
+
+
+def content_changed(namespace):
+    """Bump the stamp kept in the response cache, called on commit by the model signals."""
+    bump_version(namespace, response_cache())
+
+
+class VersionedResponseCacheMixin:
+    """
+    Serve a list endpoint from rendered JSON cached per content version.
+
+    The entry key holds the ``cache_namespace`` version stamp, stored in the
+    same QUIZ_HTTP_CACHE_ALIAS cache as the entries, so a change makes old
+    entries unreachable for every process that shares that cache. The alias
+    must be shared by all workers (the 'http' file cache by default): with a
+    local-memory cache each worker only answers 304s for entries it built
+    itself and picks up another worker's change once QUIZ_HTTP_CACHE_TIMEOUT
+    expires the entry. Each entry keeps a strong content-hash ETag, identical
+    across workers and rebuilds of the same content; If-None-Match requests
+    that still match get a 304 without touching the database.
+    """
+    cache_namespace = None
+
+    def _cache_key(self, request, version):
+        # Absolute URLs in the payload depend on scheme and host, pages on the query string.
+        variant = hashlib.sha1(f"{request.scheme}://{request.get_host()}{request.get_full_path()}".encode()).hexdigest()
+        return f"quiz:http:{self.cache_namespace}:{version}:{variant}"
+
+    def _not_modified(self, request, etag):
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        if if_none_match is None:
+            return False
+        return if_none_match.strip() == '*' or etag in [tag.strip() for tag in if_none_match.split(',')]
+
+    def _respond(self, response, etag):
+        response['ETag'] = etag
+        response['Cache-Control'] = f"public, max-age={getattr(settings, 'QUIZ_HTTP_CACHE_MAX_AGE', 60)}"
+        return response
+
+    def list(self, request, *args, **kwargs):
+        cache = response_cache()
+        key = self._cache_key(request, get_version(self.cache_namespace, cache))
+        entry = cache.get(key)
+        if entry is None:
+            response = super().list(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            body = JSONRenderer().render(response.data)
+            entry = (f'"{hashlib.sha256(body).hexdigest()}"', body)
+            cache.set(key, entry, timeout=getattr(settings, 'QUIZ_HTTP_CACHE_TIMEOUT', 300))
+
+        etag, body = entry
+        if self._not_modified(request, etag):
+            return self._respond(HttpResponseNotModified(), etag)
+        return self._respond(HttpResponse(body, content_type='application/json'), etag)
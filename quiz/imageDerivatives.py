@@ -0,0 +1,124 @@
+import hashlib
+import io
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection
+from PIL import Image, ImageOps
+from .httpCache import SLIDERS_VERSION_NAMESPACE, content_changed
+
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPES = {'webp': 'image/webp', 'jpeg': 'image/jpeg'}
+
+DERIVED_DIR = 'sliders/derived'
+
+
+def _encode(image, width, image_format, quality):
+    resized = image
+    if image.width > width:
+        resized = image.resize((width, round(image.height * width / image.width)), Image.LANCZOS)
+    if image_format == 'jpeg' and resized.mode not in ('RGB', 'L'):
+        resized = resized.convert('RGB')
+    buffer = io.BytesIO()
+    resized.save(buffer, format=image_format.upper(), quality=quality, optimize=True)
+    return resized.width, buffer.getvalue()
+
+
+def render_variants(source_name):
+    """
+    Encode ``source_name`` at every QUIZ_SLIDER_WIDTHS width not wider than
+    the original, in each QUIZ_SLIDER_FORMATS format. Files are named after a
+    hash of their bytes, so they never change and can be cached as immutable.
+    """
+    widths = sorted(getattr(settings, 'QUIZ_SLIDER_WIDTHS', (480, 960, 1440)))
+    formats = getattr(settings, 'QUIZ_SLIDER_FORMATS', ('webp', 'jpeg'))
+    quality = getattr(settings, 'QUIZ_SLIDER_QUALITY', 80)
+    stem = os.path.splitext(os.path.basename(source_name))[0]
+
+    with default_storage.open(source_name, 'rb') as source:
+        image = ImageOps.exif_transpose(Image.open(source))
+        image.load()
+
+    # Never upscale; an image narrower than every width gets one set at its own size.
+    targets = [width for width in widths if width <= image.width] or [image.width]
+    images = []
+    for width in targets:
+        for image_format in formats:
+            actual_width, data = _encode(image, width, image_format, quality)
+            digest = hashlib.sha256(data).hexdigest()[:16]
+            extension = 'jpg' if image_format == 'jpeg' else image_format
+            name = f"{DERIVED_DIR}/{stem}-{actual_width}w-{digest}.{extension}"
+            if not default_storage.exists(name):
+                name = default_storage.save(name, ContentFile(data))
+            images.append({'name': name, 'width': actual_width, 'format': image_format, 'bytes': len(data)})
+    return {'source': source_name, 'images': images}
+
+
+def delete_unused(names):
+    """Delete derived files no slider refers to any more; identical images share files."""
+    from .models import Slider
+    if not names:
+        return
+    used = {
+        image['name']
+        for variants in Slider.objects.values_list('variants', flat=True)
+        for image in variants.get('images', [])
+    }
+    for name in set(names) - used:
+        default_storage.delete(name)
+
+
+def generate(slider_id, force=False):
+    """Build the variants of one slider and store them without re-saving the row."""
+    from .models import Slider
+    slider = Slider.objects.filter(pk=slider_id).only('id', 'image', 'variants').first()
+    if slider is None or not slider.image:
+        return None
+    if not force and slider.variants.get('source') == slider.image.name:
+        return slider.variants
+
+    variants = render_variants(slider.image.name)
+    # Only write if the image was not replaced while we were encoding.
+    if Slider.objects.filter(pk=slider_id, image=slider.image.name).update(variants=variants):
+        delete_unused([image['name'] for image in slider.variants.get('images', [])])
+        content_changed(SLIDERS_VERSION_NAMESPACE)
+    return variants
+
+
+class DerivativeWorker:
+    """Small thread pool that builds slider variants off the request path."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def _pool(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=getattr(settings, 'QUIZ_IMAGE_WORKERS', 2),
+                        thread_name_prefix='slider-images',
+                    )
+        return self._executor
+
+    def submit(self, slider_id):
+        return self._pool().submit(self._run, slider_id)
+
+    @staticmethod
+    def _run(slider_id):
+        try:
+            return generate(slider_id)
+        except Exception:
+            logger.exception("Building image variants for slider %s failed", slider_id)
+        finally:
+            connection.close()
+
+
+derivative_worker = DerivativeWorker()
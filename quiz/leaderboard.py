@@ -0,0 +1,259 @@
+import heapq
+import logging
+import threading
+import time
+from datetime import date, timedelta
+from django.conf import settings
+from django.db import connection
+from django.db.models import Sum
+
+
+logger = logging.getLogger(__name__)
+
+
+class _Fenwick:
+    """Binary indexed tree of user counts per score."""
+
+    def __init__(self, size):
+        self.size = size
+        self.tree = [0] * (size + 1)
+
+    def add(self, index, delta):
+        index += 1
+        while index <= self.size:
+            self.tree[index] += delta
+            index += index & -index
+
+    def prefix(self, index):
+        """Number of users with score <= ``index``."""
+        index = min(index, self.size - 1) + 1
+        total = 0
+        while index > 0:
+            total += self.tree[index]
+            index -= index & -index
+        return total
+
+    def find(self, k):
+        """Smallest score with ``prefix(score) >= k``."""
+        position = 0
+        bit = 1 << (self.size.bit_length() - 1)
+        while bit:
+            if position + bit <= self.size and self.tree[position + bit] < k:
+                position += bit
+                k -= self.tree[position]
+            bit >>= 1
+        return position
+
+
+class RankedBoard:
+    """
+    Scores kept in per-score buckets with a Fenwick tree over the bucket sizes:
+    updates and "my rank" are O(log S), top-K is O(K log S) where S is the
+    highest score. Ties share a rank and are listed by user id.
+    """
+
+    def __init__(self, scores=None):
+        self._scores = {}
+        self._buckets = {}
+        self._counts = _Fenwick(1024)
+        for user_id, score in (scores or {}).items():
+            self._place(user_id, score)
+
+    def __len__(self):
+        return len(self._scores)
+
+    def _grow(self, score):
+        size = self._counts.size
+        while size <= score:
+            size *= 2
+        counts = _Fenwick(size)
+        for bucket_score, bucket in self._buckets.items():
+            counts.add(bucket_score, len(bucket))
+        self._counts = counts
+
+    def _place(self, user_id, score):
+        if score >= self._counts.size:
+            self._grow(score)
+        self._scores[user_id] = score
+        self._buckets.setdefault(score, set()).add(user_id)
+        self._counts.add(score, 1)
+
+    def _remove(self, user_id):
+        score = self._scores.pop(user_id)
+        bucket = self._buckets[score]
+        bucket.discard(user_id)
+        if not bucket:
+            del self._buckets[score]
+        self._counts.add(score, -1)
+        return score
+
+    def add(self, user_id, delta):
+        score = self._remove(user_id) if user_id in self._scores else 0
+        self._place(user_id, max(score + delta, 0))
+
+    def score(self, user_id):
+        return self._scores.get(user_id)
+
+    def rank(self, user_id):
+        score = self._scores.get(user_id)
+        if score is None:
+            return None
+        return len(self._scores) - self._counts.prefix(score) + 1
+
+    def top(self, k):
+        """``[(rank, user_id, score), ...]`` for the best ``k`` users."""
+        results = []
+        remaining = len(self._scores)
+        while remaining and len(results) < k:
+            score = self._counts.find(remaining)
+            bucket = self._buckets[score]
+            rank = len(self._scores) - remaining + 1
+            for user_id in heapq.nsmallest(k - len(results), bucket):
+                results.append((rank, user_id, score))
+            remaining -= len(bucket)
+        return results
+
+
+class Leaderboards:
+    """
+    Daily, weekly and all-time boards of correct answers, maintained from the
+    grading path. A cold board is seeded from the latest LeaderboardSnapshot
+    and fully aggregated from Performance in a background thread. Every
+    QUIZ_LEADERBOARD_RELOAD_INTERVAL seconds one background reload per board
+    picks up rounds graded by other workers while requests keep reading the
+    current board. Rounds recorded during a reload are replayed onto the
+    reloaded board; one committed just as the aggregate query starts may be
+    counted twice until the following reload.
+    """
+
+    BOARDS = ('daily', 'weekly', 'all_time')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._boards = {}
+        # (board, period) -> rounds recorded while that board reloads.
+        self._pending = {}
+
+    @property
+    def reload_interval(self):
+        return getattr(settings, 'QUIZ_LEADERBOARD_RELOAD_INTERVAL', 60)
+
+    @staticmethod
+    def period(board, day=None):
+        day = day or date.today()
+        if board == 'daily':
+            return day.isoformat()
+        if board == 'weekly':
+            return (day - timedelta(days=day.weekday())).isoformat()
+        return 'all'
+
+    @staticmethod
+    def _date_range(board, period):
+        if board == 'daily':
+            start = date.fromisoformat(period)
+            return start, start
+        if board == 'weekly':
+            start = date.fromisoformat(period)
+            return start, start + timedelta(days=6)
+        return None, None
+
+    def _load(self, board, period):
+        from .models import Performance
+        performances = Performance.objects.all()
+        start, end = self._date_range(board, period)
+        if start:
+            performances = performances.filter(date_played__range=(start, end))
+        rows = performances.values('user_id').annotate(score=Sum('correct_answers')).values_list('user_id', 'score')
+        return RankedBoard(dict(rows.iterator()))
+
+    @staticmethod
+    def _seed(board, period):
+        from .models import LeaderboardSnapshot
+        rows = LeaderboardSnapshot.objects.filter(board=board, period=period).values_list('user_id', 'score')
+        return RankedBoard(dict(rows))
+
+    def _install(self, key, ranked):
+        # Caller holds the lock. Boards of past periods are dropped on the way.
+        self._boards = {
+            existing: value for existing, value in self._boards.items()
+            if existing[1] == self.period(existing[0])
+        }
+        entry = self._boards[key] = (ranked, time.monotonic())
+        return entry
+
+    def _spawn(self, target):
+        def run():
+            try:
+                target()
+            finally:
+                connection.close()
+        threading.Thread(target=run, name='leaderboard-reload', daemon=True).start()
+
+    def _reload(self, key):
+        try:
+            loaded = self._load(*key)
+        except Exception:
+            logger.exception("Reloading leaderboard %s %s failed", *key)
+            with self._lock:
+                self._pending.pop(key, None)
+            return
+        with self._lock:
+            for user_id, correct_answers in self._pending.pop(key, ()):
+                loaded.add(user_id, correct_answers)
+            self._install(key, loaded)
+
+    def _board(self, board, period):
+        key = (board, period)
+        entry = self._boards.get(key)
+        if entry is not None and time.monotonic() - entry[1] <= self.reload_interval:
+            return entry[0]
+
+        with self._lock:
+            starting = key not in self._pending
+            if starting:
+                self._pending[key] = []
+        if not starting:
+            # Another caller is reloading: keep serving the current board.
+            return entry[0] if entry is not None else self._seed(board, period)
+
+        if entry is None:
+            seed = self._seed(board, period)
+            with self._lock:
+                entry = self._boards.get(key) or self._install(key, seed)
+        self._spawn(lambda: self._reload(key))
+        return entry[0]
+
+    def standings(self, board, user_id, k=10, day=None):
+        """``(period, top_k, (rank, score) or None)`` for ``board``."""
+        period = self.period(board, day)
+        ranked = self._board(board, period)
+        with self._lock:
+            top = ranked.top(k)
+            score = ranked.score(user_id)
+            mine = (ranked.rank(user_id), score) if score is not None else None
+        return period, top, mine
+
+    def snapshot(self, board, k, day=None):
+        """Top ``k`` from a fresh aggregate, for ``snapshot_leaderboard``."""
+        period = self.period(board, day)
+        return period, self._load(board, period).top(k)
+
+    def record(self, user_id, correct_answers, day=None):
+        day = day or date.today()
+        with self._lock:
+            for board in self.BOARDS:
+                key = (board, self.period(board, day))
+                entry = self._boards.get(key)
+                if entry is not None:
+                    entry[0].add(user_id, correct_answers)
+                pending = self._pending.get(key)
+                if pending is not None:
+                    pending.append((user_id, correct_answers))
+
+    def reset(self):
+        with self._lock:
+            self._boards = {}
+            self._pending = {}
+
+
+leaderboards = Leaderboards()
@@ -0,0 +1,38 @@
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from .models import Profile
+from .leaderboard import Leaderboards, leaderboards
+
+
+def mask_username(username):
+    # Usernames are phone numbers, never show them in full.
+    if len(username) <= 7:
+        return username[:2] + '*' * (len(username) - 2)
+    return username[:5] + '*' * (len(username) - 7) + username[-2:]
+
+
+class LeaderboardView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        board = request.query_params.get('board', 'daily')
+        if board not in Leaderboards.BOARDS:
+            return Response({"error": f"'board' must be one of: {', '.join(Leaderboards.BOARDS)}."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            k = min(max(int(request.query_params.get('k', 10)), 1), 100)
+        except ValueError:
+            return Response({"error": "Invalid value for 'k'"}, status=status.HTTP_400_BAD_REQUEST)
+
+        period, top, mine = leaderboards.standings(board, request.user.id, k)
+
+        profiles = Profile.objects.filter(user_id__in=[user_id for _, user_id, _ in top]).values_list('user_id', 'full_name', 'user__username')
+        names = {user_id: full_name or mask_username(username) for user_id, full_name, username in profiles}
+
+        return Response({
+            "board": board,
+            "period": period,
+            "top": [{"rank": rank, "name": names.get(user_id, ''), "score": score} for rank, user_id, score in top],
+            "me": {"rank": mine[0], "score": mine[1]} if mine else None,
+        }, status=status.HTTP_200_OK)
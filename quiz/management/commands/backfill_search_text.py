@@ -0,0 +1,47 @@
+import time
+from django.core.management.base import BaseCommand
+from quiz.contentCodec import decode_text
+from quiz.contentSearch import install_search_index, normalize_search_text
+from quiz.models import Quiz, FAQs
+
+
+# Raw (base64) columns feeding each model's search_text, in order.
+SOURCES = {
+    'quiz': (Quiz, ('_question', '_options', '_correct_answer')),
+    'faqs': (FAQs, ('_question', '_answer')),
+}
+
+
+class Command(BaseCommand):
+    help = "Fill the search_text shadow columns of Quiz and FAQs and optionally build the database search index"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', choices=sorted(SOURCES), action='append', help="Default: all")
+        parser.add_argument('--chunk-size', type=int, default=2000)
+        parser.add_argument('--index', action='store_true', help="Create the FTS5 (SQLite) or pg_trgm (PostgreSQL) index afterwards")
+
+    def handle(self, *args, **options):
+        for name in options['model'] or sorted(SOURCES):
+            model, columns = SOURCES[name]
+            started = time.monotonic()
+            last_id = 0
+            updated = 0
+            while True:
+                rows = list(model.objects.filter(id__gt=last_id).order_by('id').values_list('id', 'search_text', *columns)[:options['chunk_size']])
+                if not rows:
+                    break
+                changed = []
+                for pk, current, *raw in rows:
+                    search_text = normalize_search_text(*map(decode_text, raw))
+                    if search_text != current:
+                        changed.append(model(id=pk, search_text=search_text))
+                model.objects.bulk_update(changed, ['search_text'], batch_size=500)
+                updated += len(changed)
+                last_id = rows[-1][0]
+            self.stdout.write(f"{name}: {updated} rows updated in {time.monotonic() - started:.1f}s")
+
+            if options['index']:
+                if install_search_index(model):
+                    self.stdout.write(f"{name}: search index installed")
+                else:
+                    self.stdout.write(self.style.WARNING(f"{name}: no search index for this database, searches use LIKE scans"))
@@ -0,0 +1,61 @@
+import random
+import time
+from django.core.management.base import BaseCommand
+from quiz.leaderboard import RankedBoard
+
+
+def synthetic_scores(users, seed):
+    # Long-tailed like real play: most users answer a few questions, a few answer thousands.
+    rng = random.Random(seed)
+    return {user_id: int(rng.paretovariate(1.2) * 5) for user_id in range(1, users + 1)}
+
+
+class Command(BaseCommand):
+    help = "Benchmark the in-memory leaderboard on synthetic data"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1_000_000)
+        parser.add_argument('--operations', type=int, default=100_000)
+        parser.add_argument('--top', type=int, default=10)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def timed(self, label, operations, run):
+        started = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f"{label:<24} {elapsed:8.3f} s  {elapsed / operations * 1e6:8.2f} us/op")
+
+    def handle(self, *args, **options):
+        users = options['users']
+        operations = options['operations']
+        rng = random.Random(options['seed'])
+
+        started = time.perf_counter()
+        scores = synthetic_scores(users, options['seed'])
+        self.stdout.write(f"generated {users} users in {time.perf_counter() - started:.3f} s, max score {max(scores.values())}")
+
+        board = None
+
+        def build():
+            nonlocal board
+            board = RankedBoard(scores)
+
+        user_ids = [rng.randint(1, users) for _ in range(operations)]
+        deltas = [rng.randint(0, 10) for _ in range(operations)]
+
+        def updates():
+            for user_id, delta in zip(user_ids, deltas):
+                board.add(user_id, delta)
+
+        def ranks():
+            for user_id in user_ids:
+                board.rank(user_id)
+
+        def tops():
+            for _ in range(operations // 10):
+                board.top(options['top'])
+
+        self.timed("build", users, build)
+        self.timed("update", operations, updates)
+        self.timed("my rank", operations, ranks)
+        self.timed(f"top-{options['top']}", operations // 10, tops)
@@ -0,0 +1,69 @@
+import time
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from quiz.contentCodec import encode_text, decode_text, decoded_lru
+from quiz.models import Quiz
+from quiz.serializer import QuizSerializer
+
+
+class LegacyQuizSerializer(QuizSerializer):
+    # QuizSerializer.to_representation used to decode through the properties
+    # and then decode every field a second time by hand.
+    def to_representation(self, instance):
+        representation = super().to_representation(instance)
+        representation['question'] = decode_text(instance._question)
+        representation['options'] = decode_text(instance._options)
+        representation['correct_answer'] = decode_text(instance._correct_answer)
+        return representation
+
+
+class Command(BaseCommand):
+    help = "Micro-benchmark of per-quiz serialization cost, legacy double decoding vs the shared codec"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--quizzes', type=int, default=2000)
+        parser.add_argument('--rounds', type=int, default=5)
+
+    def make_quizzes(self, count):
+        quizzes = []
+        for i in range(count):
+            quizzes.append(Quiz(
+                id=i + 1,
+                _question=encode_text(f"পৃথিবীর বৃহত্তম মহাসাগর কোনটি? #{i}"),
+                _options=encode_text("আটলান্টিক,প্রশান্ত,ভারত,দক্ষিণ"),
+                _correct_answer=encode_text("প্রশান্ত"),
+            ))
+        return quizzes
+
+    def timed(self, label, count, rounds, run):
+        best = None
+        for _ in range(rounds):
+            started = time.perf_counter()
+            run()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        self.stdout.write(f"{label:<34} {best / count * 1e6:8.2f} us/quiz")
+
+    def handle(self, *args, **options):
+        count = options['quizzes']
+        rounds = options['rounds']
+        quizzes = self.make_quizzes(count)
+
+        def legacy():
+            LegacyQuizSerializer(self.make_quizzes(count), many=True).data
+
+        def codec_cold():
+            QuizSerializer(self.make_quizzes(count), many=True).data
+
+        def codec_memoized():
+            QuizSerializer(quizzes, many=True).data
+
+        self.timed("instance construction (baseline)", count, rounds, lambda: self.make_quizzes(count))
+        with override_settings(QUIZ_DECODE_CACHE_SIZE=0):
+            self.timed("legacy (decode twice)", count, rounds, legacy)
+            self.timed("codec, fresh instances", count, rounds, codec_cold)
+        with override_settings(QUIZ_DECODE_CACHE_SIZE=count * 3):
+            decoded_lru.clear()
+            codec_cold()
+            self.timed("codec, fresh instances + LRU", count, rounds, codec_cold)
+        self.timed("codec, memoized instances", count, rounds, codec_memoized)
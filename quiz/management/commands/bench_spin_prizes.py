@@ -0,0 +1,81 @@
+import bisect
+import itertools
+import random
+import time
+from collections import Counter
+from datetime import date, timedelta
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from quiz.models import SpinPrize
+from quiz.prizeEngine import AliasTable, prize_table
+from quiz.spinEngine import take_spin
+
+
+class Command(BaseCommand):
+    help = "Benchmark spin prize draws and the full spin path (on a throwaway test database)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prizes', type=int, default=50)
+        parser.add_argument('--draws', type=int, default=1_000_000)
+        parser.add_argument('--spins', type=int, default=5_000, help="Full take_spin calls against the database, 0 to skip")
+        parser.add_argument('--seed', type=int, default=42)
+
+    def timed(self, label, operations, run):
+        started = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f"{label:<24} {elapsed:8.3f} s  {operations / elapsed:12,.0f} ops/s")
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        weights = [rng.randint(1, 1000) for _ in range(options['prizes'])]
+        draws = options['draws']
+
+        table = AliasTable(weights)
+        cumulative = list(itertools.accumulate(weights))
+        hits = Counter()
+
+        def alias_draws():
+            draw = table.draw
+            for _ in range(draws):
+                draw(rng.random)
+
+        def bisect_draws():
+            total = cumulative[-1]
+            for _ in range(draws):
+                bisect.bisect_right(cumulative, rng.random() * total)
+
+        self.timed("alias draw", draws, alias_draws)
+        self.timed("cumulative bisect draw", draws, bisect_draws)
+
+        for _ in range(draws):
+            hits[table.draw(rng.random)] += 1
+        total = sum(weights)
+        worst = max(abs(hits[index] / draws - weight / total) for index, weight in enumerate(weights))
+        self.stdout.write(f"largest deviation from configured odds: {worst:.5f}")
+
+        if options['spins']:
+            self.bench_spins(options['spins'], weights[:10])
+
+    def bench_spins(self, spins, weights):
+        # Spins write real rows, so they run on a throwaway test database.
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            user = User.objects.create_user("bench-spin")
+            for index, weight in enumerate(weights):
+                SpinPrize.objects.create(gift=f"Prize {index}", coins=index * 5, weight=weight, daily_budget=spins // 20 if index % 3 == 0 else None)
+            prize_table.invalidate()
+
+            # One spin per day keeps the daily limit out of the way.
+            first_day = date.today()
+            days = [first_day + timedelta(days=offset) for offset in range(spins)]
+
+            def run():
+                for day in days:
+                    take_spin(user, day)
+
+            self.timed("take_spin (db)", spins, run)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            prize_table.invalidate()
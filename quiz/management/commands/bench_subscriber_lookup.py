@@ -0,0 +1,63 @@
+import random
+import sqlite3
+import string
+import time
+from django.core.management.base import BaseCommand
+
+
+SCHEMAS = {
+    'unindexed TextField': """
+        CREATE TABLE subscriber (
+            id INTEGER PRIMARY KEY,
+            request_id TEXT NOT NULL,
+            masked_msisdn TEXT NOT NULL
+        )
+    """,
+    'indexed varchar': """
+        CREATE TABLE subscriber (
+            id INTEGER PRIMARY KEY,
+            request_id VARCHAR(32) NOT NULL,
+            masked_msisdn VARCHAR(128) NOT NULL
+        );
+        CREATE INDEX subscriber_request_id ON subscriber (request_id);
+        CREATE INDEX subscriber_masked_msisdn ON subscriber (masked_msisdn);
+        CREATE UNIQUE INDEX unique_request_id ON subscriber (request_id) WHERE NOT (request_id = '');
+        CREATE UNIQUE INDEX unique_masked_msisdn ON subscriber (masked_msisdn) WHERE NOT (masked_msisdn = '');
+    """,
+}
+
+
+class Command(BaseCommand):
+    help = "Benchmark Digimart callback lookups (request_id, masked_msisdn) with and without indexes on SQLite"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+        parser.add_argument('--lookups', type=int, default=200)
+
+    def rows(self, size, rng):
+        alphabet = string.ascii_letters + string.digits
+        for subscriber_id in range(1, size + 1):
+            request_id = f"{subscriber_id}_" + ''.join(rng.choices(alphabet, k=14 - len(str(subscriber_id))))
+            masked_msisdn = 'tel:' + ''.join(rng.choices(alphabet, k=40))
+            yield subscriber_id, request_id, masked_msisdn
+
+    def handle(self, *args, **options):
+        rng = random.Random(7)
+        self.stdout.write(f"{'subscribers':>12}  {'schema':<20} {'request_id':>12} {'masked_msisdn':>14}")
+        for size in options['sizes']:
+            rows = list(self.rows(size, rng))
+            samples = rng.sample(rows, min(options['lookups'], size))
+            for schema_name, schema in SCHEMAS.items():
+                db = sqlite3.connect(':memory:')
+                db.executescript(schema)
+                db.executemany("INSERT INTO subscriber VALUES (?, ?, ?)", rows)
+                db.commit()
+
+                timings = []
+                for column, position in (('request_id', 1), ('masked_msisdn', 2)):
+                    started = time.perf_counter()
+                    for sample in samples:
+                        db.execute(f"SELECT id FROM subscriber WHERE {column} = ? LIMIT 1", (sample[position],)).fetchone()
+                    timings.append((time.perf_counter() - started) / len(samples) * 1e6)
+                db.close()
+                self.stdout.write(f"{size:>12}  {schema_name:<20} {timings[0]:>9.1f} us {timings[1]:>11.1f} us")
@@ -0,0 +1,49 @@
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
+from quiz.creditsLedger import OPENING
+from quiz.models import CreditTransaction
+
+
+class Command(BaseCommand):
+    help = "Fold credit ledger entries older than the cutoff into one snapshot entry per user (run periodically)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=getattr(settings, 'QUIZ_CREDIT_COMPACT_AFTER_DAYS', 90))
+        parser.add_argument('--chunk-size', type=int, default=500, help="Users compacted per transaction")
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        chunk_size = options['chunk_size']
+        # Opening entries stay separate, verify_credits relies on them.
+        old = CreditTransaction.objects.filter(created_at__lt=cutoff).exclude(reason='snapshot', reference=OPENING)
+        last_user_id = 0
+        users = removed = 0
+
+        while True:
+            # Users with more than one old entry; a lone snapshot is already compact.
+            user_ids = list(
+                old.filter(user_id__gt=last_user_id)
+                .values('user_id').annotate(entries=Count('id')).filter(entries__gt=1)
+                .order_by('user_id').values_list('user_id', flat=True)[:chunk_size]
+            )
+            if not user_ids:
+                break
+
+            with transaction.atomic():
+                entries = old.filter(user_id__in=user_ids)
+                totals = list(entries.values('user_id').annotate(balance=Sum('amount'), entries=Count('id')).values_list('user_id', 'balance', 'entries'))
+                entries.delete()
+                CreditTransaction.objects.bulk_create([
+                    CreditTransaction(user_id=user_id, amount=balance, reason='snapshot', reference=f"compacted {count}", created_at=cutoff)
+                    for user_id, balance, count in totals
+                ])
+
+            users += len(totals)
+            removed += sum(count for _, _, count in totals)
+            last_user_id = user_ids[-1]
+
+        self.stdout.write(self.style.SUCCESS(f"Compacted {removed} entries of {users} users into snapshots before {cutoff:%Y-%m-%d}"))
@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Max
+from django.db.models.functions import Length
+from quiz.DigimartSubscriptionModel import DigimartChargingSubscriberModel
+
+
+LOOKUP_FIELDS = {
+    'request_id': 32,
+    'masked_msisdn': 128,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Prepare DigimartChargingSubscriberModel for the indexed, unique request_id/masked_msisdn columns: "
+        "trim values and clear duplicates on all but the most recent row. Run before applying the schema change."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        subscribers = DigimartChargingSubscriberModel.objects
+
+        with transaction.atomic():
+            for field, max_length in LOOKUP_FIELDS.items():
+                untrimmed = [
+                    (pk, value) for pk, value in subscribers.exclude(**{field: ''}).values_list('pk', field).iterator()
+                    if value != value.strip()
+                ]
+                for pk, value in untrimmed:
+                    if not dry_run:
+                        subscribers.filter(pk=pk).update(**{field: value.strip()})
+                self.stdout.write(f"{field}: {len(untrimmed)} values trimmed")
+
+                too_long = subscribers.annotate(length=Length(field)).filter(length__gt=max_length).count()
+                if too_long:
+                    self.stdout.write(self.style.WARNING(f"{field}: {too_long} values longer than {max_length} characters, fix them by hand"))
+
+                duplicates = (
+                    subscribers.exclude(**{field: ''})
+                    .values(field)
+                    .annotate(rows=Count('pk'), keep=Max('pk'))
+                    .filter(rows__gt=1)
+                )
+                cleared = 0
+                for duplicate in duplicates.iterator():
+                    stale = subscribers.filter(**{field: duplicate[field]}).exclude(pk=duplicate['keep'])
+                    cleared += stale.count() if dry_run else stale.update(**{field: ''})
+                self.stdout.write(f"{field}: cleared on {cleared} older duplicate rows")
+
+            if dry_run:
+                transaction.set_rollback(True)
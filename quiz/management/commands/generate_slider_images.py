@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from quiz.imageDerivatives import generate
+from quiz.models import Slider
+
+
+class Command(BaseCommand):
+    help = "Build the responsive WebP/JPEG variants for slider images that do not have them yet"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help="Rebuild variants that are already up to date")
+
+    def handle(self, *args, **options):
+        built = 0
+        for slider_id in Slider.objects.exclude(image='').order_by('id').values_list('id', flat=True):
+            variants = generate(slider_id, force=options['force'])
+            if variants:
+                built += 1
+                original = Slider.objects.get(pk=slider_id).image.size
+                smallest = min(image['bytes'] for image in variants['images'])
+                self.stdout.write(f"slider {slider_id}: {len(variants['images'])} variants, {original} -> {smallest} bytes at the smallest size")
+        self.stdout.write(self.style.SUCCESS(f"{built} sliders processed"))
@@ -0,0 +1,28 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from quiz.quizImporter import ImportFormatError, import_quizzes
+
+
+class Command(BaseCommand):
+    help = "Stream quizzes from an xlsx, CSV or JSONL file (columns: question, options, correct_answer)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--batch-size', type=int, default=getattr(settings, 'QUIZ_IMPORT_BATCH_SIZE', 1000))
+        parser.add_argument('--dry-run', action='store_true', help="Validate every row without writing anything")
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        try:
+            with open(options['path'], 'rb') as file:
+                result = import_quizzes(file, options['path'], options['batch_size'], options['dry_run'])
+        except (OSError, ImportFormatError) as e:
+            raise CommandError(str(e))
+
+        for number, message in result.errors:
+            self.stderr.write(f"row {number}: {message}")
+        verb = "validated" if options['dry_run'] else "imported"
+        self.stdout.write(self.style.SUCCESS(
+            f"{result.created} quizzes {verb} in {time.monotonic() - started:.1f}s, {len(result.errors)} rows skipped"
+        ))
@@ -0,0 +1,127 @@
+import asyncio
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from quiz.digimartClient import AsyncDigimartClient, DigimartClient
+
+
+REPLY = json.dumps({'subscriberInfo': [{'subscriptionStatus': 'REGISTERED'}]}).encode()
+
+
+async def _serve_slowly(reader, writer, delay):
+    # Keep-alive HTTP/1.1 responder that waits `delay` seconds per request.
+    try:
+        while True:
+            head = await reader.readuntil(b'\r\n\r\n')
+            length = 0
+            for line in head.split(b'\r\n'):
+                name, _, value = line.partition(b':')
+                if name.strip().lower() == b'content-length':
+                    length = int(value)
+            await reader.readexactly(length)
+            await asyncio.sleep(delay)
+            writer.write(b'HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nContent-Length: %d\r\n\r\n%s' % (len(REPLY), REPLY))
+            await writer.drain()
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+class SlowUpstream:
+    """A stand-in Digimart API on its own event loop thread."""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.port = None
+        self._ready = threading.Event()
+        self._loop = asyncio.new_event_loop()
+        threading.Thread(target=self._run, daemon=True).start()
+        self._ready.wait()
+
+    def _run(self):
+        asyncio.set_event_loop(self._loop)
+        server = self._loop.run_until_complete(asyncio.start_server(
+            lambda reader, writer: _serve_slowly(reader, writer, self.delay), '127.0.0.1', 0, backlog=4096,
+        ))
+        self.port = server.sockets[0].getsockname()[1]
+        self._ready.set()
+        self._loop.run_forever()
+
+    def stop(self):
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare a thread pool (one WSGI thread per in-flight call) with a single asyncio "
+        "loop (the async views under ASGI) waiting on a slow simulated Digimart API"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=1000)
+        parser.add_argument('--delay', type=float, default=1.0, help="Seconds the stub upstream takes per call")
+        parser.add_argument('--threads', type=int, default=64, help="Thread pool size standing in for WSGI worker threads")
+        parser.add_argument('--concurrency', type=int, default=1000, help="In-flight calls allowed on the asyncio loop")
+
+    def report(self, label, total, elapsed, threads, failures):
+        self.stdout.write(
+            f"{label:<8} {elapsed:8.2f} s  {total / elapsed:10,.0f} req/s  "
+            f"{threads:5d} threads  {failures} failed"
+        )
+
+    def handle(self, *args, **options):
+        total = options['requests']
+        upstream = SlowUpstream(options['delay'])
+        settings_overrides = override_settings(
+            DIGIMART_API_BASE_URL=f'http://127.0.0.1:{upstream.port}',
+            DIGIMART_READ_TIMEOUT=options['delay'] * 10 + 5,
+            DIGIMART_POOL_SIZE=max(options['threads'], 20),
+            DIGIMART_ASYNC_MAX_CONNECTIONS=options['concurrency'],
+            DIGIMART_MAX_RETRIES=0,
+        )
+        self.stdout.write(f"{total} calls against an upstream answering in {options['delay']} s")
+        try:
+            with settings_overrides:
+                self.run_threads(total, options['threads'])
+                self.run_asyncio(total, options['concurrency'])
+        finally:
+            upstream.stop()
+
+    def run_threads(self, total, threads):
+        client = DigimartClient()
+
+        def call(_):
+            try:
+                return client.subscriber_charging_info('APP_LOADTEST', 'secret', '8801700000000').status_code == 200
+            except Exception:
+                return False
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            results = list(executor.map(call, range(total)))
+            peak = threading.active_count()
+        self.report("threads", total, time.perf_counter() - started, peak, results.count(False))
+
+    def run_asyncio(self, total, concurrency):
+        client = AsyncDigimartClient(DigimartClient())
+        limit = asyncio.Semaphore(concurrency)
+
+        async def call():
+            async with limit:
+                try:
+                    return (await client.subscriber_charging_info('APP_LOADTEST', 'secret', '8801700000000')).status_code == 200
+                except Exception:
+                    return False
+
+        async def run():
+            results = await asyncio.gather(*(call() for _ in range(total)))
+            await client.aclose()
+            return results, threading.active_count()
+
+        started = time.perf_counter()
+        results, peak = asyncio.run(run())
+        self.report("asyncio", total, time.perf_counter() - started, peak, results.count(False))
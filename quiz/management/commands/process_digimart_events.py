@@ -0,0 +1,31 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from quiz.digimartEvents import process_pending
+
+
+class Command(BaseCommand):
+    help = "Apply Digimart webhook events queued in fast-ack mode (DIGIMART_WEBHOOK_FAST_ACK)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=getattr(settings, 'DIGIMART_EVENT_BATCH_SIZE', 500))
+        parser.add_argument('--sleep', type=float, default=1.0, help="Seconds to wait when the queue is empty")
+        parser.add_argument('--once', action='store_true', help="Drain the queue and exit")
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        total = 0
+        while True:
+            started = time.monotonic()
+            processed = process_pending(batch_size)
+            total += processed
+            if processed:
+                elapsed = time.monotonic() - started
+                self.stdout.write(f"{processed} events applied in {elapsed:.2f}s ({total} total)")
+            if processed < batch_size:
+                if options['once']:
+                    break
+                close_old_connections()
+                time.sleep(options['sleep'])
+        self.stdout.write(self.style.SUCCESS(f"Applied {total} events"))
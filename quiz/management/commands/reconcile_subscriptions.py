@@ -0,0 +1,125 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from quiz.DigimartSubcriptionView import parse_subscription_status
+from quiz.DigimartSubscriptionModel import DigimartChargingSubscriberModel
+from quiz.digimartConfig import digimart_config
+from quiz.digimartClient import CircuitOpenError, digimart_client
+from quiz.models import Profile
+from quiz.principalCache import principal_cache
+
+
+class RateLimiter:
+    """Spaces calls at least 1/rate seconds apart across all worker threads."""
+
+    def __init__(self, rate):
+        self._lock = threading.Lock()
+        self._interval = 1.0 / rate if rate > 0 else 0
+        self._next = time.monotonic()
+
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(self._next, now)
+            self._next = slot + self._interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class Command(BaseCommand):
+    help = "Reconcile Profile.is_subscribed for every Digimart subscriber against subscriberChargingInfo"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8, help="Concurrent upstream calls")
+        parser.add_argument('--rate', type=float, default=20, help="Maximum upstream calls per second")
+        parser.add_argument('--chunk-size', type=int, default=500)
+        parser.add_argument('--checkpoint', default=os.path.join(settings.BASE_DIR, 'reconcile_subscriptions.checkpoint'))
+        parser.add_argument('--restart', action='store_true', help="Ignore the checkpoint and start from the first subscriber")
+
+    def read_checkpoint(self, path):
+        try:
+            with open(path) as checkpoint:
+                return int(checkpoint.read().strip() or 0)
+        except FileNotFoundError:
+            return 0
+
+    def write_checkpoint(self, path, last_id):
+        with open(f"{path}.tmp", 'w') as checkpoint:
+            checkpoint.write(str(last_id))
+        os.replace(f"{path}.tmp", path)
+
+    def fetch_status(self, config, subscriber_id):
+        self.limiter.acquire()
+        response = digimart_client.subscriber_charging_info(config.APP_ID, config.API_Password, subscriber_id)
+        if response.status_code != 200:
+            return None
+        return parse_subscription_status(response.json()) == 'REGISTERED'
+
+    def handle(self, *args, **options):
+        config = digimart_config.get()
+        if not config:
+            raise CommandError("DigimartSubscription configuration is missing.")
+
+        checkpoint_path = options['checkpoint']
+        last_id = 0 if options['restart'] else self.read_checkpoint(checkpoint_path)
+        self.limiter = RateLimiter(options['rate'])
+        chunk_size = options['chunk_size']
+
+        processed = changed = errors = 0
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            while True:
+                chunk = list(
+                    DigimartChargingSubscriberModel.objects
+                    .filter(id__gt=last_id)
+                    .exclude(masked_msisdn='')
+                    .order_by('id')
+                    .values_list('id', 'user_id', 'masked_msisdn')[:chunk_size]
+                )
+                if not chunk:
+                    break
+
+                futures = [executor.submit(self.fetch_status, config, masked_msisdn) for _, _, masked_msisdn in chunk]
+                statuses = {}
+                circuit_open = False
+                for (_, user_id, _), future in zip(chunk, futures):
+                    try:
+                        is_subscribed = future.result()
+                    except CircuitOpenError:
+                        circuit_open = True
+                        continue
+                    except requests.RequestException:
+                        is_subscribed = None
+                    if is_subscribed is None:
+                        errors += 1
+                    else:
+                        statuses[user_id] = is_subscribed
+                if circuit_open:
+                    raise CommandError(f"Digimart is failing, stopped after subscriber id {last_id}. Re-run to resume.")
+
+                profiles = [
+                    profile for profile in Profile.objects.filter(user_id__in=statuses).only('id', 'user_id', 'is_subscribed')
+                    if profile.is_subscribed != statuses[profile.user_id]
+                ]
+                for profile in profiles:
+                    profile.is_subscribed = statuses[profile.user_id]
+                Profile.objects.bulk_update(profiles, ['is_subscribed'], batch_size=chunk_size)
+                principal_cache.invalidate_on_commit(profile.user_id for profile in profiles)
+
+                processed += len(chunk)
+                changed += len(profiles)
+                last_id = chunk[-1][0]
+                self.write_checkpoint(checkpoint_path, last_id)
+                elapsed = time.monotonic() - started
+                self.stdout.write(f"{processed} checked, {changed} changed, {errors} errors, {processed / elapsed:.1f} subscribers/s (last id {last_id})")
+
+        if os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Reconciled {processed} subscribers in {elapsed:.1f}s: {changed} changed, {errors} errors"
+        ))
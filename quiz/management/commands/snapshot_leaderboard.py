@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from quiz.leaderboard import Leaderboards, leaderboards
+from quiz.models import LeaderboardSnapshot
+
+
+class Command(BaseCommand):
+    help = "Store the current top-K of each leaderboard in LeaderboardSnapshot (run periodically, e.g. from cron)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--board', choices=Leaderboards.BOARDS, action='append', help="Board to snapshot, default all")
+        parser.add_argument('--top', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        for board in options['board'] or Leaderboards.BOARDS:
+            period, top = leaderboards.snapshot(board, options['top'])
+            with transaction.atomic():
+                LeaderboardSnapshot.objects.filter(board=board, period=period).delete()
+                LeaderboardSnapshot.objects.bulk_create([
+                    LeaderboardSnapshot(board=board, period=period, user_id=user_id, rank=rank, score=score)
+                    for rank, user_id, score in top
+                ], batch_size=1000)
+            self.stdout.write(f"{board} {period}: {len(top)} entries")
@@ -0,0 +1,83 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Sum
+from quiz.creditsLedger import OPENING, opening_entry
+from quiz.models import CreditTransaction, Profile
+from quiz.principalCache import principal_cache
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute Profile.credits from the credits ledger in chunks and report or fix mismatches. "
+        "Profiles without an opening entry are skipped until --open-balances records one"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--fix', action='store_true', help="Overwrite mismatching balances with the ledger sum")
+        parser.add_argument(
+            '--open-balances', action='store_true',
+            help="Record an opening entry for profiles that have none: their balance minus what the ledger already holds",
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        last_user_id = 0
+        checked = mismatched = opened = unopened = 0
+
+        while True:
+            with transaction.atomic():
+                profiles = list(
+                    Profile.objects.select_for_update()
+                    .filter(user_id__gt=last_user_id)
+                    .order_by('user_id')
+                    .only('id', 'user_id', 'credits')[:chunk_size]
+                )
+                if not profiles:
+                    break
+                user_ids = [profile.user_id for profile in profiles]
+                sums = dict(
+                    CreditTransaction.objects.filter(user_id__in=user_ids)
+                    .values('user_id').annotate(balance=Sum('amount'))
+                    .values_list('user_id', 'balance')
+                )
+                has_opening = set(
+                    CreditTransaction.objects.filter(user_id__in=user_ids, reason='snapshot', reference=OPENING)
+                    .values_list('user_id', flat=True)
+                )
+
+                openings = []
+                fixes = []
+                for profile in profiles:
+                    ledger = sums.get(profile.user_id, 0)
+                    if profile.user_id not in has_opening:
+                        # The balance from before the ledger is unknown to it, never
+                        # overwrite it; the rows are locked, so the difference is exact.
+                        if options['open_balances']:
+                            openings.append(opening_entry(profile.user_id, profile.credits - ledger))
+                        else:
+                            unopened += 1
+                        continue
+                    if profile.credits != ledger:
+                        mismatched += 1
+                        self.stdout.write(f"user {profile.user_id}: balance {profile.credits}, ledger {ledger}")
+                        profile.credits = ledger
+                        fixes.append(profile)
+
+                CreditTransaction.objects.bulk_create(openings, batch_size=chunk_size)
+                if options['fix']:
+                    Profile.objects.bulk_update(fixes, ['credits'], batch_size=chunk_size)
+                    principal_cache.invalidate_on_commit(profile.user_id for profile in fixes)
+
+            checked += len(profiles)
+            opened += len(openings)
+            last_user_id = profiles[-1].user_id
+
+        action = "fixed" if options['fix'] else "found"
+        self.stdout.write(self.style.SUCCESS(
+            f"Checked {checked} profiles: {mismatched} mismatches {action}, {opened} opening balances recorded"
+        ))
+        if unopened:
+            self.stdout.write(self.style.WARNING(
+                f"{unopened} profiles have no opening entry and were skipped, run with --open-balances first"
+            ))
@@ -1,9 +1,10 @@
-import base64
 from django.db import models
 from django.contrib.auth.models import User
 from django.core.validators import RegexValidator
 import re
 from django.core.exceptions import ValidationError
+from .contentCodec import encoded_property
+from .contentSearch import normalize_search_text
 
 
 def validate_phone_number(value):
@@ -40,47 +41,19 @@ class Quiz(models.Model):
     _options = models.TextField(db_column='options')
     _correct_answer = models.TextField(db_column='correct_answer')
 
-    @property
-    def question(self):
-        try:
-            return base64.b64decode(self._question.encode('ascii')).decode('utf-8')
-        except (ValueError, UnicodeEncodeError, base64.binascii.Error):
-            return self._question
-
-    @question.setter
-    def question(self, value):
-        try:
-            self._question = base64.b64encode(value.encode('utf-8')).decode('ascii')
-        except UnicodeEncodeError:
-            self._question = value
+    question = encoded_property('_question')
+    options = encoded_property('_options')
+    correct_answer = encoded_property('_correct_answer')
 
-    @property
-    def options(self):
-        try:
-            return base64.b64decode(self._options.encode('ascii')).decode('utf-8')
-        except (ValueError, UnicodeEncodeError, base64.binascii.Error):
-            return self._options
-
-    @options.setter
-    def options(self, value):
-        try:
-            self._options = base64.b64encode(value.encode('utf-8')).decode('ascii')
-        except UnicodeEncodeError:
-            self._options = value
+    # Normalized plaintext of the encoded columns, kept in sync on save.
+    search_text = models.TextField(blank=True, default='', editable=False)
 
-    @property
-    def correct_answer(self):
-        try:
-            return base64.b64decode(self._correct_answer.encode('ascii')).decode('utf-8')
-        except (ValueError, UnicodeEncodeError, base64.binascii.Error):
-            return self._correct_answer
-
-    @correct_answer.setter
-    def correct_answer(self, value):
-        try:
-            self._correct_answer = base64.b64encode(value.encode('utf-8')).decode('ascii')
-        except UnicodeEncodeError:
-            self._correct_answer = value
+    def save(self, *args, **kwargs):
+        self.search_text = normalize_search_text(self.question, self.options, self.correct_answer)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'_question', '_options', '_correct_answer'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'search_text'}
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return self.question
@@ -93,33 +66,17 @@ class FAQs(models.Model):
     _question = models.TextField(db_column='question')
     _answer = models.TextField(db_column='answer')
 
-    @property
-    def question(self):
-        try:
-            return base64.b64decode(self._question.encode('ascii')).decode('utf-8')
-        except (ValueError, UnicodeEncodeError, base64.binascii.Error):
-            return self._question
-
-    @question.setter
-    def question(self, value):
-        try:
-            self._question = base64.b64encode(value.encode('utf-8')).decode('ascii')
-        except UnicodeEncodeError:
-            self._question = value
+    question = encoded_property('_question')
+    answer = encoded_property('_answer')
 
-    @property
-    def answer(self):
-        try:
-            return base64.b64decode(self._answer.encode('ascii')).decode('utf-8')
-        except (ValueError, UnicodeEncodeError, base64.binascii.Error):
-            return self._answer
-
-    @answer.setter
-    def answer(self, value):
-        try:
-            self._answer = base64.b64encode(value.encode('utf-8')).decode('ascii')
-        except UnicodeEncodeError:
-            self._answer = value
+    search_text = models.TextField(blank=True, default='', editable=False)
+
+    def save(self, *args, **kwargs):
+        self.search_text = normalize_search_text(self.question, self.answer)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'_question', '_answer'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'search_text'}
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return self.question
@@ -127,6 +84,8 @@ class FAQs(models.Model):
 
 class Slider(models.Model):
     image = models.ImageField(upload_to='sliders/')
+    # {"source": image name, "images": [{"name", "width", "format", "bytes"}, ...]}, see imageDerivatives.
+    variants = models.JSONField(default=dict, blank=True, editable=False)
 
     def __str__(self):
         return f"Slider {self.id}"
@@ -146,6 +105,9 @@ class Performance(models.Model):
     wrong_answers = models.IntegerField(default=0)
     date_played = models.DateField(default=date.today)
 
+    class Meta:
+        unique_together = ('user', 'date_played')
+
     def __str__(self):
         return f"{self.user.username} - {self.date_played}"
 
@@ -154,6 +116,35 @@ class Performance(models.Model):
         return self.correct_answers + self.wrong_answers
 
 
+class LeaderboardSnapshot(models.Model):
+    BOARD_CHOICES = [
+        ('daily', 'Daily'),
+        ('weekly', 'Weekly'),
+        ('all_time', 'All time'),
+    ]
+    board = models.CharField(max_length=10, choices=BOARD_CHOICES)
+    period = models.CharField(max_length=10)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='leaderboard_snapshots')
+    rank = models.PositiveIntegerField()
+    score = models.PositiveIntegerField()
+    taken_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('board', 'period', 'user')
+        indexes = [models.Index(fields=['board', 'period', 'rank'])]
+
+    def __str__(self):
+        return f"{self.board} {self.period} #{self.rank} {self.user.username}"
+
+
+class PerformanceFlush(models.Model):
+    batch_id = models.CharField(max_length=32, unique=True)
+    flushed_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.batch_id
+
+
 
 # models.py
 from django.contrib.auth.models import User
@@ -169,3 +160,65 @@ class Spin(models.Model):
 
     def __str__(self):
         return f"{self.user.username} - {self.date} - {self.count} spins"
+
+
+class SpinPrize(models.Model):
+    gift = models.CharField(max_length=100)
+    coins = models.PositiveIntegerField(default=0)
+    weight = models.PositiveIntegerField(default=1)
+    daily_budget = models.PositiveIntegerField(null=True, blank=True, help_text="Maximum awards per day, empty for unlimited")
+    is_active = models.BooleanField(default=True)
+
+    def __str__(self):
+        return f"{self.gift} ({self.coins} coins, weight {self.weight})"
+
+
+class SpinPrizeBudget(models.Model):
+    prize = models.ForeignKey(SpinPrize, on_delete=models.CASCADE)
+    date = models.DateField()
+    awarded = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('prize', 'date')
+
+    def __str__(self):
+        return f"{self.prize.gift} - {self.date} - {self.awarded} awarded"
+
+
+class SpinOutcome(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    date = models.DateField()
+    prize = models.ForeignKey(SpinPrize, null=True, blank=True, on_delete=models.SET_NULL)
+    gift = models.CharField(max_length=100, blank=True)
+    coins = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['user', 'date'])]
+
+    def __str__(self):
+        return f"{self.user.username} - {self.date} - {self.gift or 'nothing'}"
+
+
+from django.utils import timezone
+
+class CreditTransaction(models.Model):
+    REASON_CHOICES = [
+        ('signup', 'Signup bonus'),
+        ('spin', 'Spin prize'),
+        ('quiz_round', 'Quiz round'),
+        ('adjustment', 'Adjustment'),
+        ('snapshot', 'Compacted history'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    amount = models.IntegerField()
+    reason = models.CharField(max_length=20, choices=REASON_CHOICES)
+    reference = models.CharField(max_length=64, blank=True)
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['user', 'created_at'])]
+
+    def __str__(self):
+        return f"{self.user.username} {self.amount:+d} ({self.reason})"
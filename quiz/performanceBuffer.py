@@ -0,0 +1,268 @@
+import atexit
+import glob
+import json
+import logging
+import os
+import threading
+import uuid
+from datetime import date
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from .models import Performance, PerformanceFlush
+
+
+logger = logging.getLogger(__name__)
+
+
+class PerformanceBuffer:
+    """
+    Optional write-behind mode for the daily Performance counters.
+
+    Graded rounds are appended to a per-process journal file and summed in
+    memory per ``(user_id, date_played)``. Pending deltas are written with
+    ``bulk_update``/``bulk_create`` when QUIZ_PERFORMANCE_FLUSH_SIZE keys are
+    buffered or QUIZ_PERFORMANCE_FLUSH_INTERVAL seconds have passed.
+
+    A flush renames the journal to ``batch-<id>.jsonl`` and records ``<id>`` in
+    PerformanceFlush in the same transaction as the counters, so a batch left
+    behind by a crash is replayed exactly once. Journal lines are fsynced when
+    QUIZ_PERFORMANCE_JOURNAL_FSYNC is set, so they also survive a machine
+    crash, not just a process crash. Flushes run on a timer thread and never
+    on the grading request; a failed flush is logged and retried.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._flush_lock = threading.Lock()
+        self._pending = {}
+        self._inflight = {}
+        self._journal = None
+        self._timer = None
+        self._recovered = False
+
+    @property
+    def enabled(self):
+        return getattr(settings, 'QUIZ_PERFORMANCE_WRITE_BEHIND', False)
+
+    @property
+    def journal_dir(self):
+        return str(getattr(settings, 'QUIZ_PERFORMANCE_JOURNAL_DIR', os.path.join(settings.BASE_DIR, 'performance_journal')))
+
+    @property
+    def flush_size(self):
+        return getattr(settings, 'QUIZ_PERFORMANCE_FLUSH_SIZE', 500)
+
+    @property
+    def flush_interval(self):
+        return getattr(settings, 'QUIZ_PERFORMANCE_FLUSH_INTERVAL', 5)
+
+    def _journal_path(self):
+        return os.path.join(self.journal_dir, f"active-{os.getpid()}.jsonl")
+
+    def _batch_path(self, batch_id):
+        return os.path.join(self.journal_dir, f"batch-{batch_id}.jsonl")
+
+    def add(self, user_id, day, correct_answers, wrong_answers):
+        try:
+            self.recover()
+        except Exception:
+            # Retried on the next add, the round itself is still journaled.
+            logger.exception("Recovering performance journals failed")
+        with self._lock:
+            if self._journal is None:
+                os.makedirs(self.journal_dir, exist_ok=True)
+                self._journal = open(self._journal_path(), 'a', encoding='utf-8')
+            self._journal.write(json.dumps([user_id, day.isoformat(), 1, correct_answers, wrong_answers]) + '\n')
+            self._journal.flush()
+            if getattr(settings, 'QUIZ_PERFORMANCE_JOURNAL_FSYNC', True):
+                os.fsync(self._journal.fileno())
+
+            delta = self._pending.setdefault((user_id, day), [0, 0, 0])
+            delta[0] += 1
+            delta[1] += correct_answers
+            delta[2] += wrong_answers
+            size = len(self._pending)
+
+        self._schedule(0 if size >= self.flush_size else None)
+
+    def pending_for(self, user_id):
+        """Unflushed ``{date_played: [played, correct, wrong]}`` for one user."""
+        merged = {}
+        with self._lock:
+            for deltas in [*self._inflight.values(), self._pending]:
+                for (delta_user, day), (played, correct, wrong) in deltas.items():
+                    if delta_user != user_id:
+                        continue
+                    totals = merged.setdefault(day, [0, 0, 0])
+                    totals[0] += played
+                    totals[1] += correct
+                    totals[2] += wrong
+        return merged
+
+    def merge(self, user, performances, include_new=True, date_from=None, date_to=None, newest_first=False):
+        """
+        Overlay unflushed deltas on ``performances``. Days with no stored row
+        are added when ``include_new`` is set and they fall inside the range.
+        """
+        pending = self.pending_for(user.pk)
+        if not pending:
+            return list(performances)
+
+        merged = []
+        for performance in performances:
+            delta = pending.pop(performance.date_played, None)
+            if delta:
+                performance.total_quizzes_played += delta[0]
+                performance.correct_answers += delta[1]
+                performance.wrong_answers += delta[2]
+            merged.append(performance)
+        if include_new:
+            for day, (played, correct, wrong) in pending.items():
+                if (date_from and day < date_from) or (date_to and day > date_to):
+                    continue
+                merged.append(Performance(user=user, date_played=day, total_quizzes_played=played, correct_answers=correct, wrong_answers=wrong))
+        merged.sort(key=lambda performance: performance.date_played, reverse=newest_first)
+        return merged
+
+    def _schedule(self, delay=None):
+        """Flush after ``delay`` seconds, QUIZ_PERFORMANCE_FLUSH_INTERVAL by default."""
+        with self._lock:
+            if self._timer is not None:
+                if delay is None:
+                    return
+                self._timer.cancel()
+            self._timer = threading.Timer(self.flush_interval if delay is None else delay, self._flush_from_timer)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _flush_from_timer(self):
+        try:
+            self.flush()
+        except Exception:
+            # Batches stay in flight and are retried by the next flush.
+            logger.exception("Flushing buffered performance counters failed")
+            self._schedule()
+        finally:
+            connection.close()
+
+    def flush(self):
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if self._pending:
+                batch_id = uuid.uuid4().hex
+                self._journal.close()
+                self._journal = None
+                os.replace(self._journal_path(), self._batch_path(batch_id))
+                self._inflight[batch_id] = self._pending
+                self._pending = {}
+
+        flushed = 0
+        with self._flush_lock:
+            for batch_id, deltas in list(self._inflight.items()):
+                try:
+                    self._apply(batch_id, deltas)
+                    flushed += len(deltas)
+                except IntegrityError:
+                    if not PerformanceFlush.objects.filter(batch_id=batch_id).exists():
+                        # Another writer created one of the rows first, retry later.
+                        self._schedule()
+                        break
+                    # Already applied by a process that recovered the same batch.
+                with self._lock:
+                    self._inflight.pop(batch_id, None)
+                try:
+                    os.remove(self._batch_path(batch_id))
+                except FileNotFoundError:
+                    pass
+        return flushed
+
+    def _apply(self, batch_id, deltas):
+        user_ids = {user_id for user_id, _ in deltas}
+        days = {day for _, day in deltas}
+        with transaction.atomic():
+            PerformanceFlush.objects.create(batch_id=batch_id)
+            existing = {
+                (performance.user_id, performance.date_played): performance
+                for performance in Performance.objects.select_for_update().filter(user_id__in=user_ids, date_played__in=days)
+            }
+            to_update = []
+            to_create = []
+            for key, (played, correct, wrong) in deltas.items():
+                performance = existing.get(key)
+                if performance is None:
+                    to_create.append(Performance(user_id=key[0], date_played=key[1], total_quizzes_played=played, correct_answers=correct, wrong_answers=wrong))
+                    continue
+                performance.total_quizzes_played += played
+                performance.correct_answers += correct
+                performance.wrong_answers += wrong
+                to_update.append(performance)
+            Performance.objects.bulk_update(to_update, ['total_quizzes_played', 'correct_answers', 'wrong_answers'], batch_size=500)
+            Performance.objects.bulk_create(to_create, batch_size=500)
+
+    @staticmethod
+    def _read(path):
+        deltas = {}
+        with open(path, encoding='utf-8') as journal:
+            for line in journal:
+                try:
+                    user_id, day, played, correct, wrong = json.loads(line)
+                except ValueError:
+                    # Torn last line from a crash mid-write.
+                    continue
+                delta = deltas.setdefault((user_id, date.fromisoformat(day)), [0, 0, 0])
+                delta[0] += played
+                delta[1] += correct
+                delta[2] += wrong
+        return deltas
+
+    @staticmethod
+    def _is_alive(pid):
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            return True
+        return True
+
+    def recover(self):
+        """Replay journals and batches left behind by crashed processes."""
+        if self._recovered or not os.path.isdir(self.journal_dir):
+            self._recovered = True
+            return
+        with self._lock:
+            if self._recovered:
+                return
+            for path in glob.glob(os.path.join(self.journal_dir, 'active-*.jsonl')):
+                pid = int(os.path.basename(path)[len('active-'):-len('.jsonl')])
+                if pid != os.getpid() and self._is_alive(pid):
+                    continue
+                try:
+                    os.replace(path, self._batch_path(uuid.uuid4().hex))
+                except FileNotFoundError:
+                    # Another booting worker claimed it first.
+                    pass
+
+            for path in glob.glob(os.path.join(self.journal_dir, 'batch-*.jsonl')):
+                batch_id = os.path.basename(path)[len('batch-'):-len('.jsonl')]
+                try:
+                    if PerformanceFlush.objects.filter(batch_id=batch_id).exists():
+                        os.remove(path)
+                        continue
+                    self._inflight[batch_id] = self._read(path)
+                except FileNotFoundError:
+                    # Applied and removed by its owner in the meantime.
+                    pass
+            self._recovered = True
+        self._schedule(0)
+
+
+performance_buffer = PerformanceBuffer()
+
+
+@atexit.register
+def _flush_on_exit():
+    if performance_buffer.enabled and (performance_buffer._pending or performance_buffer._inflight):
+        performance_buffer.flush()
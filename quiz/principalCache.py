@@ -0,0 +1,121 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache as default_cache
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+from .contentVersion import bump_version, get_version
+
+
+def _namespace(user_id):
+    return f"principal:{user_id}"
+
+
+class PrincipalCache:
+    """
+    Process-wide LRU of authenticated users loaded together with their Profile.
+
+    Entries are reused for QUIZ_PRINCIPAL_CACHE_TTL seconds as long as the
+    per-user version stamp is unchanged; ``invalidate`` bumps the stamp. The
+    per-user stamps are bumped on every credit change, so they stay in the
+    default cache rather than the shared version-stamp cache. Only
+    workers sharing that cache backend see the bump at once: with the default
+    per-process LocMemCache, a change made on another worker (deactivation,
+    password, credits) is picked up only when the TTL expires. Keep the TTL
+    short or configure a shared cache such as Redis or Memcached.
+    Callers get detached copies and may modify them freely.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    @property
+    def ttl(self):
+        return getattr(settings, 'QUIZ_PRINCIPAL_CACHE_TTL', 30)
+
+    @property
+    def maxsize(self):
+        return getattr(settings, 'QUIZ_PRINCIPAL_CACHE_SIZE', 10000)
+
+    def get(self, user_id):
+        """A copy of the user with ``user.profile`` preloaded; raises User.DoesNotExist."""
+        version = get_version(_namespace(user_id), default_cache)
+        with self._lock:
+            entry = self._entries.get(user_id)
+        if entry is None or entry[1] != version or time.monotonic() - entry[2] > self.ttl:
+            # The stamp is read before loading, a concurrent bump makes the entry stale at once.
+            user = User.objects.select_related('profile').get(pk=user_id)
+            entry = (user, version, time.monotonic())
+            with self._lock:
+                self._entries[user_id] = entry
+                self._entries.move_to_end(user_id)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+        return self._detach(entry[0])
+
+    @staticmethod
+    def _detach(user):
+        user = copy.copy(user)
+        profile = user._state.fields_cache.get('profile')
+        if profile is not None:
+            profile = copy.copy(profile)
+            profile._state.fields_cache['user'] = user
+            user._state.fields_cache['profile'] = profile
+        return user
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+        bump_version(_namespace(user_id), default_cache)
+
+    def invalidate_many(self, user_ids):
+        for user_id in user_ids:
+            self.invalidate(user_id)
+
+    def invalidate_on_commit(self, user_ids):
+        """For writes that bypass the User/Profile save signals (``update``, ``bulk_update``)."""
+        user_ids = list(user_ids)
+        if user_ids:
+            transaction.on_commit(lambda: self.invalidate_many(user_ids))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+principal_cache = PrincipalCache()
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication that resolves the user and profile through ``principal_cache``."""
+
+    def get_user(self, validated_token):
+        if api_settings.USER_ID_FIELD not in ('id', 'pk'):
+            return super().get_user(validated_token)
+
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        try:
+            user = principal_cache.get(int(user_id))
+        except (User.DoesNotExist, ValueError):
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+
+        return user
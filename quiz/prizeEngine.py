@@ -0,0 +1,161 @@
+import random
+import threading
+import time
+from collections import namedtuple
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from .contentVersion import get_version, bump_version
+from .upsert import can_upsert, upsert_counters
+
+
+PRIZE_VERSION_NAMESPACE = 'spin_prizes'
+
+Prize = namedtuple('Prize', ['id', 'gift', 'coins', 'daily_budget'])
+
+NO_PRIZE = Prize(None, None, 0, None)
+
+
+class AliasTable:
+    """Walker/Vose alias table: O(n) to build, O(1) per weighted draw."""
+
+    def __init__(self, weights):
+        n = len(weights)
+        total = float(sum(weights))
+        self.size = n
+        self.probability = [0.0] * n
+        self.alias = list(range(n))
+        if not n or total <= 0:
+            self.size = 0
+            return
+
+        scaled = [weight * n / total for weight in weights]
+        small = [index for index, value in enumerate(scaled) if value < 1.0]
+        large = [index for index, value in enumerate(scaled) if value >= 1.0]
+        while small and large:
+            less, more = small.pop(), large.pop()
+            self.probability[less] = scaled[less]
+            self.alias[less] = more
+            scaled[more] -= 1.0 - scaled[less]
+            (small if scaled[more] < 1.0 else large).append(more)
+        for index in small + large:
+            # Left-overs are 1.0 up to rounding error.
+            self.probability[index] = 1.0
+
+    def draw(self, rand=random.random):
+        if not self.size:
+            return None
+        point = rand() * self.size
+        index = int(point)
+        return index if point - index < self.probability[index] else self.alias[index]
+
+
+class PrizeTable:
+    """
+    Active SpinPrize rows and their alias tables, cached per process. Reloaded
+    when the ``spin_prizes`` version stamp is bumped by the SpinPrize signals
+    or after QUIZ_SPIN_PRIZE_MAX_AGE seconds.
+
+    A drawn prize whose daily budget is used up is replaced by a draw over the
+    unlimited prizes only, so the odds between those stay as configured.
+    Budgets are tracked in one SpinPrizeBudget counter row per prize and day.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._loaded_at = 0.0
+        self._prizes = []
+        self._table = AliasTable([])
+        self._unlimited = []
+        self._unlimited_table = AliasTable([])
+        self._exhausted = set()
+
+    @property
+    def max_age(self):
+        return getattr(settings, 'QUIZ_SPIN_PRIZE_MAX_AGE', 300)
+
+    def _ensure_loaded(self):
+        version = get_version(PRIZE_VERSION_NAMESPACE)
+        if version != self._version or time.monotonic() - self._loaded_at > self.max_age:
+            with self._lock:
+                if version != self._version or time.monotonic() - self._loaded_at > self.max_age:
+                    self._load(version)
+
+    def _load(self, version):
+        from .models import SpinPrize
+        rows = SpinPrize.objects.filter(is_active=True, weight__gt=0).order_by('id').values_list('id', 'gift', 'coins', 'daily_budget', 'weight')
+        prizes, weights = [], []
+        for prize_id, gift, coins, daily_budget, weight in rows:
+            prizes.append(Prize(prize_id, gift, coins, daily_budget))
+            weights.append(weight)
+        unlimited = [index for index, prize in enumerate(prizes) if prize.daily_budget is None]
+
+        self._prizes = prizes
+        self._table = AliasTable(weights)
+        self._unlimited = [prizes[index] for index in unlimited]
+        self._unlimited_table = AliasTable([weights[index] for index in unlimited])
+        self._exhausted = set()
+        self._version = version
+        self._loaded_at = time.monotonic()
+
+    def invalidate(self):
+        bump_version(PRIZE_VERSION_NAMESPACE)
+
+    def prizes(self):
+        self._ensure_loaded()
+        return self._prizes
+
+    def draw(self):
+        """Weighted pick ignoring budgets, for benchmarks and previews."""
+        self._ensure_loaded()
+        index = self._table.draw()
+        return NO_PRIZE if index is None else self._prizes[index]
+
+    def _draw_unlimited(self):
+        index = self._unlimited_table.draw()
+        return NO_PRIZE if index is None else self._unlimited[index]
+
+    @staticmethod
+    def _upsert_budget(prize, day):
+        from .models import SpinPrizeBudget
+        return upsert_counters(
+            SpinPrizeBudget, {'prize': prize.id, 'date': day}, {'awarded': 1}, limit=('awarded', prize.daily_budget)
+        ) is not None
+
+    @staticmethod
+    def _conditional_budget(prize, day):
+        from .models import SpinPrizeBudget
+        SpinPrizeBudget.objects.bulk_create([SpinPrizeBudget(prize_id=prize.id, date=day)], ignore_conflicts=True)
+        return bool(SpinPrizeBudget.objects.filter(
+            prize_id=prize.id, date=day, awarded__lt=prize.daily_budget
+        ).update(awarded=F('awarded') + 1))
+
+    def _claim_budget(self, prize, day):
+        if (prize.id, day) in self._exhausted:
+            return False
+        if prize.daily_budget <= 0:
+            claimed = False
+        elif can_upsert():
+            claimed = self._upsert_budget(prize, day)
+        else:
+            claimed = self._conditional_budget(prize, day)
+        if not claimed:
+            # Only trust the miss once this transaction commits; a rolled back
+            # spin may have seen its own uncommitted claims.
+            key = (prize.id, day)
+            transaction.on_commit(lambda: self._exhausted.add(key))
+        return claimed
+
+    def award(self, day):
+        """
+        Draw a prize for one spin on ``day`` and claim its budget. Must run in
+        the caller's transaction so the claim rolls back with the spin.
+        """
+        prize = self.draw()
+        if prize.daily_budget is not None and not self._claim_budget(prize, day):
+            prize = self._draw_unlimited()
+        return prize
+
+
+prize_table = PrizeTable()
@@ -0,0 +1,151 @@
+import csv
+import io
+import json
+import os
+import zipfile
+from collections import namedtuple
+from django.conf import settings
+from django.db import transaction
+from .contentCodec import encode_text
+from .contentSearch import normalize_search_text
+from .contentVersion import bump_version
+from .models import Quiz
+from .quizSampler import QUIZ_VERSION_NAMESPACE
+
+
+COLUMNS = ('question', 'options', 'correct_answer')
+
+ImportResult = namedtuple('ImportResult', ['created', 'errors'])
+
+
+class ImportFormatError(ValueError):
+    """The file cannot be read at all (unknown type, missing header columns)."""
+
+
+def cell_text(value):
+    """Spreadsheet cells may hold numbers, dates or nothing at all."""
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def _check_header(header):
+    missing = [column for column in COLUMNS if column not in header]
+    if missing:
+        raise ImportFormatError(f"Missing column(s): {', '.join(missing)}")
+
+
+def _xlsx_rows(fileobj):
+    from openpyxl import load_workbook
+    workbook = load_workbook(fileobj, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [cell_text(cell) for cell in next(rows, ())]
+        _check_header(header)
+        positions = [header.index(column) for column in COLUMNS]
+        for number, row in enumerate(rows, start=2):
+            yield number, {column: row[position] if position < len(row) else None for column, position in zip(COLUMNS, positions)}
+    finally:
+        workbook.close()
+
+
+def _csv_rows(fileobj):
+    reader = csv.DictReader(io.TextIOWrapper(fileobj, encoding='utf-8-sig', newline=''))
+    _check_header([cell_text(name) for name in reader.fieldnames or ()])
+    for number, row in enumerate(reader, start=2):
+        yield number, row
+
+
+def _jsonl_rows(fileobj):
+    for number, line in enumerate(io.TextIOWrapper(fileobj, encoding='utf-8-sig'), start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield number, e
+            continue
+        yield number, row if isinstance(row, dict) else ValueError("Line is not a JSON object")
+
+
+READERS = {
+    '.xlsx': _xlsx_rows,
+    '.xlsm': _xlsx_rows,
+    '.csv': _csv_rows,
+    '.jsonl': _jsonl_rows,
+    '.ndjson': _jsonl_rows,
+}
+
+
+def iter_rows(fileobj, name):
+    """``(row_number, row dict or exception)`` pairs, read lazily."""
+    extension = os.path.splitext(name)[1].lower()
+    reader = READERS.get(extension)
+    if extension == '.xls':
+        # pandas/xlrd used to read these; openpyxl only handles the xlsx family.
+        raise ImportFormatError("Legacy .xls workbooks are no longer supported, save the file as .xlsx or CSV and upload it again.")
+    if reader is None:
+        raise ImportFormatError(f"Unsupported file type '{extension}', use one of {', '.join(sorted(READERS))}")
+    return reader(fileobj)
+
+
+def _guarded(rows):
+    from openpyxl.utils.exceptions import InvalidFileException
+    try:
+        yield from rows
+    except UnicodeDecodeError:
+        raise ImportFormatError("The file is not UTF-8 encoded.")
+    except (zipfile.BadZipFile, InvalidFileException, KeyError) as e:
+        # openpyxl raises KeyError for a zip that lacks the xlsx parts.
+        raise ImportFormatError(f"The file is not a valid spreadsheet: {e}")
+
+
+def _encode_batch(batch):
+    questions, options, answers = zip(*batch)
+    search_texts = [normalize_search_text(*values) for values in batch]
+    return [
+        Quiz(_question=question, _options=option, _correct_answer=answer, search_text=search_text)
+        for question, option, answer, search_text in zip(map(encode_text, questions), map(encode_text, options), map(encode_text, answers), search_texts)
+    ]
+
+
+def import_quizzes(fileobj, name, batch_size=None, dry_run=False):
+    """
+    Stream quizzes from an xlsx, CSV or JSONL file into the database with
+    ``bulk_create`` in one transaction. Invalid rows are skipped and reported
+    as ``(row_number, message)`` in the result. ``bulk_create`` sends no
+    signals, so the ``quiz`` version stamp is bumped once after the commit.
+    """
+    batch_size = batch_size or getattr(settings, 'QUIZ_IMPORT_BATCH_SIZE', 1000)
+    created = 0
+    errors = []
+    batch = []
+
+    def flush():
+        nonlocal created
+        if batch and not dry_run:
+            Quiz.objects.bulk_create(_encode_batch(batch), batch_size=batch_size)
+        created += len(batch)
+        batch.clear()
+
+    with transaction.atomic():
+        for number, row in _guarded(iter_rows(fileobj, name)):
+            if isinstance(row, Exception):
+                errors.append((number, str(row)))
+                continue
+            values = tuple(cell_text(row.get(column)) for column in COLUMNS)
+            if not any(values):
+                continue
+            empty = [column for column, value in zip(COLUMNS, values) if not value]
+            if empty:
+                errors.append((number, f"Empty {', '.join(empty)}"))
+                continue
+            batch.append(values)
+            if len(batch) >= batch_size:
+                flush()
+        flush()
+        if created and not dry_run:
+            transaction.on_commit(lambda: bump_version(QUIZ_VERSION_NAMESPACE))
+    return ImportResult(created, errors)
@@ -0,0 +1,111 @@
+import random
+import threading
+import time
+from array import array
+from django.conf import settings
+from django.core.cache import cache
+from .contentVersion import get_version, bump_version
+
+
+QUIZ_VERSION_NAMESPACE = 'quiz'
+
+
+class QuizIdIndex:
+    """
+    Compact in-process index of live quiz IDs.
+
+    The index is rebuilt lazily when the shared ``quiz`` version stamp changes
+    (bumped by the Quiz signals) or when it is older than QUIZ_INDEX_MAX_AGE,
+    so sampling never needs a COUNT query.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ids = array('q')
+        self._version = None
+        self._built_at = 0.0
+
+    @property
+    def max_age(self):
+        return getattr(settings, 'QUIZ_INDEX_MAX_AGE', 300)
+
+    def ids(self):
+        version = get_version(QUIZ_VERSION_NAMESPACE)
+        if version != self._version or time.monotonic() - self._built_at > self.max_age:
+            with self._lock:
+                if version != self._version or time.monotonic() - self._built_at > self.max_age:
+                    self._rebuild(version)
+        return self._ids
+
+    def _rebuild(self, version):
+        from .models import Quiz
+        ids = array('q', Quiz.objects.order_by('id').values_list('id', flat=True).iterator())
+        self._ids = ids
+        self._version = version
+        self._built_at = time.monotonic()
+
+    def invalidate(self):
+        bump_version(QUIZ_VERSION_NAMESPACE)
+
+    def sample(self, n, exclude=None, taken=None):
+        """
+        Up to ``n`` distinct random quiz IDs. IDs in ``exclude`` (recently
+        seen) are only used to pad the result when too few others are left;
+        IDs in ``taken`` (already picked for the response) are never returned.
+        """
+        ids = self.ids()
+        total = len(ids)
+        if not exclude and not taken:
+            n = min(n, total)
+            return [ids[i] for i in random.sample(range(total), n)] if n > 0 else []
+
+        taken = set(taken or ())
+        avoid = taken | set(exclude or ())
+        if n <= 0:
+            return []
+
+        if (len(avoid) + n) * 2 >= total:
+            # Exclusions and picks cover most of the pool, rejection sampling would spin.
+            fresh = [quiz_id for quiz_id in ids if quiz_id not in avoid]
+            if len(fresh) >= n:
+                return random.sample(fresh, n)
+            seen = [quiz_id for quiz_id in ids if quiz_id in avoid and quiz_id not in taken]
+            return fresh + random.sample(seen, min(n - len(fresh), len(seen)))
+
+        picked = []
+        picked_set = set()
+        while len(picked) < n:
+            quiz_id = ids[random.randrange(total)]
+            if quiz_id in avoid or quiz_id in picked_set:
+                continue
+            picked.append(quiz_id)
+            picked_set.add(quiz_id)
+        return picked
+
+
+class RecentQuizzes:
+    """Per-user window of recently served quiz IDs, kept in the Django cache."""
+
+    @property
+    def window(self):
+        return getattr(settings, 'QUIZ_RECENT_WINDOW', 100)
+
+    def _key(self, user_id):
+        return f"quiz:recent:{user_id}"
+
+    def get(self, user_id):
+        if self.window <= 0:
+            return set()
+        return set(cache.get(self._key(user_id), ()))
+
+    def add(self, user_id, quiz_ids):
+        window = self.window
+        if window <= 0:
+            return
+        recent = list(cache.get(self._key(user_id), ()))
+        recent.extend(quiz_ids)
+        cache.set(self._key(user_id), recent[-window:], timeout=getattr(settings, 'QUIZ_RECENT_TTL', 60 * 60 * 24))
+
+
+quiz_id_index = QuizIdIndex()
+recent_quizzes = RecentQuizzes()
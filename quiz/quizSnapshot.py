@@ -0,0 +1,114 @@
+import logging
+import threading
+import time
+from django.conf import settings
+from django.db import connection
+from rest_framework.renderers import JSONRenderer
+from .contentVersion import get_version
+from .quizSampler import QUIZ_VERSION_NAMESPACE
+
+
+logger = logging.getLogger(__name__)
+
+
+class QuizSnapshot:
+    """
+    Every quiz pre-rendered as a JSON fragment, so the quiz list can be served
+    by joining bytes instead of running the serializer per request.
+
+    Saves and deletes in this process are applied one row at a time from the
+    Quiz signals. Any other change to the shared ``quiz`` version stamp (another
+    worker, a bulk import) or QUIZ_INDEX_MAX_AGE passing starts one rebuild in
+    a background thread; requests keep getting the previous snapshot until it
+    is swapped in. Only the very first read waits for a build.
+    ``published`` counts the snapshots this process has served.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._fragments = {}
+        self._version = None
+        self._built_at = 0.0
+        self._rebuilding = False
+        self.published = 0
+
+    @property
+    def max_age(self):
+        return getattr(settings, 'QUIZ_INDEX_MAX_AGE', 300)
+
+    def render(self, quiz):
+        from .serializer import QuizSerializer
+        return JSONRenderer().render(QuizSerializer(quiz).data)
+
+    def _current(self):
+        version = get_version(QUIZ_VERSION_NAMESPACE)
+        if version != self._version or time.monotonic() - self._built_at > self.max_age:
+            if self._version is None:
+                with self._lock:
+                    if self._version is None:
+                        self._install(version, self._build())
+            else:
+                with self._lock:
+                    if self._rebuilding:
+                        return self._fragments
+                    self._rebuilding = True
+                self._spawn(lambda: self._rebuild(version))
+        return self._fragments
+
+    def _spawn(self, target):
+        def run():
+            try:
+                target()
+            finally:
+                connection.close()
+        threading.Thread(target=run, name='quiz-snapshot', daemon=True).start()
+
+    def _build(self):
+        from .models import Quiz
+        return {quiz.pk: self.render(quiz) for quiz in Quiz.objects.order_by('id').iterator(chunk_size=2000)}
+
+    def _install(self, version, fragments):
+        self._fragments = fragments
+        self._version = version
+        self._built_at = time.monotonic()
+        self.published += 1
+
+    def _rebuild(self, version):
+        try:
+            # Rendered outside the lock. If a save lands meanwhile, ``version``
+            # is already behind the stamp and the next read rebuilds again.
+            fragments = self._build()
+            with self._lock:
+                self._install(version, fragments)
+        except Exception:
+            logger.exception("Rebuilding the quiz snapshot failed")
+        finally:
+            with self._lock:
+                self._rebuilding = False
+
+    def fragments(self, quiz_ids):
+        fragments = self._current()
+        return {quiz_id: fragments[quiz_id] for quiz_id in quiz_ids if quiz_id in fragments}
+
+    def store(self, quiz, previous_version, version):
+        with self._lock:
+            if self._version != previous_version:
+                return
+            self._fragments[quiz.pk] = self.render(quiz)
+            self._version = version
+            self.published += 1
+
+    def discard(self, quiz_id, previous_version, version):
+        with self._lock:
+            if self._version != previous_version:
+                return
+            self._fragments.pop(quiz_id, None)
+            self._version = version
+            self.published += 1
+
+    @staticmethod
+    def join(fragments):
+        return b'[' + b','.join(fragments) + b']'
+
+
+quiz_snapshot = QuizSnapshot()
@@ -2,19 +2,102 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.pagination import CursorPagination
 from .models import Quiz, Profile, Performance
 from .serializer import PerformanceSerializer
-from datetime import date
-from django.db.models import F
+from .grading import grade_answers
+from .settlement import settle_round
+from .performanceBuffer import performance_buffer
+from datetime import date, timedelta
+from django.db.models import Sum
+from django.db.models.functions import TruncMonth, TruncWeek
+
+class PerformanceCursorPagination(CursorPagination):
+    ordering = '-date_played'
+    page_size = 30
+    page_size_query_param = 'page_size'
+    max_page_size = 366
+
+
+ROLLUP_PERIODS = {
+    'week': TruncWeek,
+    'month': TruncMonth,
+}
+
 
 class UserPerformanceView(APIView):
     permission_classes = [IsAuthenticated]
+    pagination_class = PerformanceCursorPagination
 
     def get(self, request):
         user = request.user
-        performances = Performance.objects.filter(user=user).order_by('date_played')
-        serializer = PerformanceSerializer(performances, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        try:
+            date_from = self.parse_date(request.query_params.get('from'))
+            date_to = self.parse_date(request.query_params.get('to'))
+        except ValueError:
+            return Response({"error": "'from' and 'to' must be dates in YYYY-MM-DD format."}, status=status.HTTP_400_BAD_REQUEST)
+
+        performances = Performance.objects.filter(user=user)
+        if date_from:
+            performances = performances.filter(date_played__gte=date_from)
+        if date_to:
+            performances = performances.filter(date_played__lte=date_to)
+
+        rollup = request.query_params.get('rollup')
+        if rollup:
+            if rollup not in ROLLUP_PERIODS:
+                return Response({"error": "'rollup' must be one of: week, month."}, status=status.HTTP_400_BAD_REQUEST)
+            return Response(self.rollup(user, performances, rollup, date_from, date_to), status=status.HTTP_200_OK)
+
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(performances.select_related('user'), request, view=self)
+        if performance_buffer.enabled:
+            first_page = not request.query_params.get(paginator.cursor_query_param)
+            # Days with no stored row yet only go on the first page, and only
+            # the ones that sort before the next page starts.
+            new_from = max(filter(None, [date_from, page[-1].date_played])) if paginator.has_next else date_from
+            page = performance_buffer.merge(user, page, include_new=first_page, date_from=new_from, date_to=date_to, newest_first=True)
+        serializer = PerformanceSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+    @staticmethod
+    def parse_date(value):
+        return date.fromisoformat(value) if value else None
+
+    def rollup(self, user, performances, rollup, date_from, date_to):
+        trunc = ROLLUP_PERIODS[rollup]
+        rows = (
+            performances
+            .annotate(period=trunc('date_played'))
+            .values('period')
+            .annotate(
+                total_quizzes_played=Sum('total_quizzes_played'),
+                correct_answers=Sum('correct_answers'),
+                wrong_answers=Sum('wrong_answers'),
+            )
+            .order_by('-period')
+        )
+        periods = {row['period']: row for row in rows}
+
+        if performance_buffer.enabled:
+            for day, (played, correct, wrong) in performance_buffer.pending_for(user.pk).items():
+                if (date_from and day < date_from) or (date_to and day > date_to):
+                    continue
+                period = day - timedelta(days=day.weekday()) if rollup == 'week' else day.replace(day=1)
+                row = periods.setdefault(period, {'period': period, 'total_quizzes_played': 0, 'correct_answers': 0, 'wrong_answers': 0})
+                row['total_quizzes_played'] += played
+                row['correct_answers'] += correct
+                row['wrong_answers'] += wrong
+
+        results = []
+        for period in sorted(periods, reverse=True):
+            row = periods[period]
+            total_questions = row['correct_answers'] + row['wrong_answers']
+            row['period'] = period.strftime('%Y-%m-%d')
+            row['total_questions'] = total_questions
+            row['accuracy'] = round(row['correct_answers'] / total_questions, 4) if total_questions else 0.0
+            results.append(row)
+        return {"rollup": rollup, "results": results}
 
 class ValidateResultView(APIView):
     permission_classes = [IsAuthenticated]
@@ -36,39 +119,16 @@ class ValidateResultView(APIView):
         if len(quiz_ids) != len(user_answers):
             return Response({"error": "Quiz IDs and User Answers length mismatch."}, status=status.HTTP_400_BAD_REQUEST)
 
-        correct_answers = 0
-        wrong_answers = 0
         today = date.today()
 
-        for quiz_id, user_answer in zip(quiz_ids, user_answers):
-            try:
-                quiz = Quiz.objects.get(id=quiz_id)
-                if quiz.correct_answer == user_answer:
-                    correct_answers += 1
-                else:
-                    wrong_answers += 1
-            except Quiz.DoesNotExist:
-                return Response({"error": f"Quiz with ID {quiz_id} does not exist."}, status=status.HTTP_400_BAD_REQUEST)
-
-        performance, created = Performance.objects.get_or_create(
-            user=user,
-            date_played=today,
-            defaults={
-                'total_quizzes_played': 1,
-                'correct_answers': correct_answers,
-                'wrong_answers': wrong_answers
-            }
-        )
-
-        if not created:
-            performance.total_quizzes_played = F('total_quizzes_played') + 1
-            performance.correct_answers = F('correct_answers') + correct_answers
-            performance.wrong_answers = F('wrong_answers') + wrong_answers
-            performance.save(update_fields=['total_quizzes_played', 'correct_answers', 'wrong_answers'])
+        result = grade_answers(quiz_ids, user_answers)
+        if result.missing_ids:
+            missing = ', '.join(str(quiz_id) for quiz_id in result.missing_ids)
+            return Response({"error": f"Quiz with ID {missing} does not exist.", "missing_quiz_ids": result.missing_ids}, status=status.HTTP_400_BAD_REQUEST)
+        correct_answers = result.correct_answers
+        wrong_answers = result.wrong_answers
 
-        # Deducting credit points
-        profile.credit = F('credit') - 10
-        profile.save(update_fields=['credit'])
+        performance, created = settle_round(user, correct_answers, wrong_answers, day=today)
 
         serializer = PerformanceSerializer(performance)
         return Response(serializer.data, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
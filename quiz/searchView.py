@@ -0,0 +1,34 @@
+from rest_framework import generics, permissions
+from rest_framework.exceptions import ValidationError
+from .models import Quiz, FAQs
+from .serializer import QuizSerializer, FAQsSerializer
+from .contentSearch import search
+
+
+class SearchMixin:
+    """``?q=`` search over the model's ``search_text`` column, at most ``limit`` results."""
+    max_limit = 100
+    pagination_class = None
+
+    def get_queryset(self):
+        query = self.request.query_params.get('q', '').strip()
+        if not query:
+            raise ValidationError({"error": "'q' is required"})
+        try:
+            limit = min(max(int(self.request.query_params.get('limit', 20)), 1), self.max_limit)
+        except ValueError:
+            raise ValidationError({"error": "Invalid value for 'limit'"})
+        return search(self.model.objects.order_by('id'), query)[:limit]
+
+
+class QuizSearchView(SearchMixin, generics.ListAPIView):
+    # Results include the correct answer, so this is for staff tooling only.
+    model = Quiz
+    serializer_class = QuizSerializer
+    permission_classes = [permissions.IsAdminUser]
+
+
+class FAQsSearchView(SearchMixin, generics.ListAPIView):
+    model = FAQs
+    serializer_class = FAQsSerializer
+    permission_classes = [permissions.AllowAny]
@@ -1,6 +1,8 @@
 from rest_framework import serializers
 from .models import Profile, Quiz, FAQs, Slider
-import base64
+from .contentCodec import encode_text
+from .imageDerivatives import CONTENT_TYPES
+from django.core.files.storage import default_storage
 from django.contrib.auth.models import User
 
 
@@ -24,7 +26,8 @@ class ProfileSerializer(serializers.ModelSerializer):
         instance.subscription_phone = validated_data.get('subscription_phone', instance.subscription_phone)
         instance.operator = validated_data.get('operator', instance.operator)
         instance.full_name = validated_data.get('full_name', instance.full_name)
-        instance.save()
+        # The instance may be a cached principal, never write back its credits/subscription snapshot.
+        instance.save(update_fields=['primary_phone', 'subscription_phone', 'operator', 'full_name'])
         return instance
 
 class QuizSerializer(serializers.ModelSerializer):
@@ -32,35 +35,16 @@ class QuizSerializer(serializers.ModelSerializer):
         model = Quiz
         fields = ('id', 'question', 'options', 'correct_answer')
 
-    def to_representation(self, instance):
-        representation = super().to_representation(instance)
-        try:
-            representation['question'] = base64.b64decode(instance._question.encode('ascii')).decode('utf-8')
-        except (ValueError, UnicodeEncodeError, base64.binascii.Error):
-            representation['question'] = instance._question
-
-        try:
-            representation['options'] = base64.b64decode(instance._options.encode('ascii')).decode('utf-8')
-        except (ValueError, UnicodeEncodeError, base64.binascii.Error):
-            representation['options'] = instance._options
-
-        try:
-            representation['correct_answer'] = base64.b64decode(instance._correct_answer.encode('ascii')).decode('utf-8')
-        except (ValueError, UnicodeEncodeError, base64.binascii.Error):
-            representation['correct_answer'] = instance._correct_answer
-
-        return representation
-
     def create(self, validated_data):
-        validated_data['_question'] = base64.b64encode(validated_data['question'].encode('utf-8')).decode('ascii')
-        validated_data['_options'] = base64.b64encode(validated_data['options'].encode('utf-8')).decode('ascii')
-        validated_data['_correct_answer'] = base64.b64encode(validated_data['correct_answer'].encode('utf-8')).decode('ascii')
+        validated_data['_question'] = encode_text(validated_data['question'])
+        validated_data['_options'] = encode_text(validated_data['options'])
+        validated_data['_correct_answer'] = encode_text(validated_data['correct_answer'])
         return super().create(validated_data)
 
     def update(self, instance, validated_data):
-        instance._question = base64.b64encode(validated_data.get('question', instance.question).encode('utf-8')).decode('ascii')
-        instance._options = base64.b64encode(validated_data.get('options', instance.options).encode('utf-8')).decode('ascii')
-        instance._correct_answer = base64.b64encode(validated_data.get('correct_answer', instance.correct_answer).encode('utf-8')).decode('ascii')
+        instance.question = validated_data.get('question', instance.question)
+        instance.options = validated_data.get('options', instance.options)
+        instance.correct_answer = validated_data.get('correct_answer', instance.correct_answer)
         instance.save()
         return instance
 
@@ -70,38 +54,25 @@ class FAQsSerializer(serializers.ModelSerializer):
         model = FAQs
         fields = ['id', 'question', 'answer']
 
-    def to_representation(self, instance):
-        representation = super().to_representation(instance)
-        try:
-            representation['question'] = base64.b64decode(instance._question.encode('ascii')).decode('utf-8')
-        except (ValueError, UnicodeEncodeError, base64.binascii.Error):
-            representation['question'] = instance._question
-
-        try:
-            representation['answer'] = base64.b64decode(instance._answer.encode('ascii')).decode('utf-8')
-        except (ValueError, UnicodeEncodeError, base64.binascii.Error):
-            representation['answer'] = instance._answer
-
-        return representation
-
     def create(self, validated_data):
-        validated_data['_question'] = base64.b64encode(validated_data['question'].encode('utf-8')).decode('ascii')
-        validated_data['_answer'] = base64.b64encode(validated_data['answer'].encode('utf-8')).decode('ascii')
+        validated_data['_question'] = encode_text(validated_data['question'])
+        validated_data['_answer'] = encode_text(validated_data['answer'])
         return super().create(validated_data)
 
     def update(self, instance, validated_data):
-        instance._question = base64.b64encode(validated_data.get('question', instance.question).encode('utf-8')).decode('ascii')
-        instance._answer = base64.b64encode(validated_data.get('answer', instance.answer).encode('utf-8')).decode('ascii')
+        instance.question = validated_data.get('question', instance.question)
+        instance.answer = validated_data.get('answer', instance.answer)
         instance.save()
         return instance
 
 
 class SliderSerializer(serializers.ModelSerializer):
     image_url = serializers.SerializerMethodField()
+    srcset = serializers.SerializerMethodField()
 
     class Meta:
         model = Slider
-        fields = ['id', 'image', 'image_url']
+        fields = ['id', 'image', 'image_url', 'srcset']
 
     def get_image_url(self, obj):
         request = self.context.get('request')
@@ -109,6 +80,20 @@ class SliderSerializer(serializers.ModelSerializer):
             return request.build_absolute_uri(obj.image.url)
         return None
 
+    def get_srcset(self, obj):
+        # Empty until the derivative worker has processed the current image.
+        request = self.context.get('request')
+        if not request or obj.variants.get('source') != obj.image.name:
+            return []
+        return [
+            {
+                'url': request.build_absolute_uri(default_storage.url(image['name'])),
+                'width': image['width'],
+                'type': CONTENT_TYPES[image['format']],
+            }
+            for image in obj.variants['images']
+        ]
+
 
 
 
@@ -0,0 +1,83 @@
+from datetime import date
+from django.conf import settings
+from django.db import connection, transaction
+from .models import Performance
+from .performanceBuffer import performance_buffer
+from .leaderboard import leaderboards
+from .creditsLedger import apply_credit
+from .upsert import can_upsert, upsert_counters
+
+
+def _upsert_performance(user, day, correct_answers, wrong_answers):
+    pk, played, correct, wrong = upsert_counters(
+        Performance,
+        {'user': user.pk, 'date_played': day},
+        {'total_quizzes_played': 1, 'correct_answers': correct_answers, 'wrong_answers': wrong_answers},
+        returning=('pk', 'total_quizzes_played', 'correct_answers', 'wrong_answers'),
+    )
+
+    performance = Performance(
+        id=pk,
+        user=user,
+        date_played=day,
+        total_quizzes_played=played,
+        correct_answers=correct,
+        wrong_answers=wrong,
+    )
+    performance._state.adding = False
+    performance._state.db = connection.alias
+    return performance, played == 1
+
+
+def _get_or_create_performance(user, day, correct_answers, wrong_answers):
+    performance, created = Performance.objects.select_for_update().get_or_create(
+        user=user,
+        date_played=day,
+        defaults={
+            'total_quizzes_played': 1,
+            'correct_answers': correct_answers,
+            'wrong_answers': wrong_answers
+        }
+    )
+    if not created:
+        performance.total_quizzes_played += 1
+        performance.correct_answers += correct_answers
+        performance.wrong_answers += wrong_answers
+        performance.save(update_fields=['total_quizzes_played', 'correct_answers', 'wrong_answers'])
+    return performance, created
+
+
+def _settle_write_behind(user, day, correct_answers, wrong_answers, cost):
+    apply_credit(user, -cost, 'quiz_round', day)
+    performance_buffer.add(user.pk, day, correct_answers, wrong_answers)
+    leaderboards.record(user.pk, correct_answers, day)
+
+    stored = list(Performance.objects.filter(user=user, date_played=day))
+    performance = performance_buffer.merge(user, stored)[0]
+    return performance, not stored and performance.total_quizzes_played == 1
+
+
+def settle_round(user, correct_answers, wrong_answers, day=None):
+    """
+    Record a graded round: upsert the user's daily Performance row and deduct
+    the round cost through the credits ledger in one transaction.
+
+    Returns ``(performance, created)`` without re-reading the row. In
+    write-behind mode the counters go through ``performance_buffer`` instead.
+    """
+    day = day or date.today()
+    cost = getattr(settings, 'QUIZ_ROUND_CREDIT_COST', 10)
+
+    if performance_buffer.enabled:
+        return _settle_write_behind(user, day, correct_answers, wrong_answers, cost)
+
+    with transaction.atomic():
+        if can_upsert():
+            performance, created = _upsert_performance(user, day, correct_answers, wrong_answers)
+        else:
+            performance, created = _get_or_create_performance(user, day, correct_answers, wrong_answers)
+
+        apply_credit(user, -cost, 'quiz_round', day)
+        transaction.on_commit(lambda: leaderboards.record(user.pk, correct_answers, day))
+
+    return performance, created
@@ -1,9 +1,94 @@
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from django.contrib.auth.models import User
-from .models import Profile
+from .models import Profile, Quiz, SpinPrize, FAQs, Slider
+from .contentVersion import get_version, bump_version
+from .quizSampler import QUIZ_VERSION_NAMESPACE
+from .quizSnapshot import quiz_snapshot
+from .answerKey import answer_key_index
+from .DigimartSubscriptionModel import DigimartSubscription
+from .digimartConfig import digimart_config
+from .prizeEngine import prize_table
+from .httpCache import FAQS_VERSION_NAMESPACE, SLIDERS_VERSION_NAMESPACE, content_changed
+from .imageDerivatives import delete_unused, derivative_worker
+from .principalCache import principal_cache
+from .creditsLedger import opening_entry
 
 @receiver(post_save, sender=User)
 def create_user_profile(sender, instance, created, **kwargs):
     if created:
         Profile.objects.create(user=instance)
+        opening_entry(instance.pk).save()
+
+
+@receiver(post_save, sender=Quiz)
+def quiz_saved(sender, instance, **kwargs):
+    def apply():
+        previous = get_version(QUIZ_VERSION_NAMESPACE)
+        version = bump_version(QUIZ_VERSION_NAMESPACE)
+        quiz_snapshot.store(instance, previous, version)
+        answer_key_index.store(instance, previous, version)
+    transaction.on_commit(apply)
+
+
+@receiver(post_delete, sender=Quiz)
+def quiz_deleted(sender, instance, **kwargs):
+    quiz_id = instance.pk
+    def apply():
+        previous = get_version(QUIZ_VERSION_NAMESPACE)
+        version = bump_version(QUIZ_VERSION_NAMESPACE)
+        quiz_snapshot.discard(quiz_id, previous, version)
+        answer_key_index.discard(quiz_id, previous, version)
+    transaction.on_commit(apply)
+
+
+@receiver(post_save, sender=DigimartSubscription)
+@receiver(post_delete, sender=DigimartSubscription)
+def digimart_subscription_changed(sender, instance, **kwargs):
+    transaction.on_commit(digimart_config.invalidate)
+
+
+@receiver(post_save, sender=SpinPrize)
+@receiver(post_delete, sender=SpinPrize)
+def spin_prize_changed(sender, instance, **kwargs):
+    transaction.on_commit(prize_table.invalidate)
+
+
+@receiver(post_save, sender=FAQs)
+@receiver(post_delete, sender=FAQs)
+def faqs_changed(sender, instance, **kwargs):
+    transaction.on_commit(lambda: content_changed(FAQS_VERSION_NAMESPACE))
+
+
+@receiver(post_save, sender=Slider)
+@receiver(post_delete, sender=Slider)
+def slider_changed(sender, instance, **kwargs):
+    transaction.on_commit(lambda: content_changed(SLIDERS_VERSION_NAMESPACE))
+
+
+@receiver(post_save, sender=Slider)
+def slider_saved(sender, instance, **kwargs):
+    if instance.image and instance.variants.get('source') != instance.image.name:
+        slider_id = instance.pk
+        transaction.on_commit(lambda: derivative_worker.submit(slider_id))
+
+
+@receiver(post_delete, sender=Slider)
+def slider_deleted(sender, instance, **kwargs):
+    names = [image['name'] for image in instance.variants.get('images', [])]
+    transaction.on_commit(lambda: delete_unused(names))
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, **kwargs):
+    user_id = instance.pk
+    transaction.on_commit(lambda: principal_cache.invalidate(user_id))
+
+
+@receiver(post_save, sender=Profile)
+@receiver(post_delete, sender=Profile)
+def profile_changed(sender, instance, **kwargs):
+    user_id = instance.user_id
+    transaction.on_commit(lambda: principal_cache.invalidate(user_id))
@@ -0,0 +1,56 @@
+from collections import namedtuple
+from datetime import date
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from .creditsLedger import apply_credit
+from .models import Spin, SpinOutcome
+from .prizeEngine import prize_table
+from .upsert import can_upsert, upsert_counters
+
+
+SpinResult = namedtuple('SpinResult', ['allowed', 'count', 'gift', 'coins'])
+
+
+def daily_limit():
+    return getattr(settings, 'QUIZ_SPIN_DAILY_LIMIT', 5)
+
+
+def _upsert_spin(user, day, limit):
+    # The first spin of the day inserts, later ones only increment while under the limit.
+    row = upsert_counters(Spin, {'user': user.pk, 'date': day}, {'count': 1}, limit=('count', limit))
+    return row[0] if row else None
+
+
+def _conditional_spin(user, day, limit):
+    Spin.objects.bulk_create([Spin(user=user, date=day, count=0)], ignore_conflicts=True)
+    spins = Spin.objects.filter(user=user, date=day)
+    if not spins.filter(count__lt=limit).update(count=F('count') + 1):
+        return None
+    return spins.values_list('count', flat=True).get()
+
+
+def take_spin(user, day=None):
+    """
+    Use one of the user's daily spins, draw its prize on the server and credit
+    the prize coins, all in one transaction. The counter never passes
+    QUIZ_SPIN_DAILY_LIMIT however many requests race; every allowed spin is
+    recorded in the SpinOutcome ledger.
+    """
+    day = day or date.today()
+    limit = daily_limit()
+    if limit <= 0:
+        return SpinResult(False, 0, None, 0)
+
+    with transaction.atomic():
+        if can_upsert():
+            count = _upsert_spin(user, day, limit)
+        else:
+            count = _conditional_spin(user, day, limit)
+        if count is None:
+            return SpinResult(False, limit, None, 0)
+
+        prize = prize_table.award(day)
+        outcome = SpinOutcome.objects.create(user=user, date=day, prize_id=prize.id, gift=prize.gift or '', coins=prize.coins)
+        apply_credit(user, prize.coins, 'spin', outcome.pk)
+    return SpinResult(True, count, prize.gift, prize.coins)
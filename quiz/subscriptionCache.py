@@ -0,0 +1,101 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import connection
+
+
+logger = logging.getLogger(__name__)
+
+class SubscriptionStatusCache:
+    """
+    Per-user Digimart charging status with stale-while-revalidate.
+
+    Entries younger than DIGIMART_STATUS_TTL are served as is. Older entries
+    are still served until DIGIMART_STATUS_STALE_TTL while a refresh runs in a
+    background thread pool, so callers never wait on the Digimart API. Set
+    DIGIMART_STATUS_REFRESH_ON_READ to False when ``reconcile_subscriptions``
+    keeps Profile.is_subscribed fresh instead. At most DIGIMART_STATUS_CACHE_SIZE
+    users are kept, least recently used first out.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._refreshing = set()
+        self._executor = None
+
+    @property
+    def ttl(self):
+        return getattr(settings, 'DIGIMART_STATUS_TTL', 300)
+
+    @property
+    def stale_ttl(self):
+        return getattr(settings, 'DIGIMART_STATUS_STALE_TTL', 3600)
+
+    @property
+    def maxsize(self):
+        return getattr(settings, 'DIGIMART_STATUS_CACHE_SIZE', 10000)
+
+    def _pool(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=getattr(settings, 'DIGIMART_STATUS_WORKERS', 4),
+                        thread_name_prefix='digimart-status',
+                    )
+        return self._executor
+
+    def get(self, user):
+        """
+        Cached ``(response_data, response_status)`` for ``user`` or None. A
+        refresh is scheduled whenever the entry is missing or past its TTL.
+        """
+        with self._lock:
+            entry = self._entries.get(user.pk)
+            if entry is not None:
+                self._entries.move_to_end(user.pk)
+        age = time.monotonic() - entry[2] if entry else None
+        if (entry is None or age > self.ttl) and getattr(settings, 'DIGIMART_STATUS_REFRESH_ON_READ', True):
+            self.refresh_async(user.pk)
+        if entry is None or age > self.stale_ttl:
+            return None
+        return entry[0], entry[1]
+
+    def store(self, user_id, response_data, response_status):
+        with self._lock:
+            self._entries[user_id] = (response_data, response_status, time.monotonic())
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def refresh_async(self, user_id):
+        with self._lock:
+            if user_id in self._refreshing:
+                return
+            self._refreshing.add(user_id)
+        self._pool().submit(self._refresh, user_id)
+
+    def _refresh(self, user_id):
+        from django.contrib.auth.models import User
+        from .DigimartSubcriptionView import get_subscriber_charging_info
+        try:
+            user = User.objects.filter(pk=user_id).first()
+            if user is not None:
+                self.store(user_id, *get_subscriber_charging_info(user))
+        except Exception:
+            logger.exception("Refreshing the Digimart status of user %s failed", user_id)
+        finally:
+            with self._lock:
+                self._refreshing.discard(user_id)
+            connection.close()
+
+
+subscription_status_cache = SubscriptionStatusCache()
@@ -0,0 +1,82 @@
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+from .DigimartSubscriptionModel import DigimartChargingSubscriberModel
+from .digimartEvents import ingest
+from .models import Profile
+from .principalCache import principal_cache
+
+
+# Columns the transitions read and write; the legacy payload columns are
+# never loaded on the subscription paths.
+STATE_FIELDS = ('id', 'user', 'plain_msisdn', 'request_id', 'masked_msisdn', 'subscription_status', 'version')
+
+
+class StaleSubscriptionError(Exception):
+    """A transition kept losing races against concurrent writers."""
+
+
+def _transition(subscriber, changes):
+    """
+    Write the fields returned by ``changes(subscriber)`` with a single
+    ``UPDATE ... WHERE id = %s AND version = %s``. When another writer got
+    there first the row is re-read and the changes are recomputed.
+    """
+    attempts = getattr(settings, 'DIGIMART_TRANSITION_ATTEMPTS', 3)
+    for _ in range(attempts):
+        fields = changes(subscriber)
+        if not fields:
+            return subscriber
+        updated = DigimartChargingSubscriberModel.objects.filter(
+            pk=subscriber.pk, version=subscriber.version
+        ).update(version=F('version') + 1, **fields)
+        if updated:
+            for name, value in fields.items():
+                setattr(subscriber, name, value)
+            subscriber.version += 1
+            return subscriber
+        subscriber.refresh_from_db(fields=[field for field in STATE_FIELDS if field not in ('id', 'user')])
+    raise StaleSubscriptionError(f"Subscriber {subscriber.pk} changed {attempts} times during a transition.")
+
+
+def requested(subscriber, plain_msisdn, request_id):
+    """A new authorize URL was handed out to an existing subscriber."""
+    return _transition(subscriber, lambda current: {
+        name: value for name, value in (('plain_msisdn', plain_msisdn), ('request_id', request_id))
+        if getattr(current, name) != value
+    })
+
+
+def registered(subscriber, masked_msisdn, subscription_status, payload, event_time=''):
+    """The operator reported the outcome of the authorize flow (notify-me)."""
+    # masked_msisdn is unique, the number may have moved over from another account.
+    DigimartChargingSubscriberModel.objects.filter(masked_msisdn=masked_msisdn).exclude(pk=subscriber.pk).update(
+        masked_msisdn='', version=F('version') + 1
+    )
+
+    def changes(current):
+        fields = {}
+        if current.masked_msisdn != masked_msisdn:
+            fields['masked_msisdn'] = masked_msisdn
+        if subscription_status == "S1000" and current.subscription_status != "Registered":
+            fields['subscription_status'] = "Registered"
+        return fields
+
+    _transition(subscriber, changes)
+    ingest('notify', payload, masked_msisdn, subscriber.request_id, subscription_status, event_time, processed=True)
+    return subscriber
+
+
+def confirmed(subscriber, payload, confirmation_status='', event_time=''):
+    """A charging confirmation arrived; only the event history changes."""
+    ingest('confirm', payload, subscriber.masked_msisdn, status=confirmation_status, event_time=event_time, processed=True)
+    return subscriber
+
+
+def unregistered(subscriber, response_data):
+    """The user unsubscribed through the Digimart unregistration API."""
+    _transition(subscriber, lambda current: {} if current.subscription_status == "UNREGISTER" else {'subscription_status': "UNREGISTER"})
+    Profile.objects.filter(user_id=subscriber.user_id).update(is_subscribed=False)
+    principal_cache.invalidate_on_commit([subscriber.user_id])
+    ingest('unregister', response_data, subscriber.masked_msisdn, status=str(response_data.get('statusCode', '')), event_time=timezone.now().isoformat(), processed=True)
+    return subscriber
@@ -1,3 +1,1270 @@
-from django.test import TestCase
+import asyncio
+import hashlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+import zipfile
+import time
+from array import array
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+import requests
+from openpyxl import Workbook
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import CommandError, call_command
+from django.db import OperationalError, connection, transaction
+from django.db.models import F
+from django.test.utils import CaptureQueriesContext
+from django.test import AsyncRequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.tokens import AccessToken
+from quiz.digimartClient import AsyncDigimartClient, CircuitOpenError, DigimartClient, digimart_async_client
+from quiz.digimartConfig import DigimartConfig, DigimartConfigCache, digimart_config
+from quiz.digimartEvents import process_pending
+from quiz.httpCache import response_cache
+from quiz.imageDerivatives import DerivativeWorker
+from quiz.leaderboard import Leaderboards
+from quiz.performanceBuffer import PerformanceBuffer
+from quiz.DigimartAsyncView import AsyncSubscriptionStatusView
+from quiz.DigimartSubscriptionModel import DigimartChargingSubscriberModel, DigimartNotificationEvent, DigimartSubscription
+from quiz.models import CreditTransaction, FAQs, LeaderboardSnapshot, Performance, Profile, Quiz, Slider, Spin, SpinOutcome, SpinPrize, SpinPrizeBudget
+from quiz import spinEngine, upsert
+from quiz.answerKey import AnswerKeyIndex, answer_key_index
+from quiz.contentCodec import decoded_lru, encode_text
+from quiz.contentSearch import SEARCH_INDEX_VERSION_NAMESPACE, install_search_index, normalize_search_text, search
+from quiz.contentVersion import bump_version, get_version
+from quiz.creditsLedger import Credit, apply_credit, apply_credits
+from quiz.grading import grade_answers
+from quiz.principalCache import principal_cache
+from quiz.settlement import settle_round
+from quiz.quizImporter import ImportFormatError, import_quizzes, iter_rows
+from quiz.quizSampler import QUIZ_VERSION_NAMESPACE, QuizIdIndex, quiz_id_index
+from quiz.quizSnapshot import quiz_snapshot
+from quiz.subscriptionCache import SubscriptionStatusCache
+from quiz.subscriptionState import STATE_FIELDS, registered, requested
+from quiz.serializer import FAQsSerializer, QuizSerializer
+from quiz.views import ProfileDetail
+from quiz.prizeEngine import AliasTable, prize_table
 
-# Create your tests here.
+
+class StubDigimartHandler(BaseHTTPRequestHandler):
+    # Each test queues (status, body, delay) replies on the server.
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.server.requests_seen += 1
+        status, body, delay = self.server.replies.pop(0) if self.server.replies else (200, {}, 0)
+        time.sleep(delay)
+        payload = body if isinstance(body, bytes) else json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+class StubDigimartMixin:
+    def setUp(self):
+        super().setUp()
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StubDigimartHandler)
+        self.server.replies = []
+        self.server.requests_seen = 0
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+        overrides = override_settings(
+            DIGIMART_API_BASE_URL=f'http://127.0.0.1:{self.server.server_port}',
+            DIGIMART_READ_TIMEOUT=0.5,
+            DIGIMART_MAX_RETRIES=2,
+            DIGIMART_RETRY_BACKOFF=0,
+            DIGIMART_BREAKER_FAILURES=2,
+            DIGIMART_BREAKER_RESET=60,
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+
+class DigimartClientTests(StubDigimartMixin, SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        self.digimart = DigimartClient()
+
+    def test_subscriber_charging_info(self):
+        self.server.replies = [(200, {'subscriberInfo': [{'subscriptionStatus': 'REGISTERED'}]}, 0)]
+        response = self.digimart.subscriber_charging_info('APP_1', 'secret', '8801700000000')
+        self.assertEqual(response.json()['subscriberInfo'][0]['subscriptionStatus'], 'REGISTERED')
+        self.assertEqual(self.digimart.latency.snapshot()['/subscription/subscriberChargingInfo']['count'], 1)
+
+    def test_retries_unavailable_upstream(self):
+        self.server.replies = [(503, {}, 0), (503, {}, 0), (200, {'statusCode': 'S1000'}, 0)]
+        response = self.digimart.subscriber_charging_info('APP_1', 'secret', '8801700000000')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.server.requests_seen, 3)
+
+    def test_read_timeout(self):
+        self.server.replies = [(200, {}, 1)] * 3
+        with self.assertRaises(requests.Timeout):
+            self.digimart.subscriber_charging_info('APP_1', 'secret', '8801700000000')
+        self.assertEqual(self.server.requests_seen, 3)
+
+    def test_unregister_is_not_resent_after_it_was_sent(self):
+        self.server.replies = [(503, {}, 0)]
+        self.assertEqual(self.digimart.unregister('APP_1', 'secret', '8801700000000').status_code, 503)
+        self.server.replies = [(200, {}, 1)] * 3
+        with self.assertRaises(requests.Timeout):
+            self.digimart.unregister('APP_1', 'secret', '8801700000000')
+        self.assertEqual(self.server.requests_seen, 2)
+
+    def test_unregister_retries_refused_connections(self):
+        with override_settings(DIGIMART_API_BASE_URL='http://127.0.0.1:1'):
+            with self.assertRaises(requests.ConnectionError):
+                self.digimart.unregister('APP_1', 'secret', '8801700000000')
+        self.assertEqual(self.digimart.latency.snapshot()['/subs/unregistration']['count'], 3)
+
+    def test_circuit_opens_and_fails_fast(self):
+        self.server.replies = [(500, {}, 0), (500, {}, 0)]
+        self.digimart.unregister('APP_1', 'secret', '8801700000000')
+        self.digimart.unregister('APP_1', 'secret', '8801700000000')
+        self.assertEqual(self.digimart.breaker.state, 'open')
+        with self.assertRaises(CircuitOpenError):
+            self.digimart.unregister('APP_1', 'secret', '8801700000000')
+        self.assertEqual(self.server.requests_seen, 2)
+
+    async def test_async_client_retries_unavailable_upstream(self):
+        client = AsyncDigimartClient(self.digimart)
+        self.server.replies = [(503, {}, 0), (200, {'statusCode': 'S1000'}, 0)]
+        response = await client.subscriber_charging_info('APP_1', 'secret', '8801700000000')
+        await client.aclose()
+        self.assertEqual(response.json(), {'statusCode': 'S1000'})
+        self.assertEqual(self.server.requests_seen, 2)
+        self.assertEqual(self.digimart.latency.snapshot()['/subscription/subscriberChargingInfo']['count'], 2)
+
+    async def test_cancelled_half_open_trial_frees_the_breaker(self):
+        client = AsyncDigimartClient(self.digimart)
+        self.digimart.breaker.opened_at = time.monotonic() - 61
+        self.server.replies = [(200, {}, 0.3), (200, {'statusCode': 'S1000'}, 0)]
+        trial = asyncio.ensure_future(client.subscriber_charging_info('APP_1', 'secret', '8801700000000'))
+        await asyncio.sleep(0.1)
+        trial.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await trial
+        self.assertEqual(self.digimart.breaker.state, 'half-open')
+        response = await client.subscriber_charging_info('APP_1', 'secret', '8801700000000')
+        await client.aclose()
+        self.assertEqual(response.json(), {'statusCode': 'S1000'})
+        self.assertEqual(self.digimart.breaker.state, 'closed')
+
+    async def test_async_client_read_timeout(self):
+        client = AsyncDigimartClient(self.digimart)
+        self.server.replies = [(200, {}, 1)] * 3
+        with self.assertRaises(requests.Timeout):
+            await client.unregister('APP_1', 'secret', '8801700000000')
+        await client.aclose()
+        self.assertEqual(self.digimart.breaker.failures, 1)
+        self.assertEqual(self.server.requests_seen, 1)
+
+
+@override_settings(QUIZ_SPIN_DAILY_LIMIT=5)
+class SpinEngineTests(TransactionTestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('spinner')
+        SpinPrize.objects.create(gift='10 coins', coins=10, weight=1)
+
+    def spin_concurrently(self, attempts=40, workers=8):
+        barrier = threading.Barrier(workers)
+
+        def spin(_):
+            try:
+                barrier.wait(timeout=5)
+            except threading.BrokenBarrierError:
+                pass
+            try:
+                while True:
+                    try:
+                        return spinEngine.take_spin(self.user)
+                    except OperationalError:
+                        # SQLite reports a locked table instead of waiting.
+                        time.sleep(0.001)
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(spin, range(attempts)))
+
+    def assert_no_over_spins(self, results):
+        allowed = [result for result in results if result.allowed]
+        self.assertEqual(len(allowed), 5)
+        self.assertEqual(sorted(result.count for result in allowed), [1, 2, 3, 4, 5])
+        self.assertEqual(Spin.objects.get(user=self.user).count, 5)
+        self.assertEqual(Profile.objects.get(user=self.user).credits, 50)
+        self.assertEqual(SpinOutcome.objects.filter(user=self.user).count(), 5)
+
+    def test_concurrent_spins_stop_at_limit(self):
+        self.assert_no_over_spins(self.spin_concurrently())
+
+    def test_concurrent_spins_without_upsert(self):
+        with mock.patch.object(upsert, 'UPSERT_VENDORS', ()):
+            self.assert_no_over_spins(self.spin_concurrently())
+
+    @override_settings(QUIZ_SPIN_DAILY_LIMIT=0)
+    def test_zero_limit(self):
+        self.assertFalse(spinEngine.take_spin(self.user).allowed)
+        self.assertFalse(Spin.objects.exists())
+
+    @override_settings(QUIZ_SPIN_DAILY_LIMIT=50)
+    def test_budget_cap_falls_back_to_unlimited_prizes(self):
+        jackpot = SpinPrize.objects.create(gift='Jackpot', coins=1000, weight=1000, daily_budget=2)
+        results = [spinEngine.take_spin(self.user) for _ in range(20)]
+        self.assertEqual(sum(result.gift == 'Jackpot' for result in results), 2)
+        self.assertEqual(SpinPrizeBudget.objects.get(prize=jackpot).awarded, 2)
+        self.assertEqual(Profile.objects.get(user=self.user).credits, sum(result.coins for result in results))
+
+    def test_rolled_back_miss_does_not_mark_budget_exhausted(self):
+        jackpot = SpinPrize.objects.create(gift='Jackpot', coins=1000, weight=1000, daily_budget=1)
+        prize = next(prize for prize in prize_table.prizes() if prize.id == jackpot.pk)
+        with transaction.atomic():
+            self.assertTrue(prize_table._claim_budget(prize, date.today()))
+            self.assertFalse(prize_table._claim_budget(prize, date.today()))
+            transaction.set_rollback(True)
+        self.assertTrue(prize_table._claim_budget(prize, date.today()))
+
+
+@override_settings(QUIZ_PERFORMANCE_WRITE_BEHIND=False, QUIZ_ROUND_CREDIT_COST=10)
+class SettlementTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('settler')
+
+    def assert_rounds_accumulate(self):
+        day = date(2024, 6, 1)
+        performance, created = settle_round(self.user, 3, 2, day)
+        self.assertTrue(created)
+        performance, created = settle_round(self.user, 1, 4, day)
+        self.assertFalse(created)
+        self.assertEqual((performance.total_quizzes_played, performance.correct_answers, performance.wrong_answers), (2, 4, 6))
+        stored = Performance.objects.get(user=self.user, date_played=day)
+        self.assertEqual((stored.pk, stored.total_quizzes_played, stored.correct_answers, stored.wrong_answers), (performance.pk, 2, 4, 6))
+        self.assertEqual(Profile.objects.get(user=self.user).credits, -20)
+        self.assertEqual(CreditTransaction.objects.filter(user=self.user, reason='quiz_round').count(), 2)
+
+    def test_upsert(self):
+        self.assert_rounds_accumulate()
+
+    def test_without_upsert(self):
+        with mock.patch.object(upsert, 'UPSERT_VENDORS', ()):
+            self.assert_rounds_accumulate()
+
+
+class CreditsLedgerTests(TestCase):
+    def setUp(self):
+        self.first = User.objects.create_user('first')
+        self.second = User.objects.create_user('second')
+
+    def balance(self, user):
+        return Profile.objects.get(user=user).credits
+
+    def test_credits_are_ledgered_and_summed_per_user(self):
+        apply_credits([
+            Credit(self.first.pk, 50, 'bonus', 'a'),
+            Credit(self.second.pk, -5, 'quiz_round', 'b'),
+            Credit(self.first.pk, 10, 'spin', 'c'),
+            Credit(self.second.pk, 0, 'spin', 'd'),
+        ])
+        self.assertEqual((self.balance(self.first), self.balance(self.second)), (60, -5))
+        self.assertEqual(CreditTransaction.objects.exclude(reason='snapshot').count(), 3)
+
+    def test_verify_credits_fixes_drifted_balances(self):
+        apply_credit(self.first, 25, 'bonus')
+        Profile.objects.filter(user=self.first).update(credits=999)
+        output = io.StringIO()
+        call_command('verify_credits', stdout=output)
+        self.assertIn(f"user {self.first.pk}: balance 999, ledger 25", output.getvalue())
+        self.assertEqual(self.balance(self.first), 999)
+        call_command('verify_credits', '--fix', stdout=io.StringIO())
+        self.assertEqual(self.balance(self.first), 25)
+
+    def test_pre_ledger_balance_survives_fix(self):
+        # A balance from before the ledger, then one round paid through it.
+        CreditTransaction.objects.filter(user=self.first).delete()
+        Profile.objects.filter(user=self.first).update(credits=300)
+        apply_credit(self.first, -10, 'quiz_round')
+
+        output = io.StringIO()
+        call_command('verify_credits', '--fix', stdout=output)
+        self.assertIn("1 profiles have no opening entry", output.getvalue())
+        self.assertEqual(self.balance(self.first), 290)
+
+        call_command('verify_credits', '--open-balances', stdout=io.StringIO())
+        self.assertEqual(CreditTransaction.objects.get(user=self.first, reference='opening').amount, 300)
+        output = io.StringIO()
+        call_command('verify_credits', '--fix', stdout=output)
+        self.assertIn("0 mismatches fixed", output.getvalue())
+        self.assertEqual(self.balance(self.first), 290)
+
+
+class AliasTableTests(SimpleTestCase):
+    def test_draws_follow_weights(self):
+        table = AliasTable([1, 0, 3, 6])
+        counts = [0] * 4
+        for step in range(10_000):
+            counts[table.draw(lambda: (step + 0.5) / 10_000)] += 1
+        self.assertEqual(counts, [1000, 0, 3000, 6000])
+
+    def test_empty_table(self):
+        self.assertIsNone(AliasTable([]).draw())
+
+
+@override_settings(DIGIMART_STATUS_REFRESH_ON_READ=False)
+class QuizSamplerTests(SimpleTestCase):
+    def setUp(self):
+        self.index = QuizIdIndex()
+        self.index.ids = lambda: array('q', range(1, 11))
+
+    def test_seen_ids_pad_but_taken_ids_never_return(self):
+        for _ in range(50):
+            picked = self.index.sample(5, exclude=set(range(1, 9)), taken={9, 10})
+            self.assertEqual(len(set(picked)), 5)
+            self.assertFalse({9, 10} & set(picked))
+
+    def test_large_sample_with_small_exclusion(self):
+        picked = self.index.sample(8, exclude={1, 2, 3, 4})
+        self.assertEqual(len(set(picked)), 8)
+        self.assertTrue({5, 6, 7, 8, 9, 10} <= set(picked))
+
+
+class QuizImporterTests(TestCase):
+    def imported(self):
+        return sorted(Quiz.objects.values_list('_question', '_correct_answer'))
+
+    def expected(self, *rows):
+        return sorted((encode_text(question), encode_text(answer)) for question, answer in rows)
+
+    def test_csv_rows_errors_and_batches(self):
+        data = (
+            'question,options,correct_answer\n'
+            'One?,"1,2",1\n'
+            'Two?,"1,2",\n'
+            '\n'
+            'Three?,"3,4",3\n'
+            'Four?,"3,4",4\n'
+            'Five?,"5,6",5\n'
+        ).encode()
+        with mock.patch.object(Quiz.objects, 'bulk_create', wraps=Quiz.objects.bulk_create) as bulk_create:
+            result = import_quizzes(io.BytesIO(data), 'quizzes.csv', batch_size=2)
+        self.assertEqual(result, (4, [(3, 'Empty correct_answer')]))
+        self.assertEqual([len(call.args[0]) for call in bulk_create.call_args_list], [2, 2])
+        self.assertEqual(self.imported(), self.expected(('One?', '1'), ('Three?', '3'), ('Four?', '4'), ('Five?', '5')))
+        self.assertEqual(Quiz.objects.get(_question=encode_text('Three?')).search_text, normalize_search_text('Three?', '3,4', '3'))
+
+    def test_jsonl_reports_bad_lines(self):
+        data = b'{"question": "One?", "options": "1,2", "correct_answer": 1}\nnot json\n["a list"]\n'
+        result = import_quizzes(io.BytesIO(data), 'quizzes.jsonl')
+        self.assertEqual(result.created, 1)
+        self.assertEqual([number for number, _ in result.errors], [2, 3])
+        self.assertEqual(self.imported(), self.expected(('One?', '1')))
+
+    def test_xlsx_numeric_cells(self):
+        workbook = Workbook()
+        workbook.active.append(['question', 'options', 'correct_answer'])
+        workbook.active.append(['2 + 2?', '3,4', 4.0])
+        workbook.active.append([1999, 'yes,no', 'yes'])
+        data = io.BytesIO()
+        workbook.save(data)
+        data.seek(0)
+        self.assertEqual(import_quizzes(data, 'quizzes.xlsx'), (2, []))
+        self.assertEqual(self.imported(), self.expected(('2 + 2?', '4'), ('1999', 'yes')))
+
+    def test_zip_that_is_not_a_workbook(self):
+        data = io.BytesIO()
+        with zipfile.ZipFile(data, 'w') as archive:
+            archive.writestr('readme.txt', 'hello')
+        data.seek(0)
+        with self.assertRaisesMessage(ImportFormatError, "not a valid spreadsheet"):
+            import_quizzes(data, 'quizzes.xlsx')
+
+    def test_legacy_xls_is_rejected_with_a_clear_error(self):
+        with self.assertRaisesMessage(ImportFormatError, "save the file as .xlsx or CSV"):
+            iter_rows(io.BytesIO(b''), 'quizzes.xls')
+
+    def test_version_is_bumped_after_commit_only(self):
+        before = get_version(QUIZ_VERSION_NAMESPACE)
+        data = b'question,options,correct_answer\nOne?,"1,2",1\n'
+        with self.captureOnCommitCallbacks() as callbacks:
+            import_quizzes(io.BytesIO(data), 'quizzes.csv')
+        self.assertEqual(get_version(QUIZ_VERSION_NAMESPACE), before)
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(get_version(QUIZ_VERSION_NAMESPACE), before)
+
+    def test_dry_run_command_writes_nothing(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'quizzes.csv')
+        with open(path, 'wb') as file:
+            file.write(b'question,options,correct_answer\nOne?,"1,2",1\nTwo?,"1,2",\n')
+        before = get_version(QUIZ_VERSION_NAMESPACE)
+        output, errors = io.StringIO(), io.StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('import_quizzes', path, '--dry-run', stdout=output, stderr=errors)
+        self.assertIn("1 quizzes validated", output.getvalue())
+        self.assertIn("row 3: Empty correct_answer", errors.getvalue())
+        self.assertFalse(Quiz.objects.exists())
+        self.assertEqual(get_version(QUIZ_VERSION_NAMESPACE), before)
+
+
+class ContentCodecTests(TestCase):
+    def setUp(self):
+        self.quiz = Quiz.objects.create(question='Capital?', options='Dhaka,Delhi', correct_answer='Dhaka')
+        decoded_lru.clear()
+        self.addCleanup(decoded_lru.clear)
+
+    def test_memo_is_dropped_when_the_raw_column_changes(self):
+        quiz = Quiz.objects.get(pk=self.quiz.pk)
+        with mock.patch.object(decoded_lru, 'decode', wraps=decoded_lru.decode) as decode:
+            self.assertEqual(quiz.question, 'Capital?')
+            self.assertEqual(quiz.question, 'Capital?')
+            self.assertEqual(decode.call_count, 1)
+            quiz._question = encode_text('Largest city?')
+            self.assertEqual(quiz.question, 'Largest city?')
+            Quiz.objects.filter(pk=quiz.pk).update(_question=encode_text('Oldest city?'))
+            quiz.refresh_from_db()
+            self.assertEqual(quiz.question, 'Oldest city?')
+            self.assertEqual(decode.call_count, 3)
+
+    @override_settings(QUIZ_DECODE_CACHE_SIZE=2)
+    def test_lru_is_keyed_on_pk_field_and_raw_hash(self):
+        raw = self.quiz._question
+        self.assertEqual(Quiz.objects.get(pk=self.quiz.pk).question, 'Capital?')
+        self.assertEqual(Quiz.objects.get(pk=self.quiz.pk).question, 'Capital?')
+        self.assertEqual((decoded_lru.hits, decoded_lru.misses), (1, 1))
+        self.assertEqual(list(decoded_lru._entries), [(self.quiz.pk, 'question', hash(raw))])
+
+        # New raw text misses instead of serving the old decoded value.
+        Quiz.objects.filter(pk=self.quiz.pk).update(_question=encode_text('Oldest city?'))
+        self.assertEqual(Quiz.objects.get(pk=self.quiz.pk).question, 'Oldest city?')
+        quiz = Quiz.objects.get(pk=self.quiz.pk)
+        quiz.options
+        self.assertEqual(list(decoded_lru._entries), [
+            (self.quiz.pk, 'question', hash(encode_text('Oldest city?'))),
+            (self.quiz.pk, 'options', hash(self.quiz._options)),
+        ])
+
+    def test_serializer_output_is_unchanged(self):
+        legacy = Quiz.objects.create()
+        Quiz.objects.filter(pk=legacy.pk).update(_question='Plain text?', _options='a, b', _correct_answer='a')
+        expected = [
+            {'id': self.quiz.pk, 'question': 'Capital?', 'options': 'Dhaka,Delhi', 'correct_answer': 'Dhaka'},
+            {'id': legacy.pk, 'question': 'Plain text?', 'options': 'a, b', 'correct_answer': 'a'},
+        ]
+        quizzes = Quiz.objects.order_by('pk')
+        self.assertEqual(QuizSerializer(quizzes, many=True).data, expected)
+        with override_settings(QUIZ_DECODE_CACHE_SIZE=100):
+            self.assertEqual(QuizSerializer(quizzes, many=True).data, expected)
+            self.assertEqual(QuizSerializer(quizzes, many=True).data, expected)
+        faq = FAQs.objects.create(question='How?', answer='Like this.')
+        self.assertEqual(FAQsSerializer(FAQs.objects.get(pk=faq.pk)).data, {'id': faq.pk, 'question': 'How?', 'answer': 'Like this.'})
+
+
+class AnswerKeyIndexTests(TestCase):
+    def setUp(self):
+        self.quiz = Quiz.objects.create(question='2 + 2?', options='3,4,5', correct_answer='4')
+
+    def test_counts_hits_misses_and_rebuilds(self):
+        index = AnswerKeyIndex()
+        self.assertEqual(index.lookup([self.quiz.pk, 0]), {self.quiz.pk: '4'})
+        index.lookup([self.quiz.pk])
+        self.assertEqual(index.stats(), {'size': 1, 'hits': 2, 'misses': 1, 'rebuilds': 1})
+
+    def test_other_workers_follow_the_shared_stamp(self):
+        other = AnswerKeyIndex()
+        other.warm()
+        self.assertEqual(get_version(QUIZ_VERSION_NAMESPACE), get_version(QUIZ_VERSION_NAMESPACE, caches['versions']))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.quiz.correct_answer = '5'
+            self.quiz.save()
+        self.assertEqual(other.lookup([self.quiz.pk]), {self.quiz.pk: '5'})
+        self.assertEqual(other.rebuilds, 2)
+
+    def test_save_and_delete_update_the_index_in_place(self):
+        answer_key_index.warm()
+        rebuilds = answer_key_index.rebuilds
+        with self.captureOnCommitCallbacks(execute=True):
+            self.quiz.correct_answer = '5'
+            self.quiz.save()
+        self.assertEqual(answer_key_index.lookup([self.quiz.pk]), {self.quiz.pk: '5'})
+        quiz_id = self.quiz.pk
+        with self.captureOnCommitCallbacks(execute=True):
+            self.quiz.delete()
+        self.assertEqual(answer_key_index.lookup([quiz_id]), {})
+        self.assertEqual(answer_key_index.rebuilds, rebuilds)
+
+    def test_import_rebuilds_the_index(self):
+        index = AnswerKeyIndex()
+        index.warm()
+        with self.captureOnCommitCallbacks(execute=True):
+            import_quizzes(io.BytesIO(b'question,options,correct_answer\nCapital?,"Dhaka,Delhi",Dhaka\n'), 'quizzes.csv')
+        imported = Quiz.objects.exclude(pk=self.quiz.pk).get()
+        self.assertEqual(index.lookup([imported.pk]), {imported.pk: 'Dhaka'})
+        self.assertEqual((index.rebuilds, index.misses), (2, 0))
+
+
+class GradingTests(TestCase):
+    def setUp(self):
+        self.quizzes = [Quiz.objects.create(question=f'{n} + 1?', options=f'{n},{n + 1}', correct_answer=str(n + 1)) for n in range(10)]
+        self.user = User.objects.create_user('grader')
+        Profile.objects.filter(user=self.user).update(is_subscribed=True)
+        principal_cache.clear()
+        self.addCleanup(principal_cache.clear)
+        self.api = APIClient()
+        self.api.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+
+    def test_round_is_graded_with_one_query(self):
+        quiz_ids = [quiz.pk for quiz in self.quizzes]
+        answers = [quiz.correct_answer if n % 3 else 'wrong' for n, quiz in enumerate(self.quizzes)]
+        with mock.patch('quiz.grading.answer_key_index', AnswerKeyIndex()):
+            with self.assertNumQueries(1):
+                result = grade_answers(quiz_ids, answers)
+            with self.assertNumQueries(0):
+                grade_answers(quiz_ids, answers)
+        self.assertEqual(result, (6, 4, []))
+
+    def test_every_missing_id_is_listed(self):
+        quiz_ids = [self.quizzes[0].pk, 999998, 'abc', self.quizzes[1].pk, 999999]
+        response = self.api.post(reverse('validate-result'), {'quiz_ids': quiz_ids, 'user_answers': ['1'] * 5}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['missing_quiz_ids'], [999998, 'abc', 999999])
+        self.assertFalse(Performance.objects.filter(user=self.user).exists())
+
+
+class SearchMixin:
+    def setUp(self):
+        self.capital = Quiz.objects.create(question='Capital of  Bangladesh?', options='Dhaka,Delhi', correct_answer='Dhaka')
+        self.river = Quiz.objects.create(question='Longest RIVER of Asia?', options='Yangtze,Ganges', correct_answer='Yangtze')
+
+    def found(self, query):
+        with CaptureQueriesContext(connection) as queries:
+            found = list(search(Quiz.objects.order_by('id'), query).values_list('id', flat=True))
+        return found, queries[-1]['sql']
+
+
+class ContentSearchTests(SearchMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.staff = User.objects.create_user('staff', is_staff=True)
+        self.player = User.objects.create_user('player')
+        principal_cache.clear()
+        self.addCleanup(principal_cache.clear)
+
+    def test_save_fills_search_text(self):
+        self.assertEqual(self.capital.search_text, 'capital of bangladesh? dhaka,delhi dhaka')
+        self.capital.question = 'Capital of Ｎｅｐａｌ?'
+        self.capital.save(update_fields=['_question'])
+        self.assertEqual(Quiz.objects.get(pk=self.capital.pk).search_text, 'capital of nepal? dhaka,delhi dhaka')
+        faq = FAQs.objects.create(question='How do I  PLAY?', answer='Subscribe first.')
+        self.assertEqual(faq.search_text, 'how do i play? subscribe first.')
+
+    def test_like_search_without_index(self):
+        self.assertEqual(self.found('DHAKA capital')[0], [self.capital.pk])
+        self.assertEqual(self.found('of')[0], [self.capital.pk, self.river.pk])
+        self.assertEqual(search(Quiz.objects.all(), '   ').count(), 0)
+
+    def test_quiz_search_is_staff_only(self):
+        url = reverse('quiz-search')
+        self.assertEqual(self.client.get(url, {'q': 'dhaka'}).status_code, 401)
+        api = APIClient()
+        api.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.player)}')
+        self.assertEqual(api.get(url, {'q': 'dhaka'}).status_code, 403)
+        api.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.staff)}')
+        response = api.get(url, {'q': 'dhaka'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([quiz['id'] for quiz in response.json()], [self.capital.pk])
+        self.assertEqual(api.get(url).status_code, 400)
+
+
+class SearchIndexTests(SearchMixin, TransactionTestCase):
+    # FTS5 tables cannot be created inside the savepoints TestCase wraps tests in.
+    def tearDown(self):
+        with connection.cursor() as cursor:
+            for trigger in ('ai', 'ad', 'au'):
+                cursor.execute(f"DROP TRIGGER IF EXISTS quiz_quiz_fts_{trigger}")
+            cursor.execute("DROP TABLE IF EXISTS quiz_quiz_fts")
+        bump_version(SEARCH_INDEX_VERSION_NAMESPACE)
+
+    def test_index_is_used_for_long_tokens_only(self):
+        self.assertTrue(install_search_index(Quiz))
+        found, sql = self.found('river asia')
+        self.assertEqual(found, [self.river.pk])
+        self.assertIn('MATCH', sql)
+        found, sql = self.found('of asia')
+        self.assertEqual(found, [self.river.pk])
+        self.assertNotIn('MATCH', sql)
+        self.assertIn('LIKE', sql)
+
+    def test_other_workers_see_a_new_index(self):
+        self.assertNotIn('MATCH', self.found('dhaka')[1])
+        with mock.patch('quiz.contentSearch._fts_tables', {}):
+            install_search_index(Quiz)
+        self.assertIn('MATCH', self.found('dhaka')[1])
+
+
+class QuizSnapshotTests(TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(quiz_snapshot, '_spawn', lambda target: target())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        principal_cache.clear()
+        self.addCleanup(principal_cache.clear)
+        self.user = User.objects.create_user('quiz-player')
+        Profile.objects.filter(user=self.user).update(is_subscribed=True)
+        self.api = APIClient()
+        self.api.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+        self.quizzes = [Quiz.objects.create(question=f'Question {n}?', options='a,b', correct_answer='a') for n in range(3)]
+
+    def get_quizzes(self):
+        response = self.api.get(reverse('quiz-list'), {'n': 3})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_warm_request_runs_no_queries(self):
+        self.get_quizzes()
+        with self.assertNumQueries(0):
+            quizzes = self.get_quizzes()
+        self.assertEqual(sorted(quiz['question'] for quiz in quizzes), ['Question 0?', 'Question 1?', 'Question 2?'])
+
+    def test_save_and_delete_update_single_fragments(self):
+        self.get_quizzes()
+        published = quiz_snapshot.published
+        quiz = self.quizzes[0]
+        with self.captureOnCommitCallbacks(execute=True):
+            quiz.question = 'Edited?'
+            quiz.save()
+        self.assertIn(b'Edited?', quiz_snapshot.fragments([quiz.pk])[quiz.pk])
+        quiz_id = quiz.pk
+        with self.captureOnCommitCallbacks(execute=True):
+            quiz.delete()
+        self.assertEqual(quiz_snapshot.fragments([quiz_id]), {})
+        self.assertEqual(quiz_snapshot.published, published + 2)
+
+    def test_other_changes_rebuild_in_the_background(self):
+        self.get_quizzes()
+        quiz = self.quizzes[0]
+        spawned = []
+        with mock.patch.object(quiz_snapshot, '_spawn', spawned.append):
+            # A bulk write sends no signals, only the stamp moves.
+            Quiz.objects.filter(pk=quiz.pk).update(_question=encode_text('Bulk?'))
+            quiz_id_index.invalidate()
+            stale = quiz_snapshot.fragments([quiz.pk])
+            quiz_snapshot.fragments([quiz.pk])
+        self.assertEqual(len(spawned), 1)
+        self.assertNotIn(b'Bulk?', stale[quiz.pk])
+        spawned[0]()
+        self.assertIn(b'Bulk?', quiz_snapshot.fragments([quiz.pk])[quiz.pk])
+
+
+class PrincipalCacheTests(TestCase):
+    def setUp(self):
+        principal_cache.clear()
+        self.addCleanup(principal_cache.clear)
+        self.user = User.objects.create_user('principal', password='secret')
+        Profile.objects.filter(user=self.user).update(is_subscribed=True, credits=7, operator='GP')
+        self.api = APIClient()
+        self.api.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+
+    def get_profile(self):
+        response = self.api.get(reverse('profile-detail'))
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_query_counts(self):
+        # Plain JWTAuthentication: one query for the user, one for user.profile.
+        with mock.patch.object(ProfileDetail, 'authentication_classes', [JWTAuthentication]):
+            with self.assertNumQueries(2):
+                self.get_profile()
+        with self.assertNumQueries(1):
+            self.get_profile()
+        with self.assertNumQueries(0):
+            profile = self.get_profile()
+        self.assertEqual((profile['credits'], profile['operator'], profile['is_subscribed']), (7, 'GP', True))
+
+    def test_profile_save_invalidates(self):
+        self.get_profile()
+        profile = Profile.objects.get(user=self.user)
+        profile.full_name = 'Panda'
+        with self.captureOnCommitCallbacks(execute=True):
+            profile.save()
+        with self.assertNumQueries(1):
+            self.assertEqual(self.get_profile()['full_name'], 'Panda')
+
+    def test_credit_change_invalidates(self):
+        self.get_profile()
+        with self.captureOnCommitCallbacks(execute=True):
+            apply_credit(self.user, 5, 'adjustment')
+        self.assertEqual(self.get_profile()['credits'], 12)
+
+    def test_update_keeps_balance(self):
+        self.get_profile()
+        Profile.objects.filter(user=self.user).update(credits=100)
+        response = self.api.patch(reverse('profile-detail'), {'full_name': 'Panda'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Profile.objects.get(user=self.user).credits, 100)
+
+    def test_inactive_user_is_rejected(self):
+        self.get_profile()
+        self.user.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+        self.assertEqual(self.api.get(reverse('profile-detail')).status_code, 401)
+
+
+class AsyncDigimartViewTests(StubDigimartMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        principal_cache.clear()
+        self.addCleanup(principal_cache.clear)
+        digimart_config.invalidate()
+        self.addCleanup(digimart_config.invalidate)
+        self.user = User.objects.create_user('async-subscriber')
+        Profile.objects.filter(user=self.user).update(is_subscribed=False)
+        DigimartSubscription.objects.create(API_Key='key', API_Secret='secret', API_Password='password', APP_ID='APP_1', redirect_URL='https://example.com/')
+        DigimartChargingSubscriberModel.objects.create(user=self.user, plain_msisdn='01700000000', request_id='1_abc', masked_msisdn='tel:masked')
+        self.view = AsyncSubscriptionStatusView.as_view()
+
+    def request(self, **headers):
+        return AsyncRequestFactory().get('/digimart/check-subscription/', headers=headers)
+
+    async def test_subscription_status(self):
+        self.server.replies = [(200, {'subscriberInfo': [{'subscriptionStatus': 'REGISTERED'}]}, 0)]
+        response = await self.view(self.request(Authorization=f'Bearer {AccessToken.for_user(self.user)}'))
+        await digimart_async_client.aclose()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content)['message']['subscriberInfo'][0]['subscriptionStatus'], 'REGISTERED')
+        self.assertTrue((await Profile.objects.aget(user=self.user)).is_subscribed)
+
+    async def test_invalid_json_is_a_bad_request(self):
+        self.server.replies = [(200, b'<html>maintenance</html>', 0)]
+        response = await self.view(self.request(Authorization=f'Bearer {AccessToken.for_user(self.user)}'))
+        await digimart_async_client.aclose()
+        self.assertEqual(response.status_code, 400)
+
+    async def test_requires_token(self):
+        response = await self.view(self.request())
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(self.server.requests_seen, 0)
+
+
+class UserPerformanceViewTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('performer')
+        principal_cache.clear()
+        self.addCleanup(principal_cache.clear)
+        self.api = APIClient()
+        self.api.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+        rounds = {date(2024, 1, 1): (3, 10, 5), date(2024, 1, 3): (1, 4, 1), date(2024, 1, 8): (2, 6, 4), date(2024, 2, 5): (1, 2, 3)}
+        for day, (played, correct, wrong) in rounds.items():
+            Performance.objects.create(user=self.user, date_played=day, total_quizzes_played=played, correct_answers=correct, wrong_answers=wrong)
+
+    def get(self, **params):
+        return self.api.get(reverse('user_performance'), params)
+
+    def rollup(self, period, **params):
+        response = self.get(rollup=period, **params)
+        self.assertEqual(response.status_code, 200)
+        return [(row['period'], row['total_quizzes_played'], row['correct_answers'], row['wrong_answers'], row['accuracy']) for row in response.json()['results']]
+
+    def test_cursor_pages_newest_first(self):
+        days = []
+        response = self.get(page_size=3)
+        while True:
+            body = response.json()
+            days += [row['date_played'] for row in body['results']]
+            if not body['next']:
+                break
+            response = self.api.get(body['next'])
+        self.assertEqual(days, ['2024-02-05', '2024-01-08', '2024-01-03', '2024-01-01'])
+
+    def test_page_size_is_capped(self):
+        Performance.objects.bulk_create(Performance(user=self.user, date_played=date(2023, 12, 31) - timedelta(days=n)) for n in range(400))
+        response = self.get(page_size=1000)
+        self.assertEqual(len(response.json()['results']), 366)
+        self.assertIsNotNone(response.json()['next'])
+
+    def test_date_range(self):
+        response = self.get(**{'from': '2024-01-03', 'to': '2024-01-08'})
+        self.assertEqual([row['date_played'] for row in response.json()['results']], ['2024-01-08', '2024-01-03'])
+        self.assertEqual(self.get(**{'from': '2024-13-01'}).status_code, 400)
+        self.assertEqual(self.get(to='yesterday').status_code, 400)
+        self.assertEqual(self.get(rollup='year').status_code, 400)
+
+    def test_rollups(self):
+        self.assertEqual(self.rollup('week'), [
+            ('2024-02-05', 1, 2, 3, 0.4),
+            ('2024-01-08', 2, 6, 4, 0.6),
+            ('2024-01-01', 4, 14, 6, 0.7),
+        ])
+        self.assertEqual(self.rollup('month'), [
+            ('2024-02-01', 1, 2, 3, 0.4),
+            ('2024-01-01', 6, 20, 10, 0.6667),
+        ])
+        self.assertEqual(self.rollup('month', to='2024-01-05'), [('2024-01-01', 4, 14, 6, 0.7)])
+
+    def test_unflushed_rounds_are_overlaid(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root, True)
+        buffer = PerformanceBuffer()
+        with override_settings(QUIZ_PERFORMANCE_WRITE_BEHIND=True, QUIZ_PERFORMANCE_JOURNAL_DIR=os.path.join(root, 'journal'), QUIZ_PERFORMANCE_FLUSH_INTERVAL=3600), \
+                mock.patch('quiz.resultView.performance_buffer', buffer):
+            buffer.add(self.user.pk, date(2024, 1, 2), 3, 2)
+            buffer.add(self.user.pk, date(2024, 3, 4), 1, 1)
+            buffer._timer.cancel()
+            self.assertEqual(self.rollup('week'), [
+                ('2024-03-04', 1, 1, 1, 0.5),
+                ('2024-02-05', 1, 2, 3, 0.4),
+                ('2024-01-08', 2, 6, 4, 0.6),
+                ('2024-01-01', 5, 17, 8, 0.68),
+            ])
+            self.assertEqual(self.rollup('month', to='2024-02-29'), [
+                ('2024-02-01', 1, 2, 3, 0.4),
+                ('2024-01-01', 7, 23, 12, 0.6571),
+            ])
+            first_page = [(row['date_played'], row['total_quizzes_played']) for row in self.get(page_size=2).json()['results']]
+            everything = [(row['date_played'], row['total_quizzes_played']) for row in self.get().json()['results']]
+        # 2024-01-02 has no stored row and sorts after the first page, so it waits for the flush there.
+        self.assertEqual(first_page, [('2024-03-04', 1), ('2024-02-05', 1), ('2024-01-08', 2)])
+        self.assertEqual(everything, [('2024-03-04', 1), ('2024-02-05', 1), ('2024-01-08', 2), ('2024-01-03', 1), ('2024-01-02', 1), ('2024-01-01', 3)])
+
+
+class DigimartConfigTests(TestCase):
+    def setUp(self):
+        digimart_config.invalidate()
+        self.addCleanup(digimart_config.invalidate)
+
+    def test_sign_matches_the_full_hash(self):
+        config = DigimartConfig(DigimartSubscription(API_Key='key', API_Secret='secret', API_Password='password', APP_ID='APP_1', redirect_URL='https://example.com/'))
+        for request_time in ('20240601120000', '20240601120001'):
+            self.assertEqual(config.sign(request_time), hashlib.sha512(f'key|{request_time}|secret'.encode()).hexdigest())
+
+    def test_save_reloads_on_the_next_read(self):
+        other_worker = DigimartConfigCache()
+        self.assertIsNone(digimart_config.get())
+        self.assertIsNone(other_worker.get())
+        with self.assertNumQueries(0):
+            digimart_config.get()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            subscription = DigimartSubscription.objects.create(API_Key='key', API_Secret='secret', API_Password='password', APP_ID='APP_1', redirect_URL='https://example.com/')
+        self.assertEqual(digimart_config.get().APP_ID, 'APP_1')
+        with self.captureOnCommitCallbacks(execute=True):
+            subscription.API_Secret = 'rotated'
+            subscription.save()
+        self.assertEqual(other_worker.get().sign('20240601120000'), hashlib.sha512(b'key|20240601120000|rotated').hexdigest())
+        with self.captureOnCommitCallbacks(execute=True):
+            subscription.delete()
+        self.assertIsNone(digimart_config.get())
+
+
+class ReconcileSubscriptionsTests(StubDigimartMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        principal_cache.clear()
+        self.addCleanup(principal_cache.clear)
+        digimart_config.invalidate()
+        self.addCleanup(digimart_config.invalidate)
+        DigimartSubscription.objects.create(API_Key='key', API_Secret='secret', API_Password='password', APP_ID='APP_1', redirect_URL='https://example.com/')
+        self.users = []
+        for n, subscribed in enumerate([True, False, True, False]):
+            user = User.objects.create_user(f'reconciled{n}')
+            Profile.objects.filter(user=user).update(is_subscribed=subscribed)
+            DigimartChargingSubscriberModel.objects.create(user=user, plain_msisdn=f'0170000000{n}', request_id=f'1_{n}', masked_msisdn=f'tel:masked{n}')
+            self.users.append(user)
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root, True)
+        self.checkpoint = os.path.join(root, 'reconcile.checkpoint')
+        patcher = mock.patch('quiz.management.commands.reconcile_subscriptions.digimart_client', DigimartClient())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def reply(self, *statuses):
+        self.server.replies += [(200, {'subscriberInfo': [{'subscriptionStatus': status}]}, 0) for status in statuses]
+
+    def reconcile(self):
+        call_command('reconcile_subscriptions', workers=1, rate=0, chunk_size=2, checkpoint=self.checkpoint, stdout=io.StringIO())
+
+    def subscribed(self):
+        return [Profile.objects.get(user=user).is_subscribed for user in self.users]
+
+    def test_only_changed_profiles_are_written(self):
+        self.reply('REGISTERED', 'REGISTERED', 'UNREGISTERED', 'UNREGISTERED')
+        with mock.patch.object(Profile.objects, 'bulk_update', wraps=Profile.objects.bulk_update) as bulk_update:
+            self.reconcile()
+        written = [[(profile.user_id, profile.is_subscribed) for profile in call.args[0]] for call in bulk_update.call_args_list]
+        self.assertEqual(written, [[(self.users[1].pk, True)], [(self.users[2].pk, False)]])
+        self.assertEqual(self.subscribed(), [True, True, False, False])
+        self.assertFalse(os.path.exists(self.checkpoint))
+
+    def test_resumes_after_an_interrupted_chunk(self):
+        self.reply('UNREGISTERED', 'REGISTERED', 'REGISTERED', 'REGISTERED')
+        real_bulk_update = Profile.objects.bulk_update
+
+        def crash_on_second_chunk(*args, **kwargs):
+            if bulk_update.call_count > 1:
+                raise OperationalError('database is locked')
+            return real_bulk_update(*args, **kwargs)
+        with mock.patch.object(Profile.objects, 'bulk_update', side_effect=crash_on_second_chunk) as bulk_update:
+            with self.assertRaises(OperationalError):
+                self.reconcile()
+        self.assertEqual(self.subscribed(), [False, True, True, False])
+        with open(self.checkpoint) as checkpoint:
+            self.assertEqual(int(checkpoint.read()), DigimartChargingSubscriberModel.objects.get(user=self.users[1]).pk)
+
+        seen = self.server.requests_seen
+        self.reply('UNREGISTERED', 'REGISTERED')
+        self.reconcile()
+        self.assertEqual(self.server.requests_seen - seen, 2)
+        self.assertEqual(self.subscribed(), [False, True, False, True])
+        self.assertFalse(os.path.exists(self.checkpoint))
+
+    def test_stops_when_the_circuit_opens(self):
+        self.server.replies = [(503, {}, 0)] * 10
+        # Both calls of the first chunk fail after three attempts each and open
+        # the breaker, so the second chunk is refused without reaching Digimart.
+        last_id = DigimartChargingSubscriberModel.objects.get(user=self.users[1]).pk
+        with self.assertRaisesMessage(CommandError, f'stopped after subscriber id {last_id}'):
+            self.reconcile()
+        self.assertEqual(self.server.requests_seen, 6)
+        self.assertEqual(self.subscribed(), [True, False, True, False])
+        with open(self.checkpoint) as checkpoint:
+            self.assertEqual(int(checkpoint.read()), last_id)
+
+
+class SubscriptionStateTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('transitions')
+        self.subscriber = DigimartChargingSubscriberModel.objects.create(user=self.user, plain_msisdn='01700000000', request_id='1_abc', masked_msisdn='')
+        self.subscriber = DigimartChargingSubscriberModel.objects.only(*STATE_FIELDS).get(pk=self.subscriber.pk)
+
+    def stored(self):
+        return DigimartChargingSubscriberModel.objects.values('request_id', 'masked_msisdn', 'subscription_status', 'version').get(pk=self.subscriber.pk)
+
+    def racing(self, races):
+        # Another writer bumps the row right before each of the first ``races`` versioned UPDATEs.
+        manager = DigimartChargingSubscriberModel.objects
+        real_filter = manager.filter
+        left = [races]
+
+        def filter(*args, **kwargs):
+            if 'version' in kwargs and left[0]:
+                left[0] -= 1
+                real_filter(pk=kwargs['pk']).update(version=F('version') + 1)
+            return real_filter(*args, **kwargs)
+        return mock.patch.object(manager, 'filter', side_effect=filter)
+
+    def test_one_versioned_update(self):
+        with self.assertNumQueries(1):
+            requested(self.subscriber, '01700000000', '1_def')
+        self.assertEqual(self.subscriber.version, 1)
+        self.assertEqual(self.stored()['request_id'], '1_def')
+        self.assertEqual(self.stored()['version'], 1)
+        with self.assertNumQueries(0):
+            requested(self.subscriber, '01700000000', '1_def')
+
+    def test_lost_race_is_retried_on_the_fresh_row(self):
+        with self.racing(1):
+            requested(self.subscriber, '01700000000', '1_def')
+        self.assertEqual(self.stored(), {'request_id': '1_def', 'masked_msisdn': '', 'subscription_status': 'UnKnown', 'version': 2})
+
+    def test_stale_copy_is_refreshed(self):
+        DigimartChargingSubscriberModel.objects.filter(pk=self.subscriber.pk).update(masked_msisdn='tel:other', version=F('version') + 1)
+        registered(self.subscriber, 'tel:masked', 'S1000', {})
+        self.assertEqual(self.stored(), {'request_id': '1_abc', 'masked_msisdn': 'tel:masked', 'subscription_status': 'Registered', 'version': 2})
+
+    @override_settings(DIGIMART_TRANSITION_ATTEMPTS=3, DIGIMART_WEBHOOK_FAST_ACK=False)
+    def test_conflict_once_attempts_run_out(self):
+        with self.racing(3):
+            response = self.client.get(reverse('notify_me'), {'subscriberId': 'tel:masked', 'requestId': '1_abc', 'subscriptionStatus': 'S1000'})
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(self.stored()['masked_msisdn'], '')
+        self.assertEqual(self.stored()['version'], 3)
+
+
+class DedupeSubscribersTests(TestCase):
+    def setUp(self):
+        # The partial unique indexes are dropped inside the test transaction
+        # to load pre-migration data, the rollback restores them.
+        with connection.cursor() as cursor:
+            for constraint in DigimartChargingSubscriberModel._meta.constraints:
+                cursor.execute(f"DROP INDEX {connection.ops.quote_name(constraint.name)}")
+        rows = [
+            (' 1_a ', 'tel:dup'),
+            ('1_b', ' tel:dup'),
+            ('1_c', 'tel:dup '),
+            ('1_a', 'tel:solo'),
+            ('x' * 40, ''),
+        ]
+        self.subscribers = [
+            DigimartChargingSubscriberModel.objects.create(user=User.objects.create_user(f'dedupe{n}'), plain_msisdn='01700000000', request_id=request_id, masked_msisdn=masked_msisdn)
+            for n, (request_id, masked_msisdn) in enumerate(rows)
+        ]
+
+    def stored(self):
+        return list(DigimartChargingSubscriberModel.objects.order_by('pk').values_list('request_id', 'masked_msisdn'))
+
+    def dedupe(self, **options):
+        out = io.StringIO()
+        call_command('dedupe_subscribers', stdout=out, **options)
+        return out.getvalue()
+
+    def test_trims_and_clears_older_duplicates(self):
+        output = self.dedupe()
+        self.assertEqual(self.stored(), [
+            ('', ''),
+            ('1_b', ''),
+            ('1_c', 'tel:dup'),
+            ('1_a', 'tel:solo'),
+            ('x' * 40, ''),
+        ])
+        self.assertIn('request_id: 1 values trimmed', output)
+        self.assertIn('masked_msisdn: 2 values trimmed', output)
+        self.assertIn('request_id: 1 values longer than 32 characters', output)
+        self.assertIn('request_id: cleared on 1 older duplicate rows', output)
+        self.assertIn('masked_msisdn: cleared on 2 older duplicate rows', output)
+
+    def test_dry_run_writes_nothing(self):
+        before = self.stored()
+        output = self.dedupe(dry_run=True)
+        self.assertEqual(self.stored(), before)
+        self.assertIn('request_id: 1 values trimmed', output)
+        # Duplicates only appear once values are trimmed, which the dry run skips.
+        self.assertIn('masked_msisdn: cleared on 0 older duplicate rows', output)
+
+    @override_settings(DIGIMART_WEBHOOK_FAST_ACK=False)
+    def test_notify_me_takes_over_a_reused_masked_msisdn(self):
+        DigimartChargingSubscriberModel.objects.all().delete()
+        older = DigimartChargingSubscriberModel.objects.create(user=User.objects.create_user('older'), plain_msisdn='01700000000', request_id='1_old', masked_msisdn='tel:reused')
+        newer = DigimartChargingSubscriberModel.objects.create(user=User.objects.create_user('newer'), plain_msisdn='01700000000', request_id='1_new', masked_msisdn='')
+        response = self.client.get(reverse('notify_me'), {'subscriberId': 'tel:reused', 'requestId': '1_new', 'subscriptionStatus': 'S1000'})
+        self.assertEqual(response.status_code, 200)
+        older.refresh_from_db()
+        newer.refresh_from_db()
+        self.assertEqual((older.masked_msisdn, newer.masked_msisdn, newer.subscription_status), ('', 'tel:reused', 'Registered'))
+
+
+class SubscriptionStatusCacheTests(TestCase):
+    @override_settings(DIGIMART_STATUS_CACHE_SIZE=2, DIGIMART_STATUS_REFRESH_ON_READ=False)
+    def test_least_recently_used_status_is_evicted(self):
+        cache = SubscriptionStatusCache()
+        cache.store(1, {'user': 1}, 200)
+        cache.store(2, {'user': 2}, 200)
+        cache.get(mock.Mock(pk=1))
+        cache.store(3, {'user': 3}, 200)
+        self.assertIsNone(cache.get(mock.Mock(pk=2)))
+        self.assertEqual(cache.get(mock.Mock(pk=1)), ({'user': 1}, 200))
+
+    def test_failed_refresh_is_logged(self):
+        user = User.objects.create_user('status-refresh')
+        with mock.patch('quiz.DigimartSubcriptionView.get_subscriber_charging_info', side_effect=RuntimeError('boom')), \
+                mock.patch('quiz.subscriptionCache.connection'), \
+                self.assertLogs('quiz.subscriptionCache', 'ERROR'):
+            SubscriptionStatusCache()._refresh(user.pk)
+
+
+@override_settings(DIGIMART_WEBHOOK_FAST_ACK=True)
+class DigimartEventTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('webhook-subscriber')
+        self.subscriber = DigimartChargingSubscriberModel.objects.create(user=self.user, plain_msisdn='01700000000', request_id='1_abc', masked_msisdn='')
+
+    def notify(self, **params):
+        query = {'subscriberId': 'tel:masked', 'requestId': '1_abc', 'subscriptionStatus': 'S1000', 'timeStamp': '20240601120000', **params}
+        return self.client.get(reverse('notify_me'), query)
+
+    def test_retried_callback_is_applied_once(self):
+        self.assertEqual(self.notify().status_code, 200)
+        self.assertEqual(self.notify().status_code, 200)
+        self.assertEqual(DigimartNotificationEvent.objects.count(), 1)
+        self.assertEqual(process_pending(), 1)
+        self.subscriber.refresh_from_db()
+        self.assertEqual((self.subscriber.masked_msisdn, self.subscriber.subscription_status), ('tel:masked', 'Registered'))
+
+    def test_oversized_ids_are_rejected(self):
+        self.assertEqual(self.notify(subscriberId='tel:' + 'x' * 200).status_code, 400)
+        self.assertEqual(self.notify(requestId='1_' + 'x' * 40).status_code, 400)
+        self.assertFalse(DigimartNotificationEvent.objects.exists())
+
+    @override_settings(DIGIMART_EVENT_RETENTION_DAYS=30)
+    def test_expired_events_are_pruned(self):
+        self.notify()
+        self.notify(timeStamp='20240602120000')
+        DigimartNotificationEvent.objects.filter(event_time='20240601120000').update(processed_at=timezone.now() - timedelta(days=31))
+        process_pending()
+        self.assertEqual(list(DigimartNotificationEvent.objects.values_list('event_time', flat=True)), ['20240602120000'])
+
+
+class SliderDerivativeTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        overrides = override_settings(MEDIA_ROOT=media_root)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def slider(self, *names):
+        return Slider.objects.create(image='sliders/banner.png', variants={
+            'source': 'sliders/banner.png', 'images': [{'name': name} for name in names],
+        })
+
+    def test_delete_removes_derivatives_not_shared(self):
+        for name in ('sliders/derived/a.webp', 'sliders/derived/b.webp'):
+            default_storage.save(name, ContentFile(b'image'))
+        slider = self.slider('sliders/derived/a.webp', 'sliders/derived/b.webp')
+        self.slider('sliders/derived/b.webp')
+        with self.captureOnCommitCallbacks(execute=True):
+            slider.delete()
+        self.assertFalse(default_storage.exists('sliders/derived/a.webp'))
+        self.assertTrue(default_storage.exists('sliders/derived/b.webp'))
+
+    def test_worker_logs_failures(self):
+        with mock.patch('quiz.imageDerivatives.generate', side_effect=OSError('broken image')), \
+                mock.patch('quiz.imageDerivatives.connection'), \
+                self.assertLogs('quiz.imageDerivatives', 'ERROR'):
+            DerivativeWorker._run(1)
+
+
+class VersionedResponseCacheTests(TestCase):
+    def setUp(self):
+        response_cache().clear()
+        self.addCleanup(response_cache().clear)
+        self.faq = FAQs(question='How do spins work?', answer='Five per day.')
+        self.faq.save()
+
+    def test_not_modified(self):
+        first = self.client.get(reverse('faqs-list'))
+        self.assertEqual(first.status_code, 200)
+        with self.assertNumQueries(0):
+            second = self.client.get(reverse('faqs-list'), HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(second['ETag'], first['ETag'])
+        self.assertNotIn('Last-Modified', first)
+
+    def test_other_workers_answer_304(self):
+        # Local-memory entries are only visible inside the process that built them.
+        self.assertNotIsInstance(response_cache(), LocMemCache)
+        first = self.client.get(reverse('faqs-list'))
+        # A fresh connection to the alias is what another worker process opens.
+        other_worker = caches.create_connection(settings.QUIZ_HTTP_CACHE_ALIAS)
+        with mock.patch('quiz.httpCache.response_cache', return_value=other_worker), self.assertNumQueries(0):
+            second = self.client.get(reverse('faqs-list'), HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, 304)
+
+    def test_save_invalidates(self):
+        first = self.client.get(reverse('faqs-list'))
+        self.faq.answer = 'Ten per day.'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.faq.save()
+        second = self.client.get(reverse('faqs-list'), HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, 200)
+        self.assertNotEqual(second['ETag'], first['ETag'])
+        self.assertIn('Ten per day.', second.content.decode())
+
+
+class LeaderboardTests(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user('alice')
+        self.bob = User.objects.create_user('bob')
+        Performance.objects.create(user=self.alice, correct_answers=5)
+        Performance.objects.create(user=self.bob, correct_answers=3)
+        self.boards = Leaderboards()
+        self.reloads = []
+        self.boards._spawn = self.reloads.append
+
+    def test_cold_board_seeds_from_snapshot(self):
+        LeaderboardSnapshot.objects.create(board='all_time', period='all', user=self.bob, rank=1, score=2)
+        _, top, _ = self.boards.standings('all_time', self.alice.pk)
+        self.assertEqual(top, [(1, self.bob.pk, 2)])
+        self.assertEqual(len(self.reloads), 1)
+
+        self.reloads.pop()()
+        _, top, mine = self.boards.standings('all_time', self.alice.pk)
+        self.assertEqual(top, [(1, self.alice.pk, 5), (2, self.bob.pk, 3)])
+        self.assertEqual(mine, (1, 5))
+        self.assertEqual(self.reloads, [])
+
+    @override_settings(QUIZ_LEADERBOARD_RELOAD_INTERVAL=-1)
+    def test_one_reload_at_a_time_and_records_are_replayed(self):
+        self.boards.standings('all_time', self.alice.pk)
+        self.reloads.pop()()
+        # Stale: the first caller starts a reload, the others keep the current board.
+        for _ in range(3):
+            self.boards.standings('all_time', self.alice.pk)
+        self.assertEqual(len(self.reloads), 1)
+
+        Performance.objects.filter(user=self.bob).update(correct_answers=7)
+        self.boards.record(self.bob.pk, 4)
+        self.assertEqual(self.boards.standings('all_time', self.bob.pk)[2], (1, 7))
+        # The aggregate did not include this round yet, the replay adds it.
+        Performance.objects.filter(user=self.bob).update(correct_answers=3)
+        self.reloads.pop()()
+        self.assertEqual(self.boards.standings('all_time', self.bob.pk)[2], (1, 7))
+
+
+class PerformanceBufferTests(TestCase):
+    def setUp(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root, True)
+        # Created by the first add(), so there is nothing to recover.
+        journal_dir = os.path.join(root, 'journal')
+        overrides = override_settings(QUIZ_PERFORMANCE_JOURNAL_DIR=journal_dir, QUIZ_PERFORMANCE_FLUSH_INTERVAL=3600)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.journal_dir = journal_dir
+        self.user = User.objects.create_user('buffered')
+        self.buffer = PerformanceBuffer()
+        self.addCleanup(self.cancel_timer)
+
+    def cancel_timer(self):
+        if self.buffer._timer is not None:
+            self.buffer._timer.cancel()
+
+    def test_flush_applies_buffered_rounds(self):
+        today = date.today()
+        self.buffer.add(self.user.pk, today, 3, 2)
+        self.buffer.add(self.user.pk, today, 4, 1)
+        self.assertFalse(Performance.objects.filter(user=self.user).exists())
+        self.assertEqual(self.buffer.pending_for(self.user.pk), {today: [2, 7, 3]})
+
+        self.assertEqual(self.buffer.flush(), 1)
+        performance = Performance.objects.get(user=self.user, date_played=today)
+        self.assertEqual((performance.total_quizzes_played, performance.correct_answers, performance.wrong_answers), (2, 7, 3))
+        self.assertEqual(os.listdir(self.journal_dir), [])
+
+    @override_settings(QUIZ_PERFORMANCE_FLUSH_SIZE=1)
+    def test_failed_flush_does_not_fail_the_round(self):
+        with mock.patch.object(self.buffer, '_apply', side_effect=OperationalError('database is locked')):
+            with self.assertLogs('quiz.performanceBuffer', 'ERROR') as logs:
+                self.buffer.add(self.user.pk, date.today(), 3, 2)
+                deadline = time.monotonic() + 5
+                while not logs.records and time.monotonic() < deadline:
+                    time.sleep(0.01)
+        # Kept in flight for the next flush.
+        self.assertEqual(self.buffer.pending_for(self.user.pk), {date.today(): [1, 3, 2]})
+
+    def test_recover_tolerates_a_journal_claimed_by_another_worker(self):
+        os.makedirs(self.journal_dir, exist_ok=True)
+        gone = os.path.join(self.journal_dir, 'active-999999999.jsonl')
+        with mock.patch('quiz.performanceBuffer.glob.glob', side_effect=[[gone], []]):
+            self.buffer.recover()
+        self.assertTrue(self.buffer._recovered)
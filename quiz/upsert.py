@@ -0,0 +1,45 @@
+from django.db import connection
+
+
+UPSERT_VENDORS = ('postgresql', 'sqlite')
+
+
+def can_upsert():
+    """True when the connection runs ``INSERT ... ON CONFLICT ... RETURNING``."""
+    return connection.vendor in UPSERT_VENDORS and connection.features.can_return_columns_from_insert
+
+
+def upsert_counters(model, key, counters, limit=None, returning=None):
+    """
+    Insert a ``model`` row with ``key`` and ``counters`` or, if a row with that
+    key exists, add ``counters`` to it, in one statement. ``key`` must match a
+    unique constraint. With ``limit=(field, value)`` the existing row is only
+    updated while ``field`` is below ``value``.
+
+    Returns the ``returning`` fields (default: the counters) of the written
+    row, or None when the limit stopped the update.
+    """
+    opts = model._meta
+    quote = connection.ops.quote_name
+    table = quote(opts.db_table)
+
+    def field(name):
+        return opts.pk if name == 'pk' else opts.get_field(name)
+
+    values = {**key, **counters}
+    columns = [quote(field(name).column) for name in values]
+    params = [field(name).get_db_prep_value(value, connection) for name, value in values.items()]
+    updates = ', '.join(f"{column} = {table}.{column} + excluded.{column}" for column in columns[len(key):])
+
+    sql = (
+        f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))}) "
+        f"ON CONFLICT ({', '.join(columns[:len(key)])}) DO UPDATE SET {updates}"
+    )
+    if limit is not None:
+        sql += f" WHERE {table}.{quote(field(limit[0]).column)} < %s"
+        params.append(limit[1])
+    sql += " RETURNING " + ', '.join(quote(field(name).column) for name in returning or counters)
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchone()
@@ -1,11 +1,23 @@
+from django.conf import settings
 from django.urls import path
 from rest_framework_simplejwt.views import TokenObtainPairView,TokenRefreshView, TokenVerifyView
 from quiz.RegisterView import RegisterView
 from quiz.views import QuizListView,  ProfileCreate, ProfileDetail, FAQsList, SliderList
 from .resultView import ValidateResultView, UserPerformanceView
 from .spinViews import SpinDetailView
+from .leaderboardView import LeaderboardView
+from .searchView import QuizSearchView, FAQsSearchView
 from .DigimartSubcriptionView import GenerateApiEndpointView, NotifyMeView, ConfirmNotificationView, UnsubscriptionView, SubscriptionStatusView
 
+if getattr(settings, 'DIGIMART_ASYNC_VIEWS', False):
+    from .DigimartAsyncView import (
+        AsyncGenerateApiEndpointView as GenerateApiEndpointView,
+        AsyncNotifyMeView as NotifyMeView,
+        AsyncConfirmNotificationView as ConfirmNotificationView,
+        AsyncUnsubscriptionView as UnsubscriptionView,
+        AsyncSubscriptionStatusView as SubscriptionStatusView,
+    )
+
 
 
 
@@ -24,15 +36,18 @@ urlpatterns = [
 
     path('user-performance/', UserPerformanceView.as_view(), name='user_performance'),
     path('validate-result/', ValidateResultView.as_view(), name='validate-result'),
+    path('leaderboard/', LeaderboardView.as_view(), name='leaderboard'),
 
     
     path('sliders/', SliderList.as_view(), name='slider-list'),
     path('faqs/', FAQsList.as_view(), name='faqs-list'),
+    path('faqs/search/', FAQsSearchView.as_view(), name='faqs-search'),
     
     
     
     
     path('quizzes/', QuizListView.as_view(), name='quiz-list'),
+    path('quizzes/search/', QuizSearchView.as_view(), name='quiz-search'),
 
 
     path('profile/', ProfileDetail.as_view(), name='profile-detail'),
@@ -1,11 +1,13 @@
+from django.http import HttpResponse
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import generics, permissions
-from django.db.models import Count
-import random
 from .models import Quiz, Profile, FAQs, Slider
-from .serializer import QuizSerializer, ProfileSerializer, FAQsSerializer, SliderSerializer
-from .DigimartSubcriptionView import get_subscriber_charging_info
+from .serializer import ProfileSerializer, FAQsSerializer, SliderSerializer
+from .subscriptionCache import subscription_status_cache
+from .quizSampler import quiz_id_index, recent_quizzes
+from .quizSnapshot import QuizSnapshot, quiz_snapshot
+from .httpCache import FAQS_VERSION_NAMESPACE, SLIDERS_VERSION_NAMESPACE, VersionedResponseCacheMixin
 
 
 
@@ -17,8 +19,8 @@ class ProfileDetail(generics.RetrieveUpdateAPIView):
     def get_object(self):
         
         user = self.request.user
-        response_data, response_status = get_subscriber_charging_info(user)
-        # print(response_data)
+        # Answered from the cache, a stale or missing status is refreshed in the background.
+        subscription_status_cache.get(user)
         return self.request.user.profile
 
 class ProfileCreate(generics.CreateAPIView):
@@ -39,30 +41,44 @@ class QuizListView(APIView):
         except ValueError:
             return Response({"error": "Invalid value for 'n'"}, status=400)
 
-        quiz_count = Quiz.objects.count()
-        if quiz_count == 0:
+        if n < 1:
+            return Response({"error": "Invalid value for 'n'"}, status=400)
+
+        exclude_seen = request.query_params.get('exclude_seen', '').lower() in ['true', '1']
+        exclude = recent_quizzes.get(request.user.id) if exclude_seen else None
+
+        random_ids = quiz_id_index.sample(n, exclude=exclude)
+        if not random_ids:
             return Response({"error": "No quizzes available"}, status=404)
 
-        n = min(n, quiz_count)  # Adjust n if it exceeds the number of available quizzes
+        fragments = quiz_snapshot.fragments(random_ids)
+        if len(fragments) < len(random_ids):
+            # Some sampled IDs were deleted by another worker, refresh the index and top up.
+            quiz_id_index.invalidate()
+            missing = len(random_ids) - len(fragments)
+            refill = quiz_id_index.sample(missing, exclude=exclude, taken=set(random_ids))
+            fragments.update(quiz_snapshot.fragments(refill))
+            random_ids = random_ids + refill
 
-        if quiz_count > 10:
-            random_ids = random.sample(range(1, quiz_count + 1), n)
-            quizzes = Quiz.objects.filter(id__in=random_ids)
-        else:
-            quizzes = Quiz.objects.all()
+        quiz_ids = [quiz_id for quiz_id in random_ids if quiz_id in fragments]
+        if exclude_seen:
+            recent_quizzes.add(request.user.id, quiz_ids)
 
-        serializer = QuizSerializer(quizzes, many=True)
-        return Response(serializer.data)
+        # Quizzes are served from pre-rendered JSON, skipping the serializer.
+        body = QuizSnapshot.join(fragments[quiz_id] for quiz_id in quiz_ids)
+        return HttpResponse(body, content_type='application/json')
 
 
 
 
-class FAQsList(generics.ListAPIView):
-    queryset = FAQs.objects.all()
+class FAQsList(VersionedResponseCacheMixin, generics.ListAPIView):
+    queryset = FAQs.objects.order_by('id')
     serializer_class = FAQsSerializer
     permission_classes = [permissions.AllowAny]
+    cache_namespace = FAQS_VERSION_NAMESPACE
 
-class SliderList(generics.ListAPIView):
-    queryset = Slider.objects.all()
+class SliderList(VersionedResponseCacheMixin, generics.ListAPIView):
+    queryset = Slider.objects.order_by('id')
     serializer_class = SliderSerializer
     permission_classes = [permissions.AllowAny]
+    cache_namespace = SLIDERS_VERSION_NAMESPACE